@@ -0,0 +1,189 @@
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+
+ADAPTER_MEMORY_BUDGET = 512 * 2**20   # Bytes of LoRA weights kept attached to the base model
+
+
+def adapter_name(idx):
+    return f"ch{idx}"
+
+
+class AdapterManager:
+    """
+    One base model shared by every request, with LoRA adapters attached to it
+    by name.
+
+    `using(idx)` attaches chapter `idx`'s adapter on first use (a miss),
+    switches to it with set_adapter, and yields the PeftModel while holding
+    the manager's lock, so concurrent requests never swap adapters under a
+    running generation. After each load the least recently used adapters are
+    deleted until the attached LoRA weights fit `memory_budget` again (the
+    adapter just loaded is always kept).
+
+    Adapters come from `locate(idx)`, which returns either a folder saved with
+    save_pretrained or a (LoraBundle, idx) pair, or None if unavailable.
+    Callables in `on_evict` are called with the name of each evicted adapter,
+    for state derived from it (e.g. inference_worker.PrefixCache).
+    """
+
+    def __init__(self, base_model, locate, memory_budget=ADAPTER_MEMORY_BUDGET):
+        self.base_model = base_model
+        self.locate = locate
+        self.memory_budget = memory_budget
+        self.model = None
+        self.loaded = OrderedDict()   # adapter name -> bytes of its LoRA weights
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.on_evict = []
+
+    def _load(self, name, source):
+        from peft import PeftConfig, PeftModel, set_peft_model_state_dict
+
+        if isinstance(source, tuple):
+            bundle, idx = source
+            config = PeftConfig.from_peft_type(**bundle.adapter_config(idx))
+            if self.model is None:
+                self.model = PeftModel(self.base_model, config, name)
+            else:
+                self.model.add_adapter(name, config)
+            set_peft_model_state_dict(self.model, bundle.tensors(idx, framework="torch"), name)
+        elif self.model is None:
+            self.model = PeftModel.from_pretrained(self.base_model, str(source), adapter_name=name)
+        else:
+            self.model.load_adapter(str(source), adapter_name=name)
+        self.model.eval()
+
+    def adapter_bytes(self, name):
+        """Bytes of the parameters that belong to adapter `name`"""
+        return sum(p.numel() * p.element_size() for n, p in self.model.named_parameters()
+                   if name in n.split('.'))
+
+    def _evict(self, keep):
+        while sum(self.loaded.values()) > self.memory_budget and len(self.loaded) > len(keep):
+            name = next(n for n in self.loaded if n not in keep)
+            self.model.delete_adapter(name)
+            del self.loaded[name]
+            self.evictions += 1
+            for callback in self.on_evict:
+                callback(name)
+
+    def _ensure_loaded(self, idx, keep):
+        """Attach chapter `idx`'s adapter if needed; False if it cannot be found"""
+        name = adapter_name(idx)
+        if name in self.loaded:
+            self.hits += 1
+            self.loaded.move_to_end(name)
+            return True
+        source = self.locate(idx)
+        if source is None:
+            return False
+        self.misses += 1
+        self._load(name, source)
+        self.loaded[name] = self.adapter_bytes(name)
+        self._evict(keep={name} | keep)
+        return True
+
+    def activate(self, idx):
+        """
+        Make chapter `idx`'s adapter the active one.
+
+        Returns:
+            The PeftModel, or None if `locate` cannot find the adapter
+        """
+        with self.lock:
+            if not self._ensure_loaded(idx, keep=set()):
+                return None
+            self.model.set_adapter(adapter_name(idx))
+            return self.model
+
+    @contextmanager
+    def using(self, idx):
+        """activate(idx) and hold the lock until the with-block ends"""
+        with self.lock:
+            yield self.activate(idx)
+
+    @contextmanager
+    def using_all(self, idxs):
+        """
+        Attach every adapter in `idxs` (none of them is evicted for another)
+        for a mixed-adapter batch, e.g. generate(..., adapter_names=[...]).
+        Yields None if any of them cannot be found.
+        """
+        with self.lock:
+            keep = {adapter_name(idx) for idx in idxs} & set(self.loaded)
+            for idx in dict.fromkeys(idxs):
+                if not self._ensure_loaded(idx, keep):
+                    yield None
+                    return
+                keep.add(adapter_name(idx))
+            yield self.model
+
+    def stats(self):
+        with self.lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'loaded': list(self.loaded),
+                'loaded_bytes': sum(self.loaded.values()),
+            }
+
+
+def adapter_locator(workdir):
+    """
+    locate(idx) for AdapterManager over `workdir`: adapters from the indexed
+    bundle (lora_adapters.bundle) if present, else the '{idx}_*' folders,
+    scanned once here instead of on every request.
+    """
+    workdir = Path(workdir)
+    bundle_path = workdir / "lora_adapters.bundle"
+    if bundle_path.exists():
+        from lora_bundle import LoraBundle
+
+        bundle = LoraBundle(bundle_path)
+        return lambda idx: (bundle, int(idx)) if bundle.has(idx) else None
+    folders = {}
+    for p in sorted(workdir.iterdir()):
+        prefix = p.name.split('_', 1)[0]
+        if p.is_dir() and prefix.isdigit():
+            folders.setdefault(int(prefix), p)
+    return lambda idx: folders.get(int(idx))
+
+
+# ---------------------
+# CPU tests and benchmarks: tiny random Llama + synthetic adapters
+# ---------------------
+def tiny_llama(seed=0):
+    """A randomly initialized Llama-style causal LM small enough for CPU tests"""
+    import torch
+    from transformers import LlamaConfig, LlamaForCausalLM
+
+    torch.manual_seed(seed)
+    config = LlamaConfig(vocab_size=128, hidden_size=64, intermediate_size=128, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=2, max_position_embeddings=1024)
+    return LlamaForCausalLM(config).eval()
+
+
+def make_synthetic_adapters(out_dir, count, r=8, seed=0):
+    """
+    Save `count` LoRA adapters with random (non-zero) weights for tiny_llama().
+
+    Returns:
+        {idx: folder} for idx in 1..count
+    """
+    import torch
+    from peft import LoraConfig, get_peft_model
+
+    folders = {}
+    for idx in range(1, count + 1):
+        torch.manual_seed(seed + idx)
+        config = LoraConfig(r=r, lora_alpha=16, target_modules=["q_proj", "v_proj"], init_lora_weights=False)
+        model = get_peft_model(tiny_llama(), config)
+        folder = Path(out_dir) / f"{idx}_adapter"
+        model.save_pretrained(folder)
+        folders[idx] = folder
+    return folders
@@ -0,0 +1,246 @@
+import sqlite3
+import sys
+import threading
+import time
+from scipy import sparse
+from router_service import TFIDF_PATH, clean_text
+
+# Persistent cache of generated answers, keyed by (routed chapter, normalized
+# query). Paraphrases of a cached question can be served too: the router's
+# TF-IDF vectorizer embeds the query and a cached question of the same chapter
+# with cosine similarity >= the threshold counts as a hit.
+ANSWER_CACHE_PATH = "answer_cache.sqlite"
+ANSWER_TTL_S = 7 * 24 * 3600     # Answers older than this are regenerated
+MAX_ENTRIES = 5000
+SIMILARITY_THRESHOLD = 0.9       # None disables the similarity tier
+
+
+def normalize_query(query):
+    """clean_text plus collapsed whitespace, so trivially different spellings share a key"""
+    return " ".join(clean_text(query).split())
+
+
+class AnswerCache:
+    """
+    SQLite-backed answer cache with a TTL, an entry limit (least recently used
+    entries go first) and an optional similarity tier.
+
+    Args:
+        path: SQLite file; answers survive app restarts
+        vectorizer: the router's fitted TfidfVectorizer, or None for exact
+            matches only
+        ttl: seconds an answer stays valid
+        max_entries: answers kept at most
+        threshold: cosine similarity needed for a near-duplicate hit
+    """
+
+    def __init__(self, path=ANSWER_CACHE_PATH, vectorizer=None, ttl=ANSWER_TTL_S,
+                 max_entries=MAX_ENTRIES, threshold=SIMILARITY_THRESHOLD):
+        self.path = str(path)
+        self.vectorizer = vectorizer
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS answers ("
+            " chapter INTEGER, query TEXT, answer TEXT, gen_s REAL, created REAL, last_used REAL,"
+            " PRIMARY KEY (chapter, query))"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS answers_last_used ON answers (last_used)")
+        self.conn.commit()
+        self.rows = {}        # chapter -> {normalized query: TF-IDF row}
+        self.matrices = {}    # chapter -> (queries, stacked rows), rebuilt after changes
+        self.lookups = 0
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.saved_s = 0.0
+        with self.lock:
+            self._expire()
+            self.conn.commit()
+            if self.vectorizer is not None and self.threshold is not None:
+                for chapter, query in self.conn.execute("SELECT chapter, query FROM answers"):
+                    self._index(chapter, query)
+
+    def _index(self, chapter, query):
+        self.rows.setdefault(chapter, {})[query] = self.vectorizer.transform([query])
+        self.matrices.pop(chapter, None)
+
+    def _unindex(self, chapter, query):
+        if self.rows.get(chapter, {}).pop(query, None) is not None:
+            self.matrices.pop(chapter, None)
+
+    def _delete(self, rows):
+        for chapter, query in rows:
+            self.conn.execute("DELETE FROM answers WHERE chapter = ? AND query = ?", (chapter, query))
+            self._unindex(chapter, query)
+
+    def _expire(self):
+        cutoff = time.time() - self.ttl
+        self._delete(self.conn.execute("SELECT chapter, query FROM answers WHERE created < ?",
+                                       (cutoff,)).fetchall())
+
+    def _evict(self):
+        (count,) = self.conn.execute("SELECT COUNT(*) FROM answers").fetchone()
+        if count > self.max_entries:
+            self._delete(self.conn.execute("SELECT chapter, query FROM answers ORDER BY last_used LIMIT ?",
+                                           (count - self.max_entries,)).fetchall())
+
+    def _nearest(self, chapter, query):
+        """(cached query, cosine similarity) of the closest cached question in `chapter`"""
+        if chapter not in self.matrices:
+            queries = list(self.rows.get(chapter, {}))
+            if not queries:
+                return None, 0.0
+            self.matrices[chapter] = (queries, sparse.vstack([self.rows[chapter][q] for q in queries]).tocsr())
+        queries, matrix = self.matrices[chapter]
+        # TF-IDF rows are L2-normalized, so the dot product is the cosine
+        sims = (matrix @ self.vectorizer.transform([query]).T).toarray().ravel()
+        best = int(sims.argmax())
+        return queries[best], float(sims[best])
+
+    def get(self, chapter, query):
+        """
+        Cached answer for `query` routed to `chapter`.
+
+        Returns:
+            None on a miss, else {'answer', 'match' ('exact' or 'similar'),
+            'similarity', 'saved_s'}, where saved_s is the generation time the
+            hit avoided
+        """
+        start = time.perf_counter()
+        chapter, key = int(chapter), normalize_query(query)
+        with self.lock:
+            self.lookups += 1
+            match, similarity = 'exact', 1.0
+            row = self.conn.execute("SELECT answer, gen_s, created FROM answers WHERE chapter = ? AND query = ?",
+                                    (chapter, key)).fetchone()
+            if row is None and self.vectorizer is not None and self.threshold is not None and key:
+                nearest, similarity = self._nearest(chapter, key)
+                if nearest is not None and similarity >= self.threshold:
+                    match, key = 'similar', nearest
+                    row = self.conn.execute("SELECT answer, gen_s, created FROM answers"
+                                            " WHERE chapter = ? AND query = ?", (chapter, key)).fetchone()
+            if row is None:
+                return None
+            answer, gen_s, created = row
+            if created < time.time() - self.ttl:
+                self._delete([(chapter, key)])
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE answers SET last_used = ? WHERE chapter = ? AND query = ?",
+                              (time.time(), chapter, key))
+            self.conn.commit()
+            saved_s = max(gen_s - (time.perf_counter() - start), 0.0)
+            if match == 'exact':
+                self.exact_hits += 1
+            else:
+                self.similar_hits += 1
+            self.saved_s += saved_s
+        return {'answer': answer, 'match': match, 'similarity': similarity, 'saved_s': saved_s}
+
+    def put(self, chapter, query, answer, gen_s):
+        """Store `answer`, which took `gen_s` seconds to generate"""
+        chapter, key = int(chapter), normalize_query(query)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO answers (chapter, query, answer, gen_s, created, last_used)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (chapter, key, answer, gen_s, now, now),
+            )
+            if self.vectorizer is not None and self.threshold is not None and key:
+                self._index(chapter, key)
+            self._expire()
+            self._evict()
+            self.conn.commit()
+
+    def stats(self):
+        with self.lock:
+            hits = self.exact_hits + self.similar_hits
+            return {
+                'lookups': self.lookups,
+                'exact_hits': self.exact_hits,
+                'similar_hits': self.similar_hits,
+                'hit_rate': hits / self.lookups if self.lookups else 0.0,
+                'saved_s': self.saved_s,
+                'entries': self.conn.execute("SELECT COUNT(*) FROM answers").fetchone()[0],
+            }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# ---------------------
+# Benchmark: replay paraphrased questions through the tiny CPU worker
+# ---------------------
+BENCHMARK_QUESTIONS = [
+    (2, "I am so stressed about my exams, what should I do?"),
+    (2, "i am so stressed about my exams what should i do"),
+    (2, "I'm so stressed about my exams, what should I do?"),
+    (2, "I am really stressed about my exams, what should I do?"),
+    (3, "I am anxious about my career and my future job"),
+    (3, "I am anxious about my career and future job."),
+    (3, "Anxious about my career and my future job"),
+    (12, "How do I cope with the grief of losing my father?"),
+    (12, "how do i cope with the grief of losing my father"),
+    (12, "How can I cope with grief after losing my father?"),
+]
+
+
+def benchmark_answer_cache(tfidf_path=TFIDF_PATH, rounds=3, max_new_tokens=64):
+    """
+    Hit rate and generation time saved when the benchmark questions are asked
+    `rounds` times, exact-only vs with the similarity tier.
+    """
+    import os
+    import tempfile
+    from functools import partial
+    import joblib
+    from adapter_manager import make_synthetic_adapters
+    from inference_worker import InferenceClient, tiny_worker
+
+    if os.path.exists(tfidf_path):
+        vectorizer = joblib.load(tfidf_path)
+    else:
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        print(f"✗ {tfidf_path} not found; fitting a TF-IDF on the benchmark questions instead.")
+        vectorizer = TfidfVectorizer(ngram_range=(1, 2)).fit([normalize_query(q) for _, q in BENCHMARK_QUESTIONS])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        make_synthetic_adapters(tmp, 12)
+        client = InferenceClient(partial(tiny_worker, tmp))
+        try:
+            results = {}
+            for tier, threshold in (('exact only', None), ('similarity', SIMILARITY_THRESHOLD)):
+                cache = AnswerCache(os.path.join(tmp, f"answers_{len(results)}.sqlite"), vectorizer,
+                                    threshold=threshold)
+                start = time.perf_counter()
+                for _ in range(rounds):
+                    for chapter, question in BENCHMARK_QUESTIONS:
+                        if cache.get(chapter, question) is None:
+                            t0 = time.perf_counter()
+                            reply = client.generate(chapter, question, max_new_tokens)
+                            cache.put(chapter, question, reply['text'], time.perf_counter() - t0)
+                results[tier] = dict(cache.stats(), total_s=time.perf_counter() - start)
+                cache.close()
+        finally:
+            client.close()
+
+    print(f"{'tier':>11} {'lookups':>8} {'exact':>6} {'similar':>8} {'hit rate':>9} {'saved s':>8} {'total s':>8}")
+    for tier, s in results.items():
+        print(f"{tier:>11} {s['lookups']:>8} {s['exact_hits']:>6} {s['similar_hits']:>8} "
+              f"{s['hit_rate']:>9.1%} {s['saved_s']:>8.2f} {s['total_s']:>8.2f}")
+    return results
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark_answer_cache()
+    else:
+        cache = AnswerCache(sys.argv[1] if len(sys.argv) > 1 else ANSWER_CACHE_PATH)
+        print(f"📂 {cache.path}: {cache.stats()['entries']} cached answers")
+        cache.close()
@@ -1,61 +1,99 @@
 import pandas as pd
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 
-def create_router_dataset():
+def read_chapter_questions(file_path):
     """
-    Combines question-answer CSVs from 18 chapters into one dataset,
-    taking an equal number of questions from each file, then scrambling the rows.
+    Read only the 'question' column of one chapter CSV.
+    Returns a Series, or None if the file is missing, empty or has no 'question' column.
     """
+    file_name = os.path.basename(file_path)
+    try:
+        return pd.read_csv(file_path, usecols=['question'])['question']
+    except FileNotFoundError:
+        print(f"ERROR: File not found - {file_path}. Skipping.")
+    except pd.errors.EmptyDataError:
+        print(f"WARNING: Empty file - {file_path}. Skipping.")
+    except pd.errors.ParserError as e:
+        # ParserError subclasses ValueError, so it must be caught first
+        print(f"WARNING: Malformed CSV {file_name}: {e}. Skipping this file.")
+    except ValueError:
+        print(f"WARNING: 'question' column not found in {file_name}. Skipping this file.")
+    except Exception as e:
+        print(f"An unexpected error occurred with {file_name}: {e}")
+    return None
 
-    input_folder = "QA_Datasets"
-    output_file = "Router_Dataset.csv"
-    num_chapters = 18
+def create_router_dataset(input_folder=None, output_file="Router_Dataset.csv", num_chapters=18,
+                          strategy="min_size", sample_seed=69, shuffle_seed=96, max_workers=8):
+    """
+    Combines question-answer CSVs from the chapters into one dataset, then scrambles the rows.
 
-    all_data_frames = []
-    print(f"Starting to process {num_chapters} files from '{input_folder}'...")
+    Only the 'question' column is read, with the chapter files loaded in parallel.
 
-    for i in range(1, num_chapters + 1):
-        file_name = f"Chapter_{i}_QA.csv"
-        file_path = os.path.join(input_folder, file_name)
+    Args:
+        input_folder: Folder with Chapter_{n}_QA.csv (defaults to QA_Datasets_Dedup if present, else QA_Datasets)
+        output_file: CSV path; a Parquet copy is written next to it
+        num_chapters: Number of chapter files (labels 1..num_chapters)
+        strategy: 'min_size' samples an equal number of questions per chapter;
+            'class_weights' keeps every question and adds a balanced 'weight' column
+        sample_seed: Seed for the per-chapter sampling
+        shuffle_seed: Seed for the final shuffle
+    """
 
-        try:
-            df = pd.read_csv(file_path)
+    # Prefer the near-duplicate-free datasets written by dedup_qa.py
+    if input_folder is None:
+        input_folder = "QA_Datasets_Dedup" if os.path.isdir("QA_Datasets_Dedup") else "QA_Datasets"
 
-            if 'question' not in df.columns:
-                print(f"WARNING: 'question' column not found in {file_name}. Skipping this file.")
-                continue
+    print(f"Starting to process {num_chapters} files from '{input_folder}'...")
 
-            df['llm'] = i
-            df_subset = df[['question', 'llm']]
-            all_data_frames.append(df_subset)
-            print(f"Processed {file_name} with {len(df_subset)} rows.")
+    paths = [os.path.join(input_folder, f"Chapter_{i}_QA.csv") for i in range(1, num_chapters + 1)]
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        questions = dict(zip(range(1, num_chapters + 1), pool.map(read_chapter_questions, paths)))
+    questions = {i: q for i, q in questions.items() if q is not None}
 
-        except FileNotFoundError:
-            print(f"ERROR: File not found - {file_path}. Skipping.")
-        except pd.errors.EmptyDataError:
-            print(f"WARNING: Empty file - {file_path}. Skipping.")
-        except Exception as e:
-            print(f"An unexpected error occurred with {file_name}: {e}")
+    for i, q in questions.items():
+        print(f"Processed Chapter_{i}_QA.csv with {len(q)} rows.")
 
-    if not all_data_frames:
+    if not questions:
         print("No data found. Exiting.")
         return
 
-    # Determine the smallest dataset size across all chapters
-    min_size = min(len(df) for df in all_data_frames)
-    print(f"\nEqualizing to {min_size} questions per chapter.")
+    if strategy == "min_size":
+        # Determine the smallest dataset size across all chapters
+        min_size = min(len(q) for q in questions.values())
+        print(f"\nEqualizing to {min_size} questions per chapter.")
 
-    # Take equal number of questions from each dataset
-    balanced_dfs = [df.sample(n=min_size, random_state=69) for df in all_data_frames]
+        # Take equal number of questions from each dataset
+        parts = [pd.DataFrame({'question': q, 'llm': i}).sample(n=min_size, random_state=sample_seed)
+                 for i, q in questions.items()]
+    elif strategy == "class_weights":
+        total = sum(len(q) for q in questions.values())
+        print(f"\nKeeping all {total} questions with balanced class weights.")
+        parts = [pd.DataFrame({'question': q, 'llm': i, 'weight': total / (len(questions) * len(q))})
+                 for i, q in questions.items()]
+    else:
+        raise ValueError(f"Unknown strategy '{strategy}' (expected 'min_size' or 'class_weights')")
+    questions.clear()
 
     # Combine all into one large DataFrame
-    combined_df = pd.concat(balanced_dfs, ignore_index=True)
+    combined_df = pd.concat(parts, ignore_index=True)
 
     # Shuffle (scramble) the combined dataset
-    scrambled_df = combined_df.sample(frac=1, random_state=96).reset_index(drop=True)
+    scrambled_df = combined_df.sample(frac=1, random_state=shuffle_seed).reset_index(drop=True)
 
     scrambled_df.to_csv(output_file, index=False)
     print(f"\n✅ Dataset saved to '{output_file}' with {len(scrambled_df)} total rows (scrambled).")
 
+    parquet_file = os.path.splitext(output_file)[0] + ".parquet"
+    try:
+        # 'llm' has only num_chapters distinct values: store it as int8 with
+        # dictionary encoding; questions are nearly unique, so they are not
+        columnar_df = scrambled_df.astype({'llm': 'int8'})
+        columnar_df.to_parquet(parquet_file, engine='pyarrow', index=False, use_dictionary=['llm'])
+        print(f"✅ Columnar copy saved to '{parquet_file}'.")
+    except ImportError:
+        print("WARNING: pyarrow is not installed; skipping the Parquet copy.")
+
 if __name__ == "__main__":
-    create_router_dataset()
+    create_router_dataset(strategy="class_weights" if "--class-weights" in sys.argv else "min_size")
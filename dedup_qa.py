@@ -0,0 +1,200 @@
+import os
+import re
+import zlib
+import numpy as np
+import pandas as pd
+
+# Runs between generate_qa.py and create_router_dataset.py:
+# QA_Datasets/Chapter_{n}_QA.csv -> QA_Datasets_Dedup/Chapter_{n}_QA.csv
+
+INPUT_FOLDER = "QA_Datasets"
+OUTPUT_FOLDER = "QA_Datasets_Dedup"
+NUM_CHAPTERS = 18
+
+SHINGLE_SIZE = 5          # Character n-grams of the normalized question
+NUM_PERM = 128            # MinHash signature length
+BANDS = 16                # LSH bands of NUM_PERM // BANDS rows each (threshold ~0.71)
+JACCARD_THRESHOLD = 0.7   # Estimated Jaccard similarity that counts as a duplicate
+SEED = 42
+
+
+def normalize_question(text):
+    """Lowercase, strip punctuation (same as the router's clean_text) and collapse whitespace"""
+    text = re.sub(r'[^\w\s]', '', str(text).lower())
+    return ' '.join(text.split())
+
+
+def shingle_hashes(text, k=SHINGLE_SIZE):
+    """crc32 of every k-character shingle (the whole text if it is shorter than k)"""
+    if len(text) <= k:
+        grams = {text}
+    else:
+        grams = {text[i:i + k] for i in range(len(text) - k + 1)}
+    return np.fromiter((zlib.crc32(g.encode('utf-8')) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+def minhash_signatures(texts, num_perm=NUM_PERM, seed=SEED):
+    """
+    One MinHash signature per text, shape (len(texts), num_perm).
+
+    Uses multiply-shift hashing (a * x + b) >> 32 on the 32-bit shingle
+    hashes; uint64 arithmetic wraps, which is what the scheme relies on.
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2**63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(texts), num_perm), dtype=np.uint32)
+    with np.errstate(over='ignore'):
+        for i, text in enumerate(texts):
+            x = shingle_hashes(text)
+            hashed = (a[:, None] * x[None, :] + b[:, None]) >> np.uint64(32)
+            signatures[i] = hashed.min(axis=1)
+    return signatures
+
+
+class UnionFind:
+    def __init__(self, n):
+        self.parent = np.arange(n)
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, i, j):
+        ri, rj = self.find(i), self.find(j)
+        if ri != rj:
+            # Lower index becomes the root, so the earliest row is kept
+            self.parent[max(ri, rj)] = min(ri, rj)
+
+
+def find_near_duplicates(signatures, bands=BANDS, threshold=JACCARD_THRESHOLD):
+    """
+    Cluster near-duplicate rows with LSH banding.
+
+    Rows sharing any band bucket are compared with that bucket's first row
+    only, so the work stays linear in the number of rows even for large
+    buckets of exact duplicates.
+
+    Returns:
+        (union_find, pairs): clusters, and the (i, j, estimated_jaccard) pairs merged
+    """
+    n, num_perm = signatures.shape
+    rows = num_perm // bands
+    uf = UnionFind(n)
+    pairs = []
+    for band in range(bands):
+        buckets = {}
+        block = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for i in range(n):
+            key = block[i].tobytes()
+            first = buckets.setdefault(key, i)
+            if first == i or uf.find(first) == uf.find(i):
+                continue
+            similarity = float(np.mean(signatures[first] == signatures[i]))
+            if similarity >= threshold:
+                uf.union(first, i)
+                pairs.append((first, i, similarity))
+    return uf, pairs
+
+
+def dedup_qa_datasets(input_folder=INPUT_FOLDER, output_folder=OUTPUT_FOLDER, num_chapters=NUM_CHAPTERS,
+                      cross_chapter="keep_first", threshold=JACCARD_THRESHOLD):
+    """
+    Remove near-duplicate questions within and across the chapter QA CSVs.
+
+    Args:
+        cross_chapter: 'keep_first' keeps the earliest question of a cluster
+            that spans several chapters; 'drop' removes every member of such
+            clusters, since the router cannot label them consistently.
+
+    Returns:
+        DataFrame of per-chapter stats (rows before/after, removed within/across chapters)
+    """
+    frames = []
+    loaded = []
+    for i in range(1, num_chapters + 1):
+        file_path = os.path.join(input_folder, f"Chapter_{i}_QA.csv")
+        try:
+            df = pd.read_csv(file_path)
+        except FileNotFoundError:
+            print(f"ERROR: File not found - {file_path}. Skipping.")
+            continue
+        except pd.errors.EmptyDataError:
+            print(f"WARNING: Empty file - {file_path}. Skipping.")
+            continue
+        if 'question' not in df.columns:
+            print(f"WARNING: 'question' column not found in Chapter_{i}_QA.csv. Skipping this file.")
+            continue
+        df['_chapter'] = i
+        frames.append(df)
+        loaded.append(i)
+
+    if not frames:
+        print("No data found. Exiting.")
+        return None
+
+    data = pd.concat(frames, ignore_index=True)
+    normalized = [normalize_question(q) for q in data['question']]
+    print(f"Computing MinHash signatures for {len(data)} questions...")
+    signatures = minhash_signatures(normalized)
+    uf, pairs = find_near_duplicates(signatures, threshold=threshold)
+
+    roots = np.array([uf.find(i) for i in range(len(data))], dtype=int)
+    chapters = data['_chapter'].to_numpy()
+    root_chapters = pd.Series(chapters).groupby(roots).nunique()
+    cross_roots = set(root_chapters[root_chapters > 1].index)
+
+    keep = roots == np.arange(len(data))
+    # A removed row counts as cross-chapter if its kept representative (the
+    # cluster root) is in another chapter, or if 'drop' removed its whole cluster
+    is_cross = chapters[roots] != chapters
+    if cross_chapter == "drop":
+        in_cross_cluster = np.isin(roots, list(cross_roots))
+        keep &= ~in_cross_cluster
+        is_cross |= in_cross_cluster
+
+    # Report cross-chapter collisions: these are router label noise
+    collisions = [(i, j, sim) for i, j, sim in pairs if chapters[i] != chapters[j]]
+    if collisions:
+        report = pd.DataFrame({
+            'chapter_a': chapters[[i for i, _, _ in collisions]],
+            'question_a': data['question'].to_numpy()[[i for i, _, _ in collisions]],
+            'chapter_b': chapters[[j for _, j, _ in collisions]],
+            'question_b': data['question'].to_numpy()[[j for _, j, _ in collisions]],
+            'similarity': [sim for _, _, sim in collisions],
+        })
+        os.makedirs(output_folder, exist_ok=True)
+        report.to_csv(os.path.join(output_folder, "cross_chapter_collisions.csv"), index=False)
+
+    os.makedirs(output_folder, exist_ok=True)
+    stats = []
+    for i in loaded:
+        in_chapter = chapters == i
+        removed = in_chapter & ~keep
+        stats.append({
+            'chapter': i,
+            'before': int(in_chapter.sum()),
+            'after': int((in_chapter & keep).sum()),
+            'removed_within': int((removed & ~is_cross).sum()),
+            'removed_cross': int((removed & is_cross).sum()),
+        })
+        out = data[in_chapter & keep].drop(columns=['_chapter'])
+        out.to_csv(os.path.join(output_folder, f"Chapter_{i}_QA.csv"), index=False)
+
+    stats = pd.DataFrame(stats)
+    print("\n" + stats.to_string(index=False))
+    total_before, total_after = stats['before'].sum(), stats['after'].sum()
+    removed_share = (total_before - total_after) / total_before if total_before else 0.0
+    print(f"\nRemoved {total_before - total_after} of {total_before} questions "
+          f"({removed_share:.1%}); "
+          f"{len(cross_roots)} clusters span several chapters ({len(collisions)} cross-chapter collisions).")
+    print(f"✅ Deduplicated datasets saved to '{output_folder}'.")
+    return stats
+
+
+if __name__ == "__main__":
+    dedup_qa_datasets()
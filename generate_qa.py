@@ -1,14 +1,216 @@
 import os
-import csv
+import sys
 import time
-import google.generativeai as genai
+import hashlib
+import tempfile
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from rate_limit import TokenBucket, backoff_delay
+from llm_cache import ResponseCache
+from qa_journal import QAJournal
+from verse_manifest import file_hash, load_manifest
 
 # Configure Gemini API
 # IMPORTANT: Replace with your actual API key in your local environment
 # It's safer to use environment variables, but for this script, we'll use the placeholder
 GEMINI_API_KEY = "suck_my_dick"  # Replace with your actual API key
-genai.configure(api_key=GEMINI_API_KEY)
+
+MODEL_NAME = 'gemini-2.5-flash'
+
+# Parallel generation budgets (see process_chapters_parallel)
+REQUESTS_PER_MINUTE = 10
+TOKENS_PER_MINUTE = 250_000
+MAX_WORKERS = 4
+MAX_RETRIES = 5                # Retries on rate-limit errors (other errors get one retry)
+OUTPUT_TOKENS_ESTIMATE = 2000  # Reply size assumed when charging the tokens-per-minute budget
+
+class RateLimitError(Exception):
+    """Raised by model clients (or FakeModel) when the API reports a rate limit"""
+
+class QAModel:
+    """
+    Interface between the generator and an LLM.
+    
+    Subclasses implement generate(prompt) and return the raw reply text.
+    Clients that can stream also override generate_stream(prompt) to yield
+    the reply in chunks as the model produces it.
+    """
+    name = "model"
+    
+    def generate(self, prompt):
+        raise NotImplementedError
+    
+    def generate_stream(self, prompt):
+        yield self.generate(prompt)
+
+class GeminiModel(QAModel):
+    """Gemini client used for real runs"""
+    
+    def __init__(self, model_name=MODEL_NAME):
+        # Imported here so FakeModel runs (tests, benchmarks) without the Gemini SDK
+        import google.generativeai as genai
+
+        genai.configure(api_key=GEMINI_API_KEY)
+        self.name = model_name
+        self.model = genai.GenerativeModel(model_name)
+    
+    def generate(self, prompt):
+        return self.model.generate_content(prompt).text
+    
+    def generate_stream(self, prompt):
+        for chunk in self.model.generate_content(prompt, stream=True):
+            if chunk.parts:
+                yield chunk.text
+
+class FakeModel(QAModel):
+    """
+    Offline stand-in for tests and benchmarks.
+    
+    Returns `pairs` deterministic Q&A pairs per prompt after sleeping
+    `latency` seconds. With rate_limit_every=N, every Nth call raises
+    RateLimitError instead. generate_stream yields the same reply in
+    `chunk_size`-character pieces, spreading the latency across them.
+    """
+    name = "fake"
+    
+    def __init__(self, pairs=8, latency=0.0, rate_limit_every=0, chunk_size=64):
+        self.pairs = pairs
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.chunk_size = chunk_size
+        self.calls = 0
+        self.lock = threading.Lock()
+    
+    def _reply(self, prompt):
+        with self.lock:
+            self.calls += 1
+            calls = self.calls
+        if self.rate_limit_every and calls % self.rate_limit_every == 0:
+            raise RateLimitError("429 fake rate limit")
+        digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:8]
+        return "\n\n".join(
+            f"Q: How do I handle situation {i} ({digest})?\nA: Act with steady mind, situation {i} will pass."
+            for i in range(1, self.pairs + 1)
+        )
+    
+    def generate(self, prompt):
+        reply = self._reply(prompt)
+        time.sleep(self.latency)
+        return reply
+    
+    def generate_stream(self, prompt):
+        reply = self._reply(prompt)
+        chunks = [reply[i:i + self.chunk_size] for i in range(0, len(reply), self.chunk_size)]
+        for chunk in chunks:
+            time.sleep(self.latency / len(chunks))
+            yield chunk
+
+def is_rate_limit_error(error):
+    """True for RateLimitError and Gemini's 429 ResourceExhausted errors"""
+    if isinstance(error, RateLimitError):
+        return True
+    if getattr(error, 'code', None) == 429 or type(error).__name__ == 'ResourceExhausted':
+        return True
+    return '429' in str(error)
+
+def estimate_tokens(prompt):
+    """Rough tokens charged for one call: ~4 characters per prompt token plus the expected reply"""
+    return len(prompt) // 4 + OUTPUT_TOKENS_ESTIMATE
+
+class GenerationBudget:
+    """Requests-per-minute and tokens-per-minute token buckets shared by all workers"""
+    
+    def __init__(self, requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE):
+        # Buckets hold up to ten seconds of budget, so workers start promptly
+        # without bursting through a whole minute's quota at once.
+        self.requests = TokenBucket(requests_per_minute / 60, capacity=max(1.0, requests_per_minute / 6))
+        self.tokens = TokenBucket(tokens_per_minute / 60, capacity=max(1.0, tokens_per_minute / 6))
+    
+    def acquire(self, prompt):
+        self.requests.acquire()
+        self.tokens.acquire(estimate_tokens(prompt))
+
+def call_with_backoff(model, prompt, max_retries=MAX_RETRIES, budget=None, call=None):
+    """
+    Call model.generate(prompt) (or `call(prompt)`), charging `budget` before
+    every attempt.
+    
+    Rate-limit errors are retried up to max_retries times with jittered
+    exponential backoff; any other error is retried once.
+    """
+    call = call or model.generate
+    for attempt in range(max_retries + 1):
+        if budget is not None:
+            budget.acquire(prompt)
+        try:
+            return call(prompt)
+        except Exception as e:
+            if attempt == max_retries or (attempt >= 1 and not is_rate_limit_error(e)):
+                raise
+            time.sleep(backoff_delay(attempt, base=2.0, cap=60.0))
+
+def cached_generate(model, prompt, cache=None, budget=None):
+    """
+    Reply for `prompt`, from `cache` (a ResponseCache) when possible.
+    
+    Cache hits cost no model call and no budget. Misses go through
+    call_with_backoff and are stored.
+    
+    Returns:
+        (reply_text, cache_hit)
+    """
+    if cache is not None:
+        cached = cache.get(model.name, prompt)
+        if cached is not None:
+            return cached, True
+    text = call_with_backoff(model, prompt, budget=budget)
+    if cache is not None:
+        cache.put(model.name, prompt, text)
+    return text, False
+
+def stream_qa_pairs(model, prompt, on_pair=None, cache=None, budget=None, on_start=None):
+    """
+    Streaming counterpart of cached_generate + parse_qa_response.
+    
+    The reply is consumed chunk by chunk through a QAStreamParser and each
+    pair is passed to `on_pair` as soon as it is complete. The full reply
+    text is only kept when it has to be stored in `cache`. If the stream
+    fails, the verse is retried from scratch; `on_start` is called before
+    every attempt, so a writer can drop the pairs of a failed one.
+    
+    Returns:
+        (qa_pairs, cache_hit)
+    """
+    if cache is not None:
+        cached = cache.get(model.name, prompt)
+        if cached is not None:
+            if on_start:
+                on_start()
+            qa_pairs = parse_qa_response(cached)
+            for qa in qa_pairs:
+                if on_pair:
+                    on_pair(qa)
+            return qa_pairs, True
+    
+    def consume(prompt):
+        if on_start:
+            on_start()
+        parser = QAStreamParser()
+        chunks = [] if cache is not None else None
+        qa_pairs = []
+        for chunk in model.generate_stream(prompt):
+            if chunks is not None:
+                chunks.append(chunk)
+            qa_pairs.extend(parser.feed(chunk, on_pair))
+        qa_pairs.extend(parser.close(on_pair))
+        return qa_pairs, chunks
+    
+    qa_pairs, chunks = call_with_backoff(model, prompt, budget=budget, call=consume)
+    if cache is not None:
+        cache.put(model.name, prompt, ''.join(chunks))
+    return qa_pairs, False
 
 def read_verse_file(filepath):
     """Read a verse file and extract its content"""
@@ -40,11 +242,8 @@ def get_chapter_persona(chapter_num):
     }
     return personas.get(chapter_num, "a divine, enlightened being")
 
-def generate_qa_pairs(verse_content, chapter_num, verse_num, model):
-    """
-    Generate Q&A pairs for real-life problems based on the verse's wisdom.
-    The AI generates both realistic user questions and divine answers from ALL possible angles.
-    """
+def build_prompt(verse_content, chapter_num):
+    """Build the generation prompt for one verse"""
     
     persona = get_chapter_persona(chapter_num)
     
@@ -90,20 +289,43 @@ A: [Your divine answer in one short paragraph]
 (Continue generating as many Q&A pairs as you can think of)
 
 CRITICAL: Generate maximum Q&A pairs exploring different angles. Do not generate questions about the verse itself, Sanskrit terms, or Gita characters."""
+    return prompt
+
+def generate_qa_pairs(verse_content, chapter_num, verse_num, model, cache=None, cache_stats=None):
+    """
+    Generate Q&A pairs for real-life problems based on the verse's wisdom.
+    The AI generates both realistic user questions and divine answers from ALL possible angles.
+    
+    If `cache_stats` is given, its 'hits'/'misses' counters are updated.
+    """
+    
+    prompt = build_prompt(verse_content, chapter_num)
+    try:
+        text, hit = cached_generate(model, prompt, cache)
+    except Exception as e:
+        print(f"Generation failed for Chapter {chapter_num}, Verse {verse_num}: {e}")
+        return None
+    if cache_stats is not None:
+        cache_stats['hits' if hit else 'misses'] += 1
+    return text
 
+def generate_qa_pairs_streaming(verse_content, chapter_num, verse_num, model, cache=None, cache_stats=None,
+                                on_pair=None, on_start=None):
+    """
+    Like generate_qa_pairs, but streams the reply and returns the parsed
+    Q&A pairs (None on failure). `on_pair` is called for every pair as soon
+    as its answer is complete, `on_start` before every attempt (see
+    stream_qa_pairs).
+    """
+    prompt = build_prompt(verse_content, chapter_num)
     try:
-        response = model.generate_content(prompt)
-        return response.text
+        qa_pairs, hit = stream_qa_pairs(model, prompt, on_pair, cache, on_start=on_start)
     except Exception as e:
-        print(f"Error generating Q&A for Chapter {chapter_num}, Verse {verse_num}: {e}")
-        try:
-            print("Retrying after error...")
-            time.sleep(5)
-            response = model.generate_content(prompt)
-            return response.text
-        except Exception as e2:
-            print(f"Retry failed for Chapter {chapter_num}, Verse {verse_num}: {e2}")
-            return None
+        print(f"Generation failed for Chapter {chapter_num}, Verse {verse_num}: {e}")
+        return None
+    if cache_stats is not None:
+        cache_stats['hits' if hit else 'misses'] += 1
+    return qa_pairs
 
 def parse_qa_response(response_text):
     """Parse the Gemini response into a list of Q&A pairs"""
@@ -141,8 +363,93 @@ def parse_qa_response(response_text):
     
     return qa_pairs
 
-def process_chapter(chapter_num, input_dir, output_dir, model):
-    """Process all verses in a chapter and generate Q&A CSV"""
+class QAStreamParser:
+    """
+    Incremental version of parse_qa_response.
+    
+    feed() takes reply chunks of any size and returns the pairs completed so
+    far; a pair is complete once the next "Q:" line starts. close() flushes
+    the last pair. Fed the same text in any chunking, it yields exactly the
+    pairs parse_qa_response would.
+    """
+    
+    def __init__(self):
+        self.buffer = ''
+        self.current_question = None
+        self.current_answer = []
+    
+    def feed(self, chunk, on_pair=None):
+        self.buffer += chunk
+        *lines, self.buffer = self.buffer.split('\n')
+        return [qa for qa in (self._line(line, on_pair) for line in lines) if qa]
+    
+    def close(self, on_pair=None):
+        qa_pairs = []
+        if self.buffer:
+            qa = self._line(self.buffer, on_pair)
+            self.buffer = ''
+            if qa:
+                qa_pairs.append(qa)
+        qa = self._finish(on_pair)
+        if qa:
+            qa_pairs.append(qa)
+        self.current_question = None
+        return qa_pairs
+    
+    def _finish(self, on_pair):
+        if not (self.current_question and self.current_answer):
+            return None
+        qa = {
+            'question': self.current_question,
+            'answer': ' '.join(self.current_answer).strip()
+        }
+        if on_pair:
+            on_pair(qa)
+        return qa
+    
+    def _line(self, line, on_pair):
+        line = line.strip()
+        if not line:
+            return None
+        
+        if line.startswith('Q:'):
+            qa = self._finish(on_pair)
+            self.current_question = line[2:].strip()
+            self.current_answer = []
+            return qa
+        
+        if line.startswith('A:'):
+            self.current_answer.append(line[2:].strip())
+        elif self.current_question:
+            self.current_answer.append(line)
+        return None
+
+def verse_hashes(chapter_dir, verse_files):
+    """
+    Current text hash of every verse file, taken from the scraper's manifest
+    (or from the file itself when the verse is not in the manifest).
+    """
+    manifest = load_manifest(chapter_dir)
+    hashes = {}
+    for verse_file in verse_files:
+        verse_num = int(verse_file.stem.split('_')[-1])
+        entry = manifest.get(verse_num)
+        hashes[verse_num] = entry['sha256'] if entry else file_hash(verse_file)
+    return hashes
+
+def process_chapter(chapter_num, input_dir, output_dir, model, resume=True, cache=None, stream=False):
+    """
+    Process all verses in a chapter and generate Q&A CSV
+    
+    Each verse's pairs are appended to the chapter's QAJournal as soon as they
+    are generated. With resume=True, verses already in the journal with the
+    same text hash (from an earlier or crashed run) are skipped, so only new
+    or changed verses reach the model; resume=False starts a fresh journal.
+    Replies found in `cache` (a ResponseCache) are reused without a model call.
+    With stream=True the reply is parsed while it streams in and each pair is
+    written to the journal as soon as its answer is complete; the verse
+    counts as done once its whole reply has been read.
+    """
     
     chapter_dir = Path(input_dir) / f"Bhagavad_Gita_Chapter_{chapter_num}"
     
@@ -161,55 +468,259 @@ def process_chapter(chapter_num, input_dir, output_dir, model):
     print(f"Gemini will generate Q&A pairs from ALL possible angles")
     print(f"{'='*70}")
     
-    all_qa_pairs = []
     output_file = Path(output_dir) / f"Chapter_{chapter_num}_QA.csv"
+    hashes = verse_hashes(chapter_dir, verse_files)
+    generated = 0
+    cache_stats = {'hits': 0, 'misses': 0}
     
-    for verse_file in verse_files:
-        verse_num = int(verse_file.stem.split('_')[-1])
-        print(f"Processing Chapter {chapter_num}, Verse {verse_num}/{len(verse_files)}...", end=" ")
-        
-        verse_content = read_verse_file(verse_file)
-        qa_response = generate_qa_pairs(verse_content, chapter_num, verse_num, model)
+    with QAJournal(output_dir, chapter_num, fresh=not resume) as journal:
+        todo = [(int(f.stem.split('_')[-1]), f) for f in verse_files]
+        todo = [(verse_num, f) for verse_num, f in todo if not journal.is_done(verse_num, hashes[verse_num])]
+        if len(todo) < len(verse_files):
+            print(f"Resuming: {len(verse_files) - len(todo)} verses already generated")
         
-        if qa_response:
-            qa_pairs = parse_qa_response(qa_response)
+        for verse_num, verse_file in todo:
+            print(f"Processing Chapter {chapter_num}, Verse {verse_num}/{len(verse_files)}...", end=" ")
             
-            for qa in qa_pairs:
-                qa['chapter'] = chapter_num
-                qa['verse_source'] = f"{chapter_num}.{verse_num}"
-                all_qa_pairs.append(qa)
+            verse_content = read_verse_file(verse_file)
+            hits_before = cache_stats['hits']
+            sha = hashes[verse_num]
+            if stream:
+                def on_pair(qa):
+                    journal.append_pair(verse_num, sha, qa)
+                    print("·", end="", flush=True)
+                
+                qa_pairs = generate_qa_pairs_streaming(verse_content, chapter_num, verse_num, model, cache, cache_stats,
+                                                       on_pair=on_pair,
+                                                       on_start=lambda: journal.start_verse(verse_num))
+            else:
+                qa_response = generate_qa_pairs(verse_content, chapter_num, verse_num, model, cache, cache_stats)
+                qa_pairs = parse_qa_response(qa_response) if qa_response else None
             
-            print(f"✓ Generated {len(qa_pairs)} Q&A pairs (Total: {len(all_qa_pairs)})")
+            if qa_pairs is not None:
+                if stream:
+                    journal.finish_verse(verse_num, sha)
+                else:
+                    journal.append(verse_num, sha, qa_pairs)
+                generated += len(qa_pairs)
+                print(f"✓ Generated {len(qa_pairs)} Q&A pairs (Total this run: {generated})")
+            else:
+                print("✗ Failed")
             
-            # Save progress every 5 verses
-            if verse_num % 5 == 0 and all_qa_pairs:
-                with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-                    fieldnames = ['chapter', 'verse_source', 'question', 'answer']
-                    writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-                    writer.writeheader()
-                    writer.writerows(all_qa_pairs)
-                print(f"  💾 Saved progress to {output_file.name}")
-        else:
-            print("✗ Failed")
-        
-        time.sleep(2)  # Be respectful to API
-    
-    # Final save
-    if all_qa_pairs:
-        with open(output_file, 'w', newline='', encoding='utf-8') as csvfile:
-            fieldnames = ['chapter', 'verse_source', 'question', 'answer']
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(all_qa_pairs)
+            if cache_stats['hits'] == hits_before:
+                time.sleep(2)  # Be respectful to API
         
+        # Final save
+        total = journal.materialize(output_file, hashes)
+    
+    if total:
         print(f"\n{'='*70}")
         print(f"✓ Chapter {chapter_num} complete!")
-        print(f"  Total Q&A pairs: {len(all_qa_pairs)}")
+        print(f"  Total Q&A pairs: {total}")
         print(f"  Saved to: {output_file}")
+        if cache is not None:
+            print(f"  Cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses")
         print(f"{'='*70}")
     else:
         print(f"\n✗ No Q&A pairs generated for Chapter {chapter_num}")
 
+def generate_verse(chapter_num, verse_num, verse_file, model, budget, cache=None, stream=False, journal=None,
+                   sha=None):
+    """
+    Generate and parse the Q&A pairs for one verse (one scheduler job)
+    
+    With stream=True and a `journal`, each pair is written to it with
+    append_pair as soon as it is complete; the caller marks the verse done.
+    
+    Returns:
+        (qa_pairs, cache_hit)
+    """
+    prompt = build_prompt(read_verse_file(verse_file), chapter_num)
+    if stream:
+        if journal is None:
+            return stream_qa_pairs(model, prompt, cache=cache, budget=budget)
+        return stream_qa_pairs(model, prompt, lambda qa: journal.append_pair(verse_num, sha, qa), cache, budget,
+                               on_start=lambda: journal.start_verse(verse_num))
+    text, hit = cached_generate(model, prompt, cache, budget)
+    return parse_qa_response(text), hit
+
+def process_chapters_parallel(chapter_nums, input_dir, output_dir, model, resume=True, cache=None, stream=False,
+                              requests_per_minute=REQUESTS_PER_MINUTE, tokens_per_minute=TOKENS_PER_MINUTE,
+                              max_workers=MAX_WORKERS):
+    """
+    Generate Q&A for several chapters at once.
+    
+    Verse jobs from every chapter share one thread pool and one
+    GenerationBudget, so the run is paced by the requests-per-minute and
+    tokens-per-minute limits instead of fixed sleeps. Results go straight to
+    each chapter's QAJournal (see process_chapter for `resume`, `cache` and `stream`),
+    and a chapter's CSV is materialized as soon as its last verse finishes.
+    
+    Returns:
+        dict with verses, failed, pairs, cache_hits, cache_misses, seconds,
+        verses_per_min, pairs_per_min
+    """
+    jobs = []
+    chapters = {}
+    for chapter_num in chapter_nums:
+        chapter_dir = Path(input_dir) / f"Bhagavad_Gita_Chapter_{chapter_num}"
+        verse_files = sorted(chapter_dir.glob("Chapter_*.txt"))
+        if not verse_files:
+            print(f"No verse files found in {chapter_dir}")
+            continue
+        
+        hashes = verse_hashes(chapter_dir, verse_files)
+        journal = QAJournal(output_dir, chapter_num, fresh=not resume)
+        output_file = Path(output_dir) / f"Chapter_{chapter_num}_QA.csv"
+        todo = [(chapter_num, int(f.stem.split('_')[-1]), f) for f in verse_files]
+        todo = [job for job in todo if not journal.is_done(job[1], hashes[job[1]])]
+        if not todo:
+            # Nothing to generate, but a crashed run may not have written the CSV
+            journal.materialize(output_file, hashes)
+            journal.close()
+            print(f"✓ Chapter {chapter_num} is up to date")
+            continue
+        
+        chapters[chapter_num] = {
+            "journal": journal,
+            "hashes": hashes,
+            "output_file": output_file,
+            "pending": len(todo),
+            "hits": 0,
+            "misses": 0,
+        }
+        jobs.extend(todo)
+    
+    print(f"\nScheduling {len(jobs)} verses from {len(chapters)} chapters "
+          f"({max_workers} workers, {requests_per_minute} RPM, {tokens_per_minute} TPM)")
+    
+    budget = GenerationBudget(requests_per_minute, tokens_per_minute)
+    done = failed = total_pairs = 0
+    start = time.perf_counter()
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(generate_verse, *job, model, budget, cache, stream,
+                                   journal=chapters[job[0]]["journal"], sha=chapters[job[0]]["hashes"][job[1]]): job
+                       for job in jobs}
+            for future in as_completed(futures):
+                chapter_num, verse_num, _ = futures[future]
+                state = chapters[chapter_num]
+                try:
+                    qa_pairs, hit = future.result()
+                except Exception as e:
+                    failed += 1
+                    print(f"Chapter {chapter_num}, Verse {verse_num} ✗ Failed: {e}")
+                else:
+                    done += 1
+                    total_pairs += len(qa_pairs)
+                    state["hits" if hit else "misses"] += 1
+                    if stream:
+                        state["journal"].finish_verse(verse_num, state["hashes"][verse_num])
+                    else:
+                        state["journal"].append(verse_num, state["hashes"][verse_num], qa_pairs)
+                    print(f"Chapter {chapter_num}, Verse {verse_num} ✓ Generated {len(qa_pairs)} Q&A pairs")
+                
+                state["pending"] -= 1
+                if state["pending"] == 0:
+                    rows = state["journal"].materialize(state["output_file"], state["hashes"])
+                    state["journal"].close()
+                    print(f"  💾 Chapter {chapter_num} complete: {rows} Q&A pairs -> {state['output_file'].name}")
+                    if cache is not None:
+                        print(f"     Cache: {state['hits']} hits, {state['misses']} misses")
+    finally:
+        # Flush whatever finished if the run is interrupted
+        for state in chapters.values():
+            state["journal"].close()
+    
+    elapsed = time.perf_counter() - start
+    minutes = elapsed / 60 if elapsed > 0 else float('inf')
+    stats = {
+        "verses": done,
+        "failed": failed,
+        "pairs": total_pairs,
+        "cache_hits": sum(state["hits"] for state in chapters.values()),
+        "cache_misses": sum(state["misses"] for state in chapters.values()),
+        "seconds": elapsed,
+        "verses_per_min": done / minutes,
+        "pairs_per_min": total_pairs / minutes,
+    }
+    print(f"\n{'='*70}")
+    print(f"Generated {done} verses ({failed} failed), {total_pairs} Q&A pairs in {elapsed:.1f}s")
+    print(f"Throughput: {stats['verses_per_min']:.1f} verses/min, {stats['pairs_per_min']:.1f} pairs/min")
+    print(f"{'='*70}")
+    return stats
+
+def replay_from_cache(chapter_nums, input_dir, output_dir, cache, model_name=MODEL_NAME):
+    """
+    Rebuild the QA journals and CSVs purely from cached replies.
+    
+    No model is called: each verse's prompt is rebuilt and looked up in
+    `cache`. Useful after changing parse_qa_response or the CSV layout.
+    Cached replies are re-parsed and appended as each verse's latest journal
+    record, unless that record already holds the same pairs for the current
+    text (so repeated replays don't grow the journal). Verses without a cached
+    reply (evicted, or generated with --no-cache) keep their existing journal
+    record; only misses with no record for the current text are left out.
+    """
+    for chapter_num in chapter_nums:
+        chapter_dir = Path(input_dir) / f"Bhagavad_Gita_Chapter_{chapter_num}"
+        verse_files = sorted(chapter_dir.glob("Chapter_*.txt"))
+        if not verse_files:
+            print(f"No verse files found in {chapter_dir}")
+            continue
+        
+        hashes = verse_hashes(chapter_dir, verse_files)
+        output_file = Path(output_dir) / f"Chapter_{chapter_num}_QA.csv"
+        hits = same = kept = missing = 0
+        with QAJournal(output_dir, chapter_num) as journal:
+            for verse_file in verse_files:
+                verse_num = int(verse_file.stem.split('_')[-1])
+                done = journal.is_done(verse_num, hashes[verse_num])
+                text = cache.get(model_name, build_prompt(read_verse_file(verse_file), chapter_num))
+                if text is not None:
+                    qa_pairs = parse_qa_response(text)
+                    if done and journal.pairs(verse_num) == qa_pairs:
+                        same += 1
+                        continue
+                    hits += 1
+                    journal.append(verse_num, hashes[verse_num], qa_pairs)
+                elif done:
+                    kept += 1
+                else:
+                    missing += 1
+            rows = journal.materialize(output_file, hashes)
+        print(f"Chapter {chapter_num}: {rows} Q&A pairs -> {output_file.name} "
+              f"(cache: {hits} replayed, {same} already up to date, {kept} misses kept from the journal, "
+              f"{missing} misses without a record)")
+
+def benchmark_generation(chapters=18, verses_per_chapter=10, latency=0.2, max_workers=MAX_WORKERS,
+                         requests_per_minute=600, tokens_per_minute=10_000_000):
+    """
+    Run the parallel engine against FakeModel on synthetic verse files.
+    
+    Needs no network access. Prints measured throughput next to the idle
+    time the old sequential loop would spend (2s per verse + 5s per chapter).
+    """
+    model = FakeModel(latency=latency, rate_limit_every=25)
+    with tempfile.TemporaryDirectory() as tmp:
+        for chapter_num in range(1, chapters + 1):
+            chapter_dir = Path(tmp) / f"Bhagavad_Gita_Chapter_{chapter_num}"
+            chapter_dir.mkdir()
+            for verse_num in range(1, verses_per_chapter + 1):
+                (chapter_dir / f"Chapter_{chapter_num}_Verse_{verse_num:02d}.txt").write_text(
+                    f"BHAGAVAD GITA - CHAPTER {chapter_num}, VERSE {verse_num}\n", encoding='utf-8')
+        output_dir = Path(tmp) / "QA_Datasets"
+        output_dir.mkdir()
+        stats = process_chapters_parallel(range(1, chapters + 1), tmp, output_dir, model,
+                                          requests_per_minute=requests_per_minute,
+                                          tokens_per_minute=tokens_per_minute, max_workers=max_workers)
+    
+    verses = chapters * verses_per_chapter
+    sequential = verses * (latency + 2) + chapters * 5
+    print(f"Sequential loop estimate: {sequential:.1f}s ({verses / sequential * 60:.1f} verses/min)")
+    return stats
+
 def main():
     """Main function to process all chapters"""
     
@@ -218,8 +729,8 @@ def main():
     
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     
-    # Initialize Gemini model
-    model = genai.GenerativeModel('gemini-2.5-flash')
+    # Reply cache (the Gemini model is created after the --replay check; replay makes no calls)
+    cache = None if "--no-cache" in sys.argv else ResponseCache(Path(OUTPUT_DIR) / "llm_cache.sqlite")
     
     print("\n" + "="*70)
     print("BHAGAVAD GITA Q&A DATASET GENERATOR")
@@ -251,21 +762,40 @@ def main():
             print("Invalid input. Please use format like '1-3, 5, 18'. Exiting.")
             return
 
+    invalid = [c for c in process_list if c < 1 or c > 18]
+    for chapter_num in invalid:
+        print(f"Skipping invalid chapter number: {chapter_num}")
+    process_list = [c for c in process_list if c not in invalid]
+
+    if "--replay" in sys.argv:
+        # Rebuild CSVs from cached replies only (zero model calls)
+        replay_from_cache(process_list, INPUT_BASE_DIR, OUTPUT_DIR,
+                          cache or ResponseCache(Path(OUTPUT_DIR) / "llm_cache.sqlite"))
+        return
+
+    model = GeminiModel(MODEL_NAME)
+
+    resume = input("Resume previous progress (skip verses already generated from the same text)? (Y/n): ").strip().lower() != 'n'
+
+    stream = "--stream" in sys.argv
+
     print(f"\nProcessing chapters: {process_list}")
     print("Generating maximum Q&A pairs per verse\n")
 
-    # Process each chapter
-    for chapter_num in process_list:
-        if chapter_num < 1 or chapter_num > 18:
-            print(f"Skipping invalid chapter number: {chapter_num}")
-            continue
-        try:
-            process_chapter(chapter_num, INPUT_BASE_DIR, OUTPUT_DIR, model)
-            print(f"\nPausing before next chapter...\n")
-            time.sleep(5)
-        except Exception as e:
-            print(f"\n✗ Error processing Chapter {chapter_num}: {e}")
-            continue
+    if "--sequential" in sys.argv:
+        # Original one-chapter-at-a-time loop
+        for chapter_num in process_list:
+            try:
+                process_chapter(chapter_num, INPUT_BASE_DIR, OUTPUT_DIR, model, resume=resume, cache=cache,
+                                stream=stream)
+                print(f"\nPausing before next chapter...\n")
+                time.sleep(5)
+            except Exception as e:
+                print(f"\n✗ Error processing Chapter {chapter_num}: {e}")
+                continue
+    else:
+        process_chapters_parallel(process_list, INPUT_BASE_DIR, OUTPUT_DIR, model, resume=resume, cache=cache,
+                                  stream=stream)
     
     print("\n" + "="*70)
     print("✓ ALL SELECTED CHAPTERS PROCESSED!")
@@ -274,4 +804,7 @@ def main():
     print("Each CSV contains: chapter, verse_source, question, answer")
 
 if __name__ == "__main__":
-    main()
+    if "--benchmark" in sys.argv:
+        benchmark_generation()
+    else:
+        main()
@@ -0,0 +1,656 @@
+import copy
+import itertools
+import multiprocessing as mp
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future
+from functools import partial
+from adapter_manager import ADAPTER_MEMORY_BUDGET, AdapterManager, adapter_name, adapter_locator
+
+# Local inference worker: one process owns the base model and adapters,
+# the app submits jobs through a bounded queue and waits for the replies.
+MAX_NEW_TOKENS = 256
+QUEUE_SIZE = 64            # Pending jobs before submit() pushes back
+BATCH_WINDOW_S = 0.02      # How long the worker waits to fill a micro-batch
+MAX_BATCH_SIZE = 16
+SUBMIT_TIMEOUT_S = 1.0
+REQUEST_TIMEOUT_S = 300
+PREFIX_CACHE_SIZE = 64     # (adapter, prompt prefix) pairs whose past key/values are kept
+BENCHMARK_CLIENTS = (1, 4, 16)
+BENCHMARK_COUNCIL_SIZES = (1, 2, 3, 4)
+
+Job = namedtuple("Job", "job_id chapter prompt max_new_tokens stream prefix", defaults=(False, None))
+
+
+class WorkerBusy(RuntimeError):
+    """The request queue stayed full for the whole submit timeout"""
+
+
+class WorkerError(RuntimeError):
+    pass
+
+
+# ---------------------
+# Worker process
+# ---------------------
+def load_pretrained_worker(base_model_name, workdir, max_seq_length=2048):
+    """Worker factory for the app: the 4-bit base model plus the adapters found in `workdir`"""
+    from unsloth import FastLanguageModel
+
+    model, tokenizer = FastLanguageModel.from_pretrained(
+        model_name=base_model_name, max_seq_length=max_seq_length, load_in_4bit=True
+    )
+    return model, tokenizer, adapter_locator(workdir)
+
+
+class _GroupStreamer:
+    """
+    generate() streamer for a whole batch: decodes each streaming job's new
+    token ids as they arrive and sends the new text to the client.
+    """
+
+    def __init__(self, tokenizer, group, results):
+        self.tokenizer = tokenizer
+        self.group = group
+        self.results = results
+        self.ids = [[] for _ in group]
+        self.sent = [0] * len(group)
+        self.prompt_seen = False
+
+    def put(self, value):
+        # The first call carries the prompt ids, then one token per row per step
+        if not self.prompt_seen:
+            self.prompt_seen = True
+            return
+        tokens = value.reshape(-1).tolist()
+        for row, job in enumerate(self.group):
+            if not job.stream or len(self.ids[row]) >= job.max_new_tokens:
+                continue
+            self.ids[row].append(tokens[row])
+            text = self.tokenizer.decode(self.ids[row], skip_special_tokens=True)
+            # An incomplete multi-byte character decodes to U+FFFD; wait for the rest
+            if len(text) > self.sent[row] and not text.endswith("\ufffd"):
+                self.results.put(("token", job.job_id, text[self.sent[row]:]))
+                self.sent[row] = len(text)
+
+    def end(self):
+        pass
+
+
+class PrefixCache:
+    """
+    Past key/values of constant prompt prefixes (chat-template header plus a
+    chapter's system prompt), per adapter, so a request only prefills the
+    tokens after its prefix. LoRA changes the keys and values, so entries are
+    per adapter and dropped when the AdapterManager evicts that adapter.
+    """
+
+    def __init__(self, max_entries=PREFIX_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()   # (adapter name, prefix) -> (prefix ids, past key/values)
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, name):
+        for key in [key for key in self.entries if key[0] == name]:
+            del self.entries[key]
+
+    def get(self, model, tokenizer, name, prefix):
+        """(prefix ids, past key/values) for `prefix` under adapter `name`, which must be active"""
+        import torch
+
+        key = (name, prefix)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        ids = tokenizer([prefix], return_tensors="pt", add_special_tokens=False)['input_ids'].to(model.device)
+        with torch.no_grad():
+            past = model(input_ids=ids, use_cache=True).past_key_values
+        self.entries[key] = (ids[0], past)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return self.entries[key]
+
+
+def _generate_group(manager, tokenizer, group, mix_adapters, results, prefix_cache=None):
+    """
+    Run one generate() call for `group`.
+
+    A single job with a `prefix` starts from the prefix's cached past
+    key/values (in a batch, left padding would shift the prefix).
+
+    Returns:
+        ([(text, new_tokens) per job], timings), where text decodes only the
+        generated ids and timings holds the seconds spent per stage
+        (tokenize, adapter_load, generate, decode) and 'adapter_hit'
+    """
+    import torch
+
+    chapters = [job.chapter for job in group]
+    if mix_adapters:
+        context = manager.using_all(chapters)
+        extra = {'adapter_names': [adapter_name(c) for c in chapters]}
+    else:
+        context = manager.using(chapters[0])
+        extra = {}
+    timings = {}
+    start = time.perf_counter()
+    # Prompts come through the chat template, which already starts with BOS
+    enc = tokenizer([job.prompt for job in group], return_tensors="pt", padding=True, add_special_tokens=False)
+    timings['tokenize'] = time.perf_counter() - start
+    misses = manager.misses
+    start = time.perf_counter()
+    with context as model:
+        # Entering the context attaches any adapter that is not loaded yet
+        timings['adapter_load'] = time.perf_counter() - start
+        timings['adapter_hit'] = manager.misses == misses
+        if model is None:
+            raise WorkerError(f"adapter unavailable for chapter(s) {sorted(set(chapters))}")
+        enc = {k: v.to(model.device) for k, v in enc.items()}
+        if any(job.stream for job in group):
+            extra['streamer'] = _GroupStreamer(tokenizer, group, results)
+        if prefix_cache is not None and len(group) == 1 and group[0].prefix and not mix_adapters:
+            prefix_ids, past = prefix_cache.get(model, tokenizer, adapter_name(chapters[0]), group[0].prefix)
+            ids = enc['input_ids'][0]
+            # Only if the prompt tokenizes to the prefix's tokens plus more
+            if len(ids) > len(prefix_ids) and torch.equal(ids[:len(prefix_ids)], prefix_ids):
+                # generate() extends the cache in place; keep the stored one clean
+                extra['past_key_values'] = copy.deepcopy(past)
+        start = time.perf_counter()
+        with torch.no_grad():
+            out = model.generate(**enc, max_new_tokens=max(job.max_new_tokens for job in group),
+                                 pad_token_id=tokenizer.pad_token_id, **extra)
+        timings['generate'] = time.perf_counter() - start
+    start = time.perf_counter()
+    prompt_len = enc['input_ids'].shape[1]
+    replies = []
+    for row, job in enumerate(group):
+        new = out[row, prompt_len:prompt_len + job.max_new_tokens].cpu()
+        if tokenizer.pad_token_id is not None:
+            # Rows that finished early are padded out to the longest one
+            keep = (new != tokenizer.pad_token_id).nonzero()
+            new = new[:int(keep[-1]) + 1] if len(keep) else new[:0]
+        replies.append((tokenizer.decode(new, skip_special_tokens=True), len(new)))
+    timings['decode'] = time.perf_counter() - start
+    return replies, timings
+
+
+def _worker_main(factory, requests, results, batch_window, max_batch_size, mix_adapters, memory_budget):
+    try:
+        base_model, tokenizer, locate = factory()
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token_id is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        manager = AdapterManager(base_model, locate, memory_budget)
+        prefix_cache = PrefixCache()
+        manager.on_evict.append(prefix_cache.invalidate)
+    except Exception as e:
+        results.put(("startup", None, repr(e)))
+        return
+    results.put(("ready", None, None))
+
+    # Queue items are single Jobs, or a list of Jobs from council(), which is
+    # always generated as one mixed-adapter batch
+    stop = False
+    while not stop:
+        job = requests.get()
+        if job is None:
+            break
+        batch = [job]
+        deadline = time.monotonic() + batch_window
+        while len(batch) < max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                job = requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job is None:
+                stop = True
+                break
+            batch.append(job)
+
+        councils = [item for item in batch if isinstance(item, list)]
+        batch = [item for item in batch if not isinstance(item, list)]
+        if mix_adapters:
+            groups = [batch] if batch else []
+        else:
+            by_chapter = {}
+            for job in batch:
+                by_chapter.setdefault(job.chapter, []).append(job)
+            groups = list(by_chapter.values())
+        for group in groups + councils:
+            try:
+                mixed = mix_adapters or len({job.chapter for job in group}) > 1
+                replies, timings = _generate_group(manager, tokenizer, group, mixed, results, prefix_cache)
+                for job, (text, new_tokens) in zip(group, replies):
+                    results.put(("done", job.job_id, {'text': text, 'new_tokens': new_tokens,
+                                                      'batch_size': len(group), 'timings': timings}))
+            except Exception as e:
+                for job in group:
+                    results.put(("error", job.job_id, f"{type(e).__name__}: {e}"))
+
+
+# ---------------------
+# Client side
+# ---------------------
+class InferenceClient:
+    """
+    Starts the worker process and hands out Futures for submitted jobs.
+
+    Args:
+        factory: picklable callable run in the worker, returning
+            (base_model, tokenizer, locate) where locate(idx) finds chapter
+            idx's adapter (see adapter_manager.AdapterManager)
+        mix_adapters: put jobs for different chapters in the same batch via
+            PEFT's adapter_names instead of one batch per chapter
+    """
+
+    def __init__(self, factory, queue_size=QUEUE_SIZE, batch_window=BATCH_WINDOW_S,
+                 max_batch_size=MAX_BATCH_SIZE, mix_adapters=False, memory_budget=ADAPTER_MEMORY_BUDGET,
+                 startup_timeout=None):
+        ctx = mp.get_context("spawn")
+        self.queue_size = queue_size
+        self.requests = ctx.Queue(maxsize=queue_size)
+        self.results = ctx.Queue()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(factory, self.requests, self.results, batch_window, max_batch_size, mix_adapters, memory_budget),
+            daemon=True,
+        )
+        self.process.start()
+        status, _, error = self.results.get(timeout=startup_timeout)
+        if status != "ready":
+            self.process.join()
+            raise WorkerError(f"Inference worker failed to start: {error}")
+
+        self.ids = itertools.count()
+        self.pending = {}
+        self.streams = {}
+        self.lock = threading.Lock()
+        self.dispatcher = threading.Thread(target=self._dispatch, daemon=True)
+        self.dispatcher.start()
+
+    def _dispatch(self):
+        while True:
+            status, job_id, payload = self.results.get()
+            if status == "closed":
+                break
+            if status == "token":
+                tokens = self.streams.get(job_id)
+                if tokens is not None:
+                    tokens.put(payload)
+                continue
+            with self.lock:
+                future = self.pending.pop(job_id, None)
+                tokens = self.streams.pop(job_id, None)
+            if tokens is not None:
+                tokens.put(None)
+            if future is None:
+                continue
+            if status == "done":
+                future.set_result(payload)
+            else:
+                future.set_exception(WorkerError(payload))
+
+    def submit(self, chapter, prompt, max_new_tokens=MAX_NEW_TOKENS, timeout=SUBMIT_TIMEOUT_S, tokens=None,
+               prefix=None):
+        """
+        Queue one job.
+
+        Args:
+            tokens: optional queue.Queue that receives each piece of generated
+                text as it is produced, then None
+            prefix: optional constant start of `prompt` (e.g. chat template
+                and system prompt) whose past key/values the worker caches
+
+        Returns:
+            Future resolving to {'text', 'new_tokens', 'batch_size', 'timings'};
+            text is the generated reply only, without the prompt, and timings
+            the worker's stage seconds for the batch (see _generate_group)
+
+        Raises:
+            WorkerBusy: the queue stayed full for `timeout` seconds
+        """
+        future = Future()
+        job_id = next(self.ids)
+        with self.lock:
+            self.pending[job_id] = future
+            if tokens is not None:
+                self.streams[job_id] = tokens
+        try:
+            self.requests.put(Job(job_id, int(chapter), prompt, max_new_tokens, tokens is not None, prefix),
+                              timeout=timeout)
+        except queue.Full:
+            with self.lock:
+                self.pending.pop(job_id, None)
+                self.streams.pop(job_id, None)
+            raise WorkerBusy(f"Inference queue is full ({self.queue_size} jobs pending).")
+        return future
+
+    def council(self, chapters, prompts, max_new_tokens=MAX_NEW_TOKENS, timeout=SUBMIT_TIMEOUT_S):
+        """
+        Queue one job per chapter, answered together in a single generate()
+        call with each row using its own chapter's adapter.
+
+        Args:
+            chapters: chapter of each job
+            prompts: prompt of each job (same length as chapters)
+
+        Returns:
+            List of Futures, as from submit(), in `chapters` order
+
+        Raises:
+            WorkerBusy: the queue stayed full for `timeout` seconds
+        """
+        futures = [Future() for _ in chapters]
+        jobs = [Job(next(self.ids), int(chapter), prompt, max_new_tokens)
+                for chapter, prompt in zip(chapters, prompts)]
+        with self.lock:
+            self.pending.update((job.job_id, future) for job, future in zip(jobs, futures))
+        try:
+            self.requests.put(jobs, timeout=timeout)
+        except queue.Full:
+            with self.lock:
+                for job in jobs:
+                    self.pending.pop(job.job_id, None)
+            raise WorkerBusy(f"Inference queue is full ({self.queue_size} jobs pending).")
+        return futures
+
+    def generate(self, chapter, prompt, max_new_tokens=MAX_NEW_TOKENS, timeout=REQUEST_TIMEOUT_S, prefix=None):
+        """submit() and wait for the reply"""
+        return self.submit(chapter, prompt, max_new_tokens, prefix=prefix).result(timeout=timeout)
+
+    def stream(self, chapter, prompt, max_new_tokens=MAX_NEW_TOKENS, prefix=None):
+        """submit() in streaming mode; iterate the returned TokenStream for text pieces"""
+        tokens = queue.Queue()
+        start = time.perf_counter()
+        return TokenStream(self.submit(chapter, prompt, max_new_tokens, tokens=tokens, prefix=prefix), tokens, start)
+
+    def _fail_pending(self, job_ids, message):
+        with self.lock:
+            failed = [(self.pending.pop(job_id, None), self.streams.pop(job_id, None)) for job_id in job_ids]
+        for future, tokens in failed:
+            if tokens is not None:
+                tokens.put(None)
+            if future is not None and not future.done():
+                future.set_exception(WorkerError(message))
+
+    def close(self, timeout=REQUEST_TIMEOUT_S):
+        """
+        Stop the worker. Jobs still queued are dropped (their Futures fail with
+        WorkerError), so the shutdown sentinel never waits behind a full queue;
+        the batch being generated gets `timeout` seconds before the worker is
+        terminated.
+        """
+        dropped = []
+        try:
+            while True:
+                item = self.requests.get_nowait()
+                if item is not None:
+                    dropped += [job.job_id for job in (item if isinstance(item, list) else [item])]
+        except queue.Empty:
+            pass
+        self._fail_pending(dropped, "Inference client closed before the job started.")
+        try:
+            self.requests.put(None, timeout=SUBMIT_TIMEOUT_S)
+        except queue.Full:
+            pass   # Refilled by a concurrent submit(); terminated below
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        self.results.put(("closed", None, None))
+        self.dispatcher.join()
+        with self.lock:
+            leftover = list(self.pending)
+        self._fail_pending(leftover, "Inference worker stopped before the job finished.")
+
+
+class TokenStream:
+    """
+    Iterator over the pieces of text of one streaming job.
+
+    Once exhausted, `text` holds the full reply, `reply` the worker's whole
+    reply dict, and `ttft` / `total` the seconds from submission to the first
+    piece and to completion.
+    """
+
+    def __init__(self, future, tokens, start, timeout=REQUEST_TIMEOUT_S):
+        self.future = future
+        self.tokens = tokens
+        self.start = start
+        self.timeout = timeout
+        self.text = None
+        self.reply = None
+        self.ttft = None
+        self.total = None
+
+    def __iter__(self):
+        while True:
+            piece = self.tokens.get(timeout=self.timeout)
+            if piece is None:
+                break
+            if self.ttft is None:
+                self.ttft = time.perf_counter() - self.start
+            yield piece
+        reply = self.future.result(timeout=self.timeout)
+        self.total = time.perf_counter() - self.start
+        if self.ttft is None:
+            self.ttft = self.total
+        self.text = reply['text']
+        self.reply = reply
+
+
+# ---------------------
+# CPU benchmark: tiny random Llama + synthetic adapters
+# ---------------------
+class ByteTokenizer:
+    """Minimal tokenizer for tiny_llama(): one token per byte, 0 is padding"""
+    pad_token_id = 0
+    pad_token = "\0"
+    eos_token = None
+    padding_side = "left"
+
+    def __call__(self, texts, return_tensors="pt", padding=True, add_special_tokens=True):
+        import torch
+
+        ids = [[b % 127 + 1 for b in text.encode('utf-8')] for text in texts]
+        width = max(len(row) for row in ids)
+        input_ids = torch.zeros((len(ids), width), dtype=torch.long)
+        attention_mask = torch.zeros((len(ids), width), dtype=torch.long)
+        for row, tokens in enumerate(ids):
+            input_ids[row, width - len(tokens):] = torch.tensor(tokens)
+            attention_mask[row, width - len(tokens):] = 1
+        return {'input_ids': input_ids, 'attention_mask': attention_mask}
+
+    def decode(self, ids, skip_special_tokens=True):
+        return bytes(int(i) - 1 for i in ids if int(i) != 0).decode('utf-8', errors='replace')
+
+
+def tiny_worker(adapter_dir):
+    """Worker factory for benchmarks: tiny_llama() with the adapters saved in `adapter_dir`"""
+    from adapter_manager import tiny_llama
+
+    model = tiny_llama()
+    model.generation_config.eos_token_id = None   # always generate max_new_tokens
+    return model, ByteTokenizer(), adapter_locator(adapter_dir)
+
+
+def benchmark_worker(clients=BENCHMARK_CLIENTS, requests_per_client=8, max_new_tokens=32, chapters=4):
+    """
+    Tokens/s and p95 latency with 1/4/16 concurrent closed-loop clients, for
+    the micro-batching worker and for the same worker with batching disabled.
+    """
+    import tempfile
+    import numpy as np
+    from adapter_manager import make_synthetic_adapters
+
+    with tempfile.TemporaryDirectory() as adapter_dir:
+        make_synthetic_adapters(adapter_dir, chapters)
+        print(f"{'mode':>10} {'clients':>8} {'tokens/s':>10} {'p95 ms':>9} {'mean batch':>11}")
+        for label, kwargs in [("single", {'max_batch_size': 1, 'batch_window': 0}),
+                              ("batched", {}),
+                              ("mixed", {'mix_adapters': True})]:
+            client = InferenceClient(partial(tiny_worker, adapter_dir), **kwargs)
+            try:
+                for n_clients in clients:
+                    latencies, tokens, batches = [], [], []
+
+                    def run(c):
+                        for i in range(requests_per_client):
+                            t0 = time.perf_counter()
+                            reply = client.generate((c + i) % chapters + 1, f"question {c}-{i}: what is duty?",
+                                                    max_new_tokens)
+                            latencies.append(time.perf_counter() - t0)
+                            tokens.append(reply['new_tokens'])
+                            batches.append(reply['batch_size'])
+
+                    threads = [threading.Thread(target=run, args=(c,)) for c in range(n_clients)]
+                    start = time.perf_counter()
+                    for t in threads:
+                        t.start()
+                    for t in threads:
+                        t.join()
+                    wall = time.perf_counter() - start
+                    print(f"{label:>10} {n_clients:>8} {sum(tokens) / wall:>10.1f} "
+                          f"{np.percentile(latencies, 95) * 1000:>9.1f} {np.mean(batches):>11.1f}")
+            finally:
+                client.close()
+
+
+def benchmark_streaming(requests=8, max_new_tokens=64):
+    """Time to first token and total latency, streaming vs blocking, one request at a time"""
+    import tempfile
+    import numpy as np
+    from adapter_manager import make_synthetic_adapters
+
+    with tempfile.TemporaryDirectory() as adapter_dir:
+        make_synthetic_adapters(adapter_dir, 1)
+        client = InferenceClient(partial(tiny_worker, adapter_dir))
+        try:
+            blocking, ttft, total = [], [], []
+            for i in range(requests):
+                t0 = time.perf_counter()
+                client.generate(1, f"question {i}: what is duty?", max_new_tokens)
+                blocking.append(time.perf_counter() - t0)
+                stream = client.stream(1, f"question {i}: what is duty?", max_new_tokens)
+                for _ in stream:
+                    pass
+                ttft.append(stream.ttft)
+                total.append(stream.total)
+        finally:
+            client.close()
+    print(f"{'mode':>10} {'first token ms':>15} {'total ms':>9}")
+    print(f"{'blocking':>10} {np.median(blocking) * 1000:>15.1f} {np.median(blocking) * 1000:>9.1f}")
+    print(f"{'streaming':>10} {np.median(ttft) * 1000:>15.1f} {np.median(total) * 1000:>9.1f}")
+
+
+def benchmark_council(sizes=BENCHMARK_COUNCIL_SIZES, repeats=3, max_new_tokens=32):
+    """Latency of answering k chapters with council() vs k generate() calls one after another"""
+    import tempfile
+    import numpy as np
+    from adapter_manager import make_synthetic_adapters
+
+    rows = []
+    with tempfile.TemporaryDirectory() as adapter_dir:
+        make_synthetic_adapters(adapter_dir, max(sizes))
+        client = InferenceClient(partial(tiny_worker, adapter_dir))
+        try:
+            for k in sizes:
+                chapters = list(range(1, k + 1))
+                prompts = [f"system {c}: answer as chapter {c}. question: what is duty?" for c in chapters]
+                sequential, council = [], []
+                for _ in range(repeats):
+                    t0 = time.perf_counter()
+                    one_by_one = [client.generate(c, p, max_new_tokens)['text'] for c, p in zip(chapters, prompts)]
+                    sequential.append(time.perf_counter() - t0)
+                    t0 = time.perf_counter()
+                    together = [f.result(timeout=REQUEST_TIMEOUT_S)['text']
+                                for f in client.council(chapters, prompts, max_new_tokens)]
+                    council.append(time.perf_counter() - t0)
+                    if together != one_by_one:
+                        print(f"✗ k={k}: council answers differ from sequential generation")
+                rows.append((k, np.median(sequential), np.median(council)))
+        finally:
+            client.close()
+    print(f"{'k':>3} {'sequential ms':>14} {'council ms':>11} {'speedup':>8}")
+    for k, seq, together in rows:
+        print(f"{k:>3} {seq * 1000:>14.1f} {together * 1000:>11.1f} {seq / together:>7.2f}x")
+    return rows
+
+
+BENCHMARK_PREFIX = ("<|start_header_id|>system<|end_header_id|>\n\nCutting Knowledge Date: December 2023\n"
+                    "Today Date: 18 Oct 2026\n\nEmpathy & clarity for inner conflict. Stay steady.<|eot_id|>"
+                    "<|start_header_id|>user<|end_header_id|>\n\n")
+
+
+def benchmark_prefix_cache(requests=8, max_new_tokens=16, prefix=BENCHMARK_PREFIX):
+    """
+    Prefill time (one forward pass over the prompt) and client-side time to
+    first token, with and without the prefix cache, on the tiny CPU model.
+    """
+    import tempfile
+    import numpy as np
+    import torch
+    from adapter_manager import make_synthetic_adapters
+
+    questions = [f"question {i}: how do I stay calm before exams?" for i in range(requests)]
+    with tempfile.TemporaryDirectory() as adapter_dir:
+        make_synthetic_adapters(adapter_dir, 1)
+        model, tokenizer, locate = tiny_worker(adapter_dir)
+        manager = AdapterManager(model, locate)
+        cache = PrefixCache()
+        full, cached = [], []
+        with manager.using(1) as peft_model, torch.no_grad():
+            prefix_ids, past = cache.get(peft_model, tokenizer, adapter_name(1), prefix)
+            for question in questions:
+                ids = tokenizer([prefix + question], add_special_tokens=False)['input_ids']
+                t0 = time.perf_counter()
+                peft_model(input_ids=ids)
+                full.append(time.perf_counter() - t0)
+                t0 = time.perf_counter()
+                peft_model(input_ids=ids[:, len(prefix_ids):], past_key_values=copy.deepcopy(past))
+                cached.append(time.perf_counter() - t0)
+
+        client = InferenceClient(partial(tiny_worker, adapter_dir))
+        try:
+            ttft = {}
+            for mode, use_prefix in (("no cache", None), ("prefix cache", prefix)):
+                client.generate(1, prefix + "warm up", max_new_tokens, prefix=use_prefix)
+                times, texts = [], []
+                for question in questions:
+                    stream = client.stream(1, prefix + question, max_new_tokens, prefix=use_prefix)
+                    for _ in stream:
+                        pass
+                    times.append(stream.ttft)
+                    texts.append(stream.text)
+                ttft[mode] = (np.median(times), texts)
+        finally:
+            client.close()
+
+    if ttft["no cache"][1] != ttft["prefix cache"][1]:
+        print("✗ Replies with the prefix cache differ from the ones without it")
+    print(f"Prefix: {len(prefix_ids)} tokens")
+    print(f"{'mode':>13} {'prefill ms':>11} {'first token ms':>15}")
+    print(f"{'no cache':>13} {np.median(full) * 1000:>11.2f} {ttft['no cache'][0] * 1000:>15.1f}")
+    print(f"{'prefix cache':>13} {np.median(cached) * 1000:>11.2f} {ttft['prefix cache'][0] * 1000:>15.1f}")
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark_worker()
+    elif "--stream" in sys.argv:
+        benchmark_streaming()
+    elif "--council" in sys.argv:
+        benchmark_council()
+    elif "--prefix" in sys.argv:
+        benchmark_prefix_cache()
+    else:
+        print("Usage: python inference_worker.py --benchmark | --stream | --council | --prefix")
@@ -0,0 +1,132 @@
+import json
+import re
+import numpy as np
+
+# Distilled router: TF-IDF features -> one linear layer -> softmax over chapters.
+# Scoring needs only NumPy; sklearn/scipy are imported lazily for training.
+LINEAR_ROUTER_PATH = "linear_router.npz"
+
+
+def train_linear_router(X, soft_targets, l2=1e-4, max_iter=300):
+    """
+    Fit a softmax-regression student on the ensemble's soft probabilities.
+
+    Args:
+        X: sparse TF-IDF matrix, shape (n_samples, n_features)
+        soft_targets: ensemble predict_proba output, shape (n_samples, n_classes)
+        l2: weight decay on W
+        max_iter: L-BFGS iterations
+
+    Returns:
+        (W, b): weight matrix (n_features, n_classes) and bias (n_classes,)
+    """
+    from scipy.optimize import minimize
+
+    n, d = X.shape
+    k = soft_targets.shape[1]
+    P = np.asarray(soft_targets, dtype=np.float64)
+
+    def loss_and_grad(theta):
+        W = theta[:d * k].reshape(d, k)
+        b = theta[d * k:]
+        Z = np.asarray(X @ W) + b
+        Z -= Z.max(axis=1, keepdims=True)
+        log_probs = Z - np.log(np.exp(Z).sum(axis=1, keepdims=True))
+        loss = -(P * log_probs).sum() / n + 0.5 * l2 * (W ** 2).sum()
+        G = (np.exp(log_probs) - P) / n
+        grad_W = np.asarray(X.T @ G) + l2 * W
+        return loss, np.concatenate([grad_W.ravel(), G.sum(axis=0)])
+
+    result = minimize(loss_and_grad, np.zeros(d * k + k), jac=True, method='L-BFGS-B',
+                      options={'maxiter': max_iter})
+    return result.x[:d * k].reshape(d, k), result.x[d * k:]
+
+
+def export_linear_router(path, vectorizer, W, b, classes):
+    """
+    Save the student as plain arrays: vocabulary (in feature order), idf,
+    W, b, class labels, plus the vectorizer settings the scorer reproduces.
+    """
+    if vectorizer.analyzer != 'word' or vectorizer.sublinear_tf or vectorizer.norm not in ('l2', None):
+        raise ValueError("Only word-analyzer TF-IDF with raw tf and l2/no norm can be exported.")
+    config = {
+        'lowercase': bool(vectorizer.lowercase),
+        'token_pattern': vectorizer.token_pattern,
+        'ngram_range': list(vectorizer.ngram_range),
+        'norm': vectorizer.norm,
+    }
+    np.savez(
+        path,
+        vocabulary=np.asarray(vectorizer.get_feature_names_out(), dtype=str),
+        idf=vectorizer.idf_.astype(np.float32),
+        W=np.asarray(W, dtype=np.float32),
+        b=np.asarray(b, dtype=np.float32),
+        classes=np.asarray(classes),
+        config=np.asarray(json.dumps(config)),
+    )
+
+
+class LinearRouter:
+    """
+    NumPy-only scorer for the distilled router.
+
+    Reimplements the TF-IDF transform (lowercase, token regex, word n-grams,
+    tf * idf, l2 norm) over the exported vocabulary, then a linear layer and
+    softmax. predict() mirrors the sklearn pipeline's predict().
+    """
+
+    def __init__(self, vocabulary, idf, W, b, classes, config):
+        self.index = {term: i for i, term in enumerate(vocabulary.tolist())}
+        self.idf = idf
+        self.W = W
+        self.b = b
+        self.classes_ = classes
+        self._set_config(config)
+
+    def _set_config(self, config):
+        self.lowercase = config['lowercase']
+        self.token_re = re.compile(config['token_pattern'])
+        self.min_n, self.max_n = config['ngram_range']
+        self.norm = config['norm']
+
+    @classmethod
+    def load(cls, path=LINEAR_ROUTER_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data['vocabulary'], data['idf'], data['W'], data['b'], data['classes'],
+                       json.loads(str(data['config'])))
+
+    def lookup(self, terms):
+        """Column index of each term, -1 if it is not in the vocabulary"""
+        return np.fromiter((self.index.get(t, -1) for t in terms), dtype=np.intp, count=len(terms))
+
+    def features(self, text):
+        """(column indices, tf-idf values) of one text's non-zero features"""
+        if self.lowercase:
+            text = text.lower()
+        tokens = self.token_re.findall(text)
+        terms = [" ".join(tokens[i:i + n])
+                 for n in range(self.min_n, self.max_n + 1)
+                 for i in range(len(tokens) - n + 1)]
+        idx = self.lookup(terms)
+        idx, counts = np.unique(idx[idx >= 0], return_counts=True)
+        values = counts.astype(np.float32) * self.idf[idx]
+        if self.norm == 'l2' and len(values):
+            values /= np.sqrt((values ** 2).sum())
+        return idx, values
+
+    def decision_function(self, texts):
+        scores = np.tile(self.b, (len(texts), 1))
+        for row, text in enumerate(texts):
+            idx, values = self.features(text)
+            if len(idx):
+                scores[row] += values @ self.W[idx]
+        return scores
+
+    def predict_proba(self, texts):
+        scores = self.decision_function(texts)
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = np.exp(scores)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def predict(self, texts):
+        return self.classes_[self.decision_function(texts).argmax(axis=1)]
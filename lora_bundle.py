@@ -0,0 +1,244 @@
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+import warnings
+import zipfile
+import numpy as np
+
+# Single-file adapter bundle written by `packing_loras.py --bundle`.
+#
+# Layout:
+#   preamble  '<8sIIQQ'  magic, version, reserved, header_len, data_offset
+#   header    JSON: {"adapters": {"<idx>": {"name": "<idx>_<Name>",
+#                    "files": {"<filename>": [offset, length], ...}}}}
+#   data      every file's bytes, each starting on an ALIGNMENT boundary;
+#             offsets in the header are relative to data_offset
+#
+# adapter_model.safetensors blobs are copied verbatim, so their tensors can be
+# viewed in place through a read-only mmap of the bundle.
+BUNDLE_NAME = "lora_adapters.bundle"
+MAGIC = b"LORABNDL"
+FORMAT_VERSION = 1
+PREAMBLE = struct.Struct('<8sIIQQ')
+ALIGNMENT = 4096
+CONFIG_FILE = "adapter_config.json"
+WEIGHTS_FILE = "adapter_model.safetensors"
+
+# safetensors dtype -> (numpy dtype, torch dtype name). NumPy has no bfloat16,
+# so BF16 tensors come back as their raw uint16 bits in the NumPy path.
+SAFETENSORS_DTYPES = {
+    "F64": ("<f8", "float64"), "F32": ("<f4", "float32"), "F16": ("<f2", "float16"),
+    "BF16": ("<u2", "bfloat16"), "I64": ("<i8", "int64"), "I32": ("<i4", "int32"),
+    "I16": ("<i2", "int16"), "I8": ("i1", "int8"), "U8": ("u1", "uint8"), "BOOL": ("?", "bool"),
+}
+
+
+def _align(n, alignment=ALIGNMENT):
+    return (n + alignment - 1) // alignment * alignment
+
+
+def write_lora_bundle(output_path, adapters):
+    """
+    Write a bundle.
+
+    Args:
+        output_path: bundle file to create (written to a temp path, then renamed)
+        adapters: list of (idx, name, files), where files is a list of
+            (filename, size, open_fn) and open_fn() returns a readable binary
+            file object with exactly `size` bytes
+
+    Returns:
+        Total bytes written
+    """
+    table = {}
+    cursor = 0
+    for idx, name, files in adapters:
+        entry = {"name": name, "files": {}}
+        for filename, size, _ in files:
+            entry["files"][filename] = [cursor, size]
+            cursor = _align(cursor + size)
+        table[str(idx)] = entry
+    header = json.dumps({"adapters": table}, ensure_ascii=False).encode('utf-8')
+    data_offset = _align(PREAMBLE.size + len(header))
+
+    tmp_path = output_path + ".tmp"
+    with open(tmp_path, 'wb') as out:
+        out.write(PREAMBLE.pack(MAGIC, FORMAT_VERSION, 0, len(header), data_offset))
+        out.write(header)
+        for idx, name, files in adapters:
+            for filename, size, open_fn in files:
+                offset = data_offset + table[str(idx)]["files"][filename][0]
+                out.write(b'\0' * (offset - out.tell()))
+                with open_fn() as src:
+                    shutil.copyfileobj(src, out, 1 << 20)
+                if out.tell() != offset + size:
+                    raise ValueError(f"{name}/{filename}: expected {size} bytes, got {out.tell() - offset}.")
+        total = out.tell()
+    os.replace(tmp_path, output_path)
+    return total
+
+
+def parse_safetensors_header(buffer, offset=0):
+    """
+    (tensor table, data start) of the safetensors file at `offset` in `buffer`.
+    The table maps tensor name -> {dtype, shape, data_offsets}.
+    """
+    (n,) = struct.unpack_from('<Q', buffer, offset)
+    table = json.loads(bytes(buffer[offset + 8:offset + 8 + n]))
+    table.pop("__metadata__", None)
+    return table, offset + 8 + n
+
+
+def safetensors_arrays(buffer, offset=0, framework="numpy"):
+    """
+    Tensors of the safetensors file at `offset` in `buffer`, as zero-copy
+    views (NumPy arrays, or torch tensors with framework='torch'). BF16
+    tensors are uint16 bit patterns in NumPy; use torch for their values.
+    """
+    table, start = parse_safetensors_header(buffer, offset)
+    if framework == "torch":
+        import torch
+    arrays = {}
+    for name, info in table.items():
+        begin, end = info["data_offsets"]
+        np_dtype, torch_dtype = SAFETENSORS_DTYPES[info["dtype"]]
+        if framework == "torch":
+            dtype = getattr(torch, torch_dtype)
+            count = (end - begin) // torch.empty((), dtype=dtype).element_size()
+            with warnings.catch_warnings():
+                # The mmap is read-only; PEFT copies the values into the model
+                warnings.simplefilter("ignore", UserWarning)
+                tensor = torch.frombuffer(buffer, dtype=dtype, count=count, offset=start + begin)
+            arrays[name] = tensor.reshape(info["shape"])
+        else:
+            dtype = np.dtype(np_dtype)
+            count = (end - begin) // dtype.itemsize
+            arrays[name] = np.frombuffer(buffer, dtype=dtype, count=count,
+                                         offset=start + begin).reshape(info["shape"])
+    return arrays
+
+
+class LoraBundle:
+    """
+    Read-only view of a bundle.
+
+    Opening maps the file and parses the header only; an adapter's bytes are
+    paged in when that adapter is loaded.
+    """
+
+    def __init__(self, path=BUNDLE_NAME):
+        self.path = str(path)
+        self.file = open(self.path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, header_len, self.data_offset = PREAMBLE.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{self.path} is not a LoRA bundle.")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported LoRA bundle version {version} (expected {FORMAT_VERSION}).")
+        header = json.loads(self.mm[PREAMBLE.size:PREAMBLE.size + header_len])
+        self.adapters = {int(idx): entry for idx, entry in header["adapters"].items()}
+
+    def indices(self):
+        return sorted(self.adapters)
+
+    def has(self, idx):
+        return int(idx) in self.adapters
+
+    def name(self, idx):
+        return self.adapters[int(idx)]["name"]
+
+    def _span(self, idx, filename):
+        offset, length = self.adapters[int(idx)]["files"][filename]
+        return self.data_offset + offset, length
+
+    def file_bytes(self, idx, filename):
+        """Zero-copy memoryview of one file of adapter `idx`"""
+        offset, length = self._span(idx, filename)
+        return memoryview(self.mm)[offset:offset + length]
+
+    def adapter_config(self, idx):
+        return json.loads(bytes(self.file_bytes(idx, CONFIG_FILE)))
+
+    def tensors(self, idx, framework="numpy"):
+        """Adapter weights as zero-copy views into the mapped bundle"""
+        offset, _ = self._span(idx, WEIGHTS_FILE)
+        return safetensors_arrays(self.mm, offset, framework)
+
+    def load_peft_model(self, base_model, idx, adapter_name="default"):
+        """Wrap `base_model` with adapter `idx`, read straight from the bundle"""
+        from peft import PeftConfig, PeftModel, set_peft_model_state_dict
+
+        config = PeftConfig.from_peft_type(**self.adapter_config(idx))
+        model = PeftModel(base_model, config, adapter_name)
+        set_peft_model_state_dict(model, self.tensors(idx, framework="torch"), adapter_name)
+        return model
+
+    def close(self):
+        try:
+            self.mm.close()
+        except BufferError:
+            # Tensors still view the mapping; it is unmapped once they are freed
+            pass
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# ---------------------
+# Benchmark: zip-and-extract vs bundle
+# ---------------------
+def _touch(arrays):
+    """Read every tensor once, as loading it into a model would"""
+    return sum(float(a.sum()) for a in arrays.values())
+
+
+def benchmark_bundle(zip_path="lora_adapters.zip", bundle_path=BUNDLE_NAME, idx=1):
+    """
+    Cold start (make adapters available) and first-request latency (find and
+    load adapter `idx`) for the app's extract-and-scan path vs the bundle.
+    """
+    workdir = tempfile.mkdtemp(prefix="lora_extract_")
+    try:
+        t0 = time.perf_counter()
+        with zipfile.ZipFile(zip_path, 'r') as zf:
+            zf.extractall(workdir)
+        zip_cold = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        folder = next(p for p in os.scandir(workdir) if p.is_dir() and p.name.startswith(f"{idx}_"))
+        with open(os.path.join(folder.path, WEIGHTS_FILE), 'rb') as f:
+            _touch(safetensors_arrays(f.read()))
+        zip_first = time.perf_counter() - t0
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    t0 = time.perf_counter()
+    bundle = LoraBundle(bundle_path)
+    bundle_cold = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    _touch(bundle.tensors(idx))
+    bundle_first = time.perf_counter() - t0
+    bundle.close()
+
+    print(f"{'path':>14} {'cold start ms':>14} {'first request ms':>17}")
+    print(f"{'zip + extract':>14} {zip_cold * 1000:>14.1f} {zip_first * 1000:>17.1f}")
+    print(f"{'bundle':>14} {bundle_cold * 1000:>14.1f} {bundle_first * 1000:>17.1f}")
+    return {'zip_cold': zip_cold, 'zip_first': zip_first, 'bundle_cold': bundle_cold, 'bundle_first': bundle_first}
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark_bundle()
+    else:
+        with LoraBundle(sys.argv[1] if len(sys.argv) > 1 else BUNDLE_NAME) as bundle:
+            for idx in bundle.indices():
+                files = bundle.adapters[idx]["files"]
+                print(f" {idx:02d}: {bundle.name(idx)}  ({', '.join(sorted(files))})")
@@ -1,5 +1,11 @@
 import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
 import zipfile
+from lora_bundle import BUNDLE_NAME, write_lora_bundle
 
 # Map of original folder -> base new name (without index prefix)
 RENAMING_MAP = {
@@ -121,5 +127,209 @@ def process_lora_adapters():
     print(f"Created new archive '{output_zip_filename}'.")
 
 
+# Members that compress poorly are stored instead of deflated
+STORED_SUFFIXES = (".safetensors",)
+
+
+def renamed_folders():
+    """Original folder -> '{idx}_{name}' folder, as created by process_lora_adapters"""
+    return {original_folder: f"{idx}_{base_name.replace(' ', '_')}"
+            for idx, (original_folder, base_name) in enumerate(RENAMING_MAP.items(), start=1)}
+
+
+def renamed_member(name, original_folder, new_name):
+    """Archive path of `name` under the renamed folder"""
+    prefix = f"{original_folder}/"
+    return new_name + "/" + (name[len(prefix):] if name.startswith(prefix) else name)
+
+
+def _copy_archive(zip_path, original_folder, new_name, out_zip):
+    """
+    Copy every member of one source archive into `out_zip` under the renamed
+    folder, in archive order. Members are streamed in 1 MiB chunks, so no
+    member is ever held in RAM whole.
+    """
+    files = 0
+    with zipfile.ZipFile(zip_path, 'r') as src:
+        for info in src.infolist():
+            if info.is_dir():
+                continue
+            out_info = zipfile.ZipInfo(renamed_member(info.filename, original_folder, new_name),
+                                       date_time=info.date_time)
+            out_info.external_attr = info.external_attr
+            out_info.compress_type = (zipfile.ZIP_STORED if info.filename.endswith(STORED_SUFFIXES)
+                                      else zipfile.ZIP_DEFLATED)
+            with src.open(info) as s, out_zip.open(out_info, 'w', force_zip64=True) as d:
+                shutil.copyfileobj(s, d, 1 << 20)
+            files += 1
+    return files
+
+
+def repack_lora_adapters(source_dir=".", output_zip_filename="lora_adapters.zip"):
+    """
+    Streaming alternative to process_lora_adapters: copies the members of
+    every 'lora_adapters_ch*.zip' straight into a single archive under the
+    renamed '{idx}_{name}/' folders, without extracting anything to disk.
+    Archives are written one after another in renamed_folders() order, so the
+    output is the same on every run; .safetensors members are stored, the
+    rest deflated.
+
+    The archive is built in a .tmp file that only replaces
+    `output_zip_filename` once every archive was copied; on any error the
+    .tmp file is deleted and the previous output is left in place.
+
+    Returns:
+        True if the output archive was written
+    """
+    print(f"--- 📂 Repacking adapters from: {os.path.abspath(source_dir)} ---")
+    jobs = []
+    for original_folder, new_name in renamed_folders().items():
+        zip_path = os.path.join(source_dir, f"{original_folder}.zip")
+        if os.path.exists(zip_path):
+            jobs.append((zip_path, original_folder, new_name))
+        else:
+            print(f"Warning: Zip file '{original_folder}.zip' not found. Skipping.")
+
+    if not jobs:
+        print("\nNo zip files were found to repack. Exiting.")
+        return False
+
+    tmp_path = output_zip_filename + ".tmp"
+    total_files = 0
+    try:
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as out_zip:
+            for zip_path, original_folder, new_name in jobs:
+                try:
+                    files = _copy_archive(zip_path, original_folder, new_name, out_zip)
+                except zipfile.BadZipFile:
+                    print(f"  -> ERROR: '{original_folder}.zip' is corrupted.")
+                    raise
+                except Exception as e:
+                    print(f"  -> ERROR: {original_folder}.zip: {e}")
+                    raise
+                total_files += files
+                print(f"Packed '{original_folder}.zip'  ->  '{new_name}/' ({files} files)")
+    except Exception:
+        os.remove(tmp_path)
+        print(f"\n--- ❌ Repack failed; '{output_zip_filename}' was left unchanged ---")
+        return False
+    os.replace(tmp_path, output_zip_filename)
+
+    print(f"\n--- ✅ Created '{output_zip_filename}' ---")
+    print(f"Packed {len(jobs)} archives ({total_files} total files).")
+    return True
+
+
+def pack_lora_bundle(source_dir=".", output_filename=BUNDLE_NAME):
+    """
+    Write every 'lora_adapters_ch*.zip' into one indexed bundle (see
+    lora_bundle.py) that the app can memory-map instead of extracting.
+    Members are streamed from the source archives; nothing is extracted.
+    """
+    print(f"--- 📂 Bundling adapters from: {os.path.abspath(source_dir)} ---")
+    archives = []
+    adapters = []
+    try:
+        for idx, (original_folder, new_name) in enumerate(renamed_folders().items(), start=1):
+            zip_path = os.path.join(source_dir, f"{original_folder}.zip")
+            if not os.path.exists(zip_path):
+                print(f"Warning: Zip file '{original_folder}.zip' not found. Skipping.")
+                continue
+            try:
+                src = zipfile.ZipFile(zip_path, 'r')
+            except zipfile.BadZipFile:
+                print(f"  -> ERROR: '{original_folder}.zip' is corrupted.")
+                continue
+            archives.append(src)
+            files = []
+            for info in src.infolist():
+                if info.is_dir():
+                    continue
+                filename = renamed_member(info.filename, original_folder, new_name)[len(new_name) + 1:]
+                files.append((filename, info.file_size, lambda src=src, info=info: src.open(info)))
+            adapters.append((idx, new_name, files))
+            print(f"Indexed '{original_folder}.zip'  ->  {idx}: '{new_name}' ({len(files)} files)")
+
+        if not adapters:
+            print("\nNo zip files were found to bundle. Exiting.")
+            return
+        total = write_lora_bundle(output_filename, adapters)
+    finally:
+        for src in archives:
+            src.close()
+
+    print(f"\n--- ✅ Created '{output_filename}' ({total / 2**20:.1f} MB, {len(adapters)} adapters) ---")
+
+
+def _disk_usage(directory):
+    """Bytes of regular files under `directory` (symlinks not followed)"""
+    total = 0
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            path = os.path.join(root, file)
+            if not os.path.islink(path):
+                try:
+                    total += os.path.getsize(path)
+                except OSError:
+                    pass
+    return total
+
+
+def _measure(run, workdir, interval=0.05):
+    """Wall seconds of run() and peak bytes written under `workdir` while it ran"""
+    peak = [0]
+    done = threading.Event()
+
+    def sample():
+        while not done.is_set():
+            peak[0] = max(peak[0], _disk_usage(workdir))
+            done.wait(interval)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    start = time.time()
+    run()
+    elapsed = time.time() - start
+    done.set()
+    sampler.join()
+    return elapsed, max(peak[0], _disk_usage(workdir))
+
+
+def benchmark_repack(source_dir="."):
+    """
+    Run the three-phase flow and the streaming repack on symlinked copies of
+    the source archives in temporary directories, reporting wall time and
+    peak extra disk usage of each.
+    """
+    source_dir = os.path.abspath(source_dir)
+    results = {}
+    cwd = os.getcwd()
+    for label in ("three-phase", "streaming"):
+        workdir = tempfile.mkdtemp(prefix="lora_repack_")
+        try:
+            for original_folder in RENAMING_MAP:
+                zip_path = os.path.join(source_dir, f"{original_folder}.zip")
+                if os.path.exists(zip_path):
+                    os.symlink(zip_path, os.path.join(workdir, f"{original_folder}.zip"))
+            os.chdir(workdir)
+            run = process_lora_adapters if label == "three-phase" else repack_lora_adapters
+            results[label] = _measure(run, workdir)
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n{'flow':>12} {'wall s':>8} {'peak disk MB':>13}")
+    for label, (elapsed, peak) in results.items():
+        print(f"{label:>12} {elapsed:>8.2f} {peak / 2**20:>13.1f}")
+    return results
+
+
 if __name__ == "__main__":
-    process_lora_adapters()
+    if "--three-phase" in sys.argv:
+        process_lora_adapters()
+    elif "--bundle" in sys.argv:
+        pack_lora_bundle()
+    elif "--benchmark" in sys.argv:
+        benchmark_repack()
+    else:
+        repack_lora_adapters()
@@ -0,0 +1,216 @@
+import csv
+import json
+import os
+import threading
+from pathlib import Path
+
+
+class QAJournal:
+    """
+    Append-only, resumable Q&A journal for one chapter.
+
+    Chapter_{n}_QA.journal.jsonl holds one JSON line per completed verse
+    ({"verse", "sha256", "pairs"}). Streamed replies instead write one
+    {"verse", "sha256", "pair"} line per pair as soon as it is complete, then a
+    {"verse", "sha256", "pair_offsets"} done marker pointing at those lines.
+    Chapter_{n}_QA.index.tsv is the completion index, one
+    "verse<TAB>sha256<TAB>offset" line per record or done marker, where offset
+    is the byte position of that verse's latest one; pair lines without a
+    marker (a crash or failed attempt mid-verse) are never read.
+
+    Both files are only ever appended to and are fsynced every `sync_every`
+    records, so a crash loses at most that many verses. A restarted run skips
+    every verse already in the index with the same text hash. The CSV is
+    materialized from the journal in one pass, one verse in memory at a time.
+    """
+
+    def __init__(self, output_dir, chapter_num, sync_every=5, fresh=False):
+        self.chapter_num = chapter_num
+        self.sync_every = sync_every
+        self.journal_path = Path(output_dir) / f"Chapter_{chapter_num}_QA.journal.jsonl"
+        self.index_path = Path(output_dir) / f"Chapter_{chapter_num}_QA.index.tsv"
+
+        if fresh:
+            for path in (self.journal_path, self.index_path):
+                if path.exists():
+                    path.unlink()
+
+        # A crash can leave half a line at the end of either file
+        _trim_partial_line(self.journal_path)
+        _trim_partial_line(self.index_path)
+        self.completed = self._load_index()
+
+        self.journal = open(self.journal_path, 'ab')
+        self.index = open(self.index_path, 'a', encoding='utf-8')
+        self.pending = 0
+        self.streaming = {}   # verse -> offsets of its pair lines so far
+        self.lock = threading.Lock()   # pairs may be streamed from worker threads
+
+    def _load_index(self):
+        completed = {}
+        if not self.index_path.exists():
+            return completed
+        journal_size = self.journal_path.stat().st_size if self.journal_path.exists() else 0
+        with open(self.index_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                if len(parts) != 3:
+                    continue
+                verse, sha, offset = int(parts[0]), parts[1], int(parts[2])
+                # Index lines are synced after their journal lines; skip any
+                # that point past what actually reached the journal.
+                if offset < journal_size:
+                    completed[verse] = (sha, offset)
+        return completed
+
+    def is_done(self, verse_num, sha):
+        """True if `verse_num` was already generated from text with hash `sha`"""
+        entry = self.completed.get(verse_num)
+        return entry is not None and entry[0] == sha
+
+    def _write(self, record):
+        offset = self.journal.tell()
+        self.journal.write((json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8'))
+        return offset
+
+    def _mark_done(self, verse_num, sha, record):
+        offset = self._write(record)
+        self.index.write(f"{verse_num}\t{sha}\t{offset}\n")
+        self.completed[verse_num] = (sha, offset)
+        self.pending += 1
+        if self.pending >= self.sync_every:
+            self._sync()
+
+    def append(self, verse_num, sha, qa_pairs):
+        """Record the Q&A pairs ({question, answer} dicts) generated for one verse"""
+        with self.lock:
+            self._mark_done(verse_num, sha, {
+                "verse": verse_num,
+                "sha256": sha,
+                "pairs": [{"question": qa["question"], "answer": qa["answer"]} for qa in qa_pairs],
+            })
+
+    def start_verse(self, verse_num):
+        """Start (or restart, after a failed attempt) streaming the pairs of a verse"""
+        with self.lock:
+            self.streaming[verse_num] = []
+
+    def append_pair(self, verse_num, sha, qa):
+        """Write one streamed pair of a verse; it counts once finish_verse() marks the verse done"""
+        with self.lock:
+            offset = self._write({"verse": verse_num, "sha256": sha,
+                                  "pair": {"question": qa["question"], "answer": qa["answer"]}})
+            self.streaming.setdefault(verse_num, []).append(offset)
+
+    def finish_verse(self, verse_num, sha):
+        """Mark a verse whose pairs went through append_pair as done"""
+        with self.lock:
+            offsets = self.streaming.pop(verse_num, [])
+            self._mark_done(verse_num, sha, {"verse": verse_num, "sha256": sha, "pair_offsets": offsets})
+
+    def _pairs(self, journal, offset):
+        """The pairs of the record (or done marker) at `offset`"""
+        journal.seek(offset)
+        record = json.loads(journal.readline())
+        if "pairs" in record:
+            return record["pairs"]
+        pairs = []
+        for pair_offset in record["pair_offsets"]:
+            journal.seek(pair_offset)
+            pairs.append(json.loads(journal.readline())["pair"])
+        return pairs
+
+    def pairs(self, verse_num):
+        """Q&A pairs of the latest record for `verse_num`, or None if it has none"""
+        with self.lock:
+            if verse_num not in self.completed:
+                return None
+            self.journal.flush()
+            with open(self.journal_path, 'rb') as journal:
+                return self._pairs(journal, self.completed[verse_num][1])
+
+    def sync(self):
+        with self.lock:
+            self._sync()
+
+    def _sync(self):
+        # Journal first, so the index never points at unwritten records
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.index.flush()
+        os.fsync(self.index.fileno())
+        self.pending = 0
+
+    def materialize(self, output_file, verse_hashes):
+        """
+        Write Chapter_{n}_QA.csv from the journal.
+
+        Args:
+            output_file: CSV path
+            verse_hashes: {verse_num: sha256} of the current verse files; only
+                verses whose journal record matches are written, in verse order.
+
+        The CSV is always replaced, with just the header when no verse
+        matches, so a stale CSV from older verse text never survives.
+
+        Returns:
+            Number of Q&A rows written
+        """
+        self.sync()
+        rows = 0
+        tmp_path = Path(output_file).with_suffix('.csv.tmp')
+        with open(self.journal_path, 'rb') as journal, \
+                open(tmp_path, 'w', newline='', encoding='utf-8') as csvfile:
+            fieldnames = ['chapter', 'verse_source', 'question', 'answer']
+            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+            writer.writeheader()
+            for verse_num in sorted(verse_hashes):
+                if not self.is_done(verse_num, verse_hashes[verse_num]):
+                    continue
+                for qa in self._pairs(journal, self.completed[verse_num][1]):
+                    writer.writerow({
+                        'chapter': self.chapter_num,
+                        'verse_source': f"{self.chapter_num}.{verse_num}",
+                        'question': qa['question'],
+                        'answer': qa['answer'],
+                    })
+                    rows += 1
+        os.replace(tmp_path, output_file)
+        return rows
+
+    def close(self):
+        if self.journal.closed:
+            return
+        self.sync()
+        self.journal.close()
+        self.index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _trim_partial_line(path):
+    """Truncate `path` back to its last newline"""
+    if not path.exists():
+        return
+    with open(path, 'rb+') as f:
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return
+        pos = size
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            newline = chunk.rfind(b'\n')
+            if newline != -1:
+                f.truncate(pos + newline + 1)
+                return
+        f.truncate(0)
@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+import numpy as np
+from linear_router import LINEAR_ROUTER_PATH, LinearRouter
+
+# Directory layout: one raw .npy per array plus manifest.json. Every array
+# loads with mmap_mode='r', so worker processes share the OS page cache
+# instead of each unpickling its own copy of the vocabulary and weights.
+ARTIFACT_DIR = "router_artifact"
+MANIFEST_NAME = "manifest.json"
+FORMAT_VERSION = 1
+ARRAYS = ("vocabulary", "idf", "W", "b", "classes")
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_router_artifact(out_dir, vocabulary, idf, W, b, classes, config):
+    """
+    Write a router artifact directory.
+
+    The vocabulary is stored sorted (fixed-width unicode) so the scorer can
+    look terms up with a binary search over the mapped array; idf and the
+    rows of W are permuted to match.
+
+    Returns:
+        The manifest dict
+    """
+    vocabulary = np.asarray(vocabulary, dtype=str)
+    order = np.argsort(vocabulary, kind='stable')
+    arrays = {
+        'vocabulary': vocabulary[order],
+        'idf': np.asarray(idf, dtype=np.float32)[order],
+        'W': np.ascontiguousarray(np.asarray(W, dtype=np.float32)[order]),
+        'b': np.asarray(b, dtype=np.float32),
+        'classes': np.asarray(classes),
+    }
+    os.makedirs(out_dir, exist_ok=True)
+    files = {}
+    for name, array in arrays.items():
+        path = os.path.join(out_dir, f"{name}.npy")
+        np.save(path, array, allow_pickle=False)
+        files[name] = {
+            'file': f"{name}.npy",
+            'sha256': _sha256(path),
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+        }
+    manifest = {'version': FORMAT_VERSION, 'config': config, 'files': files}
+    tmp_path = os.path.join(out_dir, MANIFEST_NAME + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    # Manifest last, so a half-written artifact never looks complete
+    os.replace(tmp_path, os.path.join(out_dir, MANIFEST_NAME))
+    return manifest
+
+
+def convert_linear_router(npz_path=LINEAR_ROUTER_PATH, out_dir=ARTIFACT_DIR):
+    """Re-export linear_router.npz (written by router_ml_classifier.py) as an artifact directory"""
+    with np.load(npz_path, allow_pickle=False) as data:
+        return write_router_artifact(out_dir, data['vocabulary'], data['idf'], data['W'], data['b'],
+                                     data['classes'], json.loads(str(data['config'])))
+
+
+class MappedRouter(LinearRouter):
+    """
+    LinearRouter scored straight from a memory-mapped artifact directory.
+
+    Loading only opens the files; pages are faulted in on first use and are
+    shared by every process mapping the same artifact. Terms are looked up
+    with np.searchsorted over the sorted vocabulary, so no per-process dict
+    is built.
+    """
+
+    def __init__(self, directory=ARTIFACT_DIR, verify=False):
+        with open(os.path.join(directory, MANIFEST_NAME), 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported router artifact version {manifest.get('version')} "
+                             f"(expected {FORMAT_VERSION}).")
+        arrays = {}
+        for name in ARRAYS:
+            entry = manifest['files'][name]
+            path = os.path.join(directory, entry['file'])
+            # Hashing reads every byte, so it is opt-in rather than part of cold start
+            if verify and _sha256(path) != entry['sha256']:
+                raise ValueError(f"Checksum mismatch for {path}.")
+            arrays[name] = np.load(path, mmap_mode='r', allow_pickle=False)
+            if arrays[name].dtype.str != entry['dtype'] or list(arrays[name].shape) != entry['shape']:
+                raise ValueError(f"{path} does not match the manifest.")
+        self.vocabulary = arrays['vocabulary']
+        self.idf = arrays['idf']
+        self.W = arrays['W']
+        self.b = np.asarray(arrays['b'])
+        self.classes_ = np.asarray(arrays['classes'])
+        self._set_config(manifest['config'])
+
+    def lookup(self, terms):
+        if not terms or not len(self.vocabulary):
+            return np.full(len(terms), -1, dtype=np.intp)
+        terms = np.asarray(terms, dtype=str)
+        pos = np.searchsorted(self.vocabulary, terms)
+        pos[pos == len(self.vocabulary)] = 0
+        return np.where(self.vocabulary[pos] == terms, pos, -1)
+
+
+# ---------------------
+# Benchmark: cold load time and memory, artifact vs joblib
+# ---------------------
+def _rss_kb():
+    """(RssAnon, RssFile) in kB from /proc/self/status (Linux only)"""
+    fields = {}
+    with open('/proc/self/status', 'r') as f:
+        for line in f:
+            key, _, value = line.partition(':')
+            if key in ('RssAnon', 'RssFile'):
+                fields[key] = int(value.split()[0])
+    return fields.get('RssAnon', 0), fields.get('RssFile', 0)
+
+
+def _load_and_report(kind, queries):
+    """Runs in a fresh interpreter: load one router, score `queries`, print JSON stats"""
+    before_anon, before_file = _rss_kb()
+    t0 = time.perf_counter()
+    if kind == "mmap":
+        router = MappedRouter()
+        predict = router.predict
+    else:
+        import joblib
+        from router_service import TFIDF_PATH, VOTING_PATH
+        tfidf, voting = joblib.load(TFIDF_PATH), joblib.load(VOTING_PATH)
+        predict = lambda texts: voting.predict(tfidf.transform(texts))
+    load_s = time.perf_counter() - t0
+    predict(queries)
+    anon, file_backed = _rss_kb()
+    print(json.dumps({'load_s': load_s, 'anon_kb': anon - before_anon, 'file_kb': file_backed - before_file}))
+
+
+def benchmark_artifact(queries, runs=5):
+    """
+    Load each router in `runs` fresh processes and report median cold-load
+    time plus the private (anonymous) and shared (file-backed) memory each
+    process added after scoring `queries`.
+    """
+    print(f"{'path':>7} {'load ms':>9} {'private MB':>11} {'shared MB':>10}")
+    for kind in ("joblib", "mmap"):
+        stats = []
+        for _ in range(runs):
+            out = subprocess.run([sys.executable, __file__, "--load", kind],
+                                 input=json.dumps(queries), capture_output=True, text=True, check=True)
+            stats.append(json.loads(out.stdout.strip().splitlines()[-1]))
+        load_ms = np.median([s['load_s'] for s in stats]) * 1000
+        anon_mb = np.median([s['anon_kb'] for s in stats]) / 1024
+        file_mb = np.median([s['file_kb'] for s in stats]) / 1024
+        print(f"{kind:>7} {load_ms:>9.1f} {anon_mb:>11.1f} {file_mb:>10.1f}")
+
+
+if __name__ == "__main__":
+    if "--load" in sys.argv:
+        _load_and_report(sys.argv[sys.argv.index("--load") + 1], json.loads(sys.stdin.read()))
+    elif "--benchmark" in sys.argv:
+        import pandas as pd
+        from router_service import clean_text
+
+        queries = [clean_text(q) for q in pd.read_csv("Router_Dataset.csv")['question'].head(200)]
+        benchmark_artifact(queries)
+    else:
+        manifest = convert_linear_router()
+        print(f"💾 Router artifact written to '{ARTIFACT_DIR}' "
+              f"({manifest['files']['vocabulary']['shape'][0]} terms, version {FORMAT_VERSION}).")
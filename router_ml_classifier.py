@@ -1,8 +1,10 @@
 # router_ml_classifier.py
+import os
 import time
 import re
 import joblib
 import pickle
+import numpy as np
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.ensemble import VotingClassifier
@@ -10,100 +12,166 @@ from sklearn.pipeline import Pipeline
 from sklearn.metrics import accuracy_score
 from xgboost import XGBClassifier
 from catboost import CatBoostClassifier
+from linear_router import LINEAR_ROUTER_PATH, LinearRouter, export_linear_router, train_linear_router
+from router_artifact import ARTIFACT_DIR, convert_linear_router
+
+DATASET_PARQUET = "Router_Dataset.parquet"
+DATASET_CSV = "Router_Dataset.csv"
+
 
 # ---------------------
 # 1. Load & Preprocess
 # ---------------------
-print("📂 Loading dataset...")
-df = pd.read_csv("Router_Dataset.csv")
+def load_router_dataset(parquet_path=DATASET_PARQUET, csv_path=DATASET_CSV):
+    """
+    Load the router dataset and clean its questions.
 
-if 'question' not in df.columns or 'llm' not in df.columns:
-    raise ValueError("CSV must contain 'question' and 'llm' columns.")
+    Returns:
+        (X, y, sample_weight): cleaned question Series, int labels, and the
+        'weight' column as an array (None unless the dataset was built with
+        the 'class_weights' strategy)
+    """
+    print("📂 Loading dataset...")
+    # The Parquet copy written by create_router_dataset.py loads much faster than the CSV
+    if os.path.exists(parquet_path):
+        df = pd.read_parquet(parquet_path)
+    else:
+        df = pd.read_csv(csv_path)
 
-print(f"✅ Loaded {len(df)} rows.")
+    if 'question' not in df.columns or 'llm' not in df.columns:
+        raise ValueError("CSV must contain 'question' and 'llm' columns.")
 
-# Clean text (same normalization as used elsewhere)
-print("🧹 Cleaning text...")
-df['text_clean'] = df['question'].str.lower().str.replace(r'[^\w\s]', '', regex=True)
+    print(f"✅ Loaded {len(df)} rows.")
 
-X = df['text_clean']
-y = df['llm'].astype(int)
+    # Clean text (same normalization as used elsewhere)
+    print("🧹 Cleaning text...")
+    df['text_clean'] = df['question'].str.lower().str.replace(r'[^\w\s]', '', regex=True)
 
-# ---------------------
-# 2. Define Models
-# ---------------------
-print("⚙️ Initializing models...")
-xgb = XGBClassifier(
-    n_estimators=100,
-    max_depth=5,
-    learning_rate=0.1,
-    subsample=0.8,
-    colsample_bytree=0.8,
-    eval_metric='mlogloss',
-    verbosity=1,
-    tree_method='hist',
-    use_label_encoder=False
-)
-
-cat = CatBoostClassifier(
-    iterations=200,
-    depth=6,
-    learning_rate=0.1,
-    loss_function='MultiClass',
-    verbose=50
-)
-
-ensemble = VotingClassifier(
-    estimators=[('xgb', xgb), ('cat', cat)],
-    voting='soft'
-)
+    X = df['text_clean']
+    y = df['llm'].astype(int)
+    sample_weight = df['weight'].to_numpy() if 'weight' in df.columns else None
+    return X, y, sample_weight
 
-# ---------------------
-# 3. Create Pipeline
-# ---------------------
-pipeline = Pipeline([
-    ('tfidf', TfidfVectorizer(ngram_range=(1, 2), min_df=3, max_features=5000)),
-    ('ensemble', ensemble)
-])
 
 # ---------------------
-# 4. Train
+# 2. Define Models / 3. Create Pipeline
 # ---------------------
-print("\n🚀 Training started...")
-start = time.time()
-pipeline.fit(X, y)
-end = time.time()
-print(f"✅ Training completed in {(end - start):.2f} seconds.")
+def build_pipeline():
+    """TF-IDF followed by the soft-voting XGBoost + CatBoost ensemble"""
+    print("⚙️ Initializing models...")
+    xgb = XGBClassifier(
+        n_estimators=100,
+        max_depth=5,
+        learning_rate=0.1,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        eval_metric='mlogloss',
+        verbosity=1,
+        tree_method='hist',
+        use_label_encoder=False
+    )
 
-# ---------------------
-# 5. Evaluate
-# ---------------------
-print("\n📊 Evaluating on training data...")
-y_pred = pipeline.predict(X)
-acc = accuracy_score(y, y_pred)
-print(f"✅ Training Accuracy: {acc:.4f}")
+    cat = CatBoostClassifier(
+        iterations=200,
+        depth=6,
+        learning_rate=0.1,
+        loss_function='MultiClass',
+        verbose=50
+    )
 
-# ---------------------
-# 6. Test with examples
-# ---------------------
-print("\n🧠 Example predictions:")
-samples = [
-    "I'm under a lot of stress about my grades and college admissions.",
-    "I keep comparing my looks to others and it makes me anxious.",
-    "I can't sleep because I'm constantly worrying about my career."
-]
-preds = pipeline.predict(samples)
-for q, pred in zip(samples, preds):
-    print(f"Q: {q}\n→ Predicted LLM: {pred}\n")
+    ensemble = VotingClassifier(
+        estimators=[('xgb', xgb), ('cat', cat)],
+        voting='soft'
+    )
 
-# ---------------------
-# 7. Save TFIDF and Ensemble separately (protocol=4)
-# ---------------------
-print("💾 Saving TF-IDF vectorizer and Voting ensemble separately (protocol=4)...")
-joblib.dump(pipeline.named_steps["tfidf"], "tfidf_vectorizer.joblib", protocol=4)
-joblib.dump(pipeline.named_steps["ensemble"], "voting_model.joblib", protocol=4)
-print("Saved: tfidf_vectorizer.joblib, voting_model.joblib")
-
-# (optional) Also save a pickle for the entire pipeline using protocol=4 if you want:
-# joblib.dump(pipeline, "ensemble_router_model.joblib", protocol=4)
-# print("Saved full pipeline: ensemble_router_model.joblib")
+    return Pipeline([
+        ('tfidf', TfidfVectorizer(ngram_range=(1, 2), min_df=3, max_features=5000)),
+        ('ensemble', ensemble)
+    ])
+
+
+def single_query_latency(predict, queries):
+    """p50/p99 latency in ms of predict([q]) for each query"""
+    timings = []
+    for q in queries:
+        t0 = time.perf_counter()
+        predict([q])
+        timings.append((time.perf_counter() - t0) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 99)
+
+
+def main():
+    X, y, sample_weight = load_router_dataset()
+    pipeline = build_pipeline()
+
+    # ---------------------
+    # 4. Train
+    # ---------------------
+    print("\n🚀 Training started...")
+    start = time.time()
+    pipeline.fit(X, y, ensemble__sample_weight=sample_weight)
+    end = time.time()
+    print(f"✅ Training completed in {(end - start):.2f} seconds.")
+
+    # ---------------------
+    # 5. Evaluate
+    # ---------------------
+    print("\n📊 Evaluating on training data...")
+    y_pred = pipeline.predict(X)
+    acc = accuracy_score(y, y_pred)
+    print(f"✅ Training Accuracy: {acc:.4f}")
+
+    # ---------------------
+    # 6. Test with examples
+    # ---------------------
+    print("\n🧠 Example predictions:")
+    samples = [
+        "I'm under a lot of stress about my grades and college admissions.",
+        "I keep comparing my looks to others and it makes me anxious.",
+        "I can't sleep because I'm constantly worrying about my career."
+    ]
+    preds = pipeline.predict(samples)
+    for q, pred in zip(samples, preds):
+        print(f"Q: {q}\n→ Predicted LLM: {pred}\n")
+
+    # ---------------------
+    # 7. Save TFIDF and Ensemble separately (protocol=4)
+    # ---------------------
+    print("💾 Saving TF-IDF vectorizer and Voting ensemble separately (protocol=4)...")
+    joblib.dump(pipeline.named_steps["tfidf"], "tfidf_vectorizer.joblib", protocol=4)
+    joblib.dump(pipeline.named_steps["ensemble"], "voting_model.joblib", protocol=4)
+    print("Saved: tfidf_vectorizer.joblib, voting_model.joblib")
+
+    # ---------------------
+    # 8. Distill into a linear router (NumPy-only at serving time)
+    # ---------------------
+    print("\n🧪 Distilling the ensemble into a linear router...")
+    tfidf = pipeline.named_steps["tfidf"]
+    X_tfidf = tfidf.transform(X)
+    soft_targets = pipeline.named_steps["ensemble"].predict_proba(X_tfidf)
+    start = time.time()
+    W, b = train_linear_router(X_tfidf, soft_targets)
+    print(f"✅ Distillation completed in {(time.time() - start):.2f} seconds.")
+    export_linear_router(LINEAR_ROUTER_PATH, tfidf, W, b, pipeline.classes_)
+    print(f"Saved: {LINEAR_ROUTER_PATH}")
+    convert_linear_router(LINEAR_ROUTER_PATH, ARTIFACT_DIR)
+    print(f"Saved: {ARTIFACT_DIR}/ (memory-mappable copy, see router_artifact.py)")
+
+    linear = LinearRouter.load(LINEAR_ROUTER_PATH)
+    linear_pred = linear.predict(X.tolist())
+    print(f"✅ Agreement with ensemble: {np.mean(linear_pred == y_pred):.4f}")
+    print(f"✅ Linear router accuracy: {accuracy_score(y, linear_pred):.4f}")
+
+    queries = X.sample(n=min(500, len(X)), random_state=0).tolist()
+    print("\n⏱️ Single-query latency (ms):")
+    for name, predict in [("ensemble", pipeline.predict), ("linear", linear.predict)]:
+        p50, p99 = single_query_latency(predict, queries)
+        print(f"{name:>9}: p50 {p50:.3f}  p99 {p99:.3f}")
+
+    # (optional) Also save a pickle for the entire pipeline using protocol=4 if you want:
+    # joblib.dump(pipeline, "ensemble_router_model.joblib", protocol=4)
+    # print("Saved full pipeline: ensemble_router_model.joblib")
+
+
+if __name__ == "__main__":
+    main()
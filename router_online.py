@@ -0,0 +1,177 @@
+import os
+import sys
+import time
+import zlib
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.metrics import accuracy_score
+from router_service import clean_text
+
+# Incremental router: a stateless hashing featurizer (no vocabulary to refit)
+# plus a partial_fit classifier, so new labelled questions are folded into the
+# saved model instead of retraining on the whole Router_Dataset.
+ONLINE_ROUTER_PATH = "online_router.joblib"
+DATASET_PARQUET = "Router_Dataset.parquet"
+DATASET_CSV = "Router_Dataset.csv"
+NUM_CHAPTERS = 18
+N_FEATURES = 2 ** 18    # coef_ is a dense 18 x N_FEATURES float64 array (~38 MB here, ~150 MB at 2**20)
+BATCH_SIZE = 10_000
+EPOCHS = 5
+HOLDOUT_PERCENT = 20     # Rows whose question hash falls below this go to the held-out split
+SEED = 42
+
+
+def is_holdout(question, percent=HOLDOUT_PERCENT):
+    """Deterministic split on the cleaned question, so it works on a stream"""
+    return zlib.crc32(clean_text(question).encode('utf-8')) % 100 < percent
+
+
+class OnlineRouter:
+    """HashingVectorizer + SGD logistic regression, trained with partial_fit"""
+
+    def __init__(self, n_features=N_FEATURES, num_chapters=NUM_CHAPTERS):
+        self.vectorizer = HashingVectorizer(n_features=n_features, ngram_range=(1, 2),
+                                            alternate_sign=False, norm='l2')
+        self.model = SGDClassifier(loss='log_loss', alpha=1e-6, random_state=SEED)
+        self.classes_ = np.arange(1, num_chapters + 1)
+        self.rows_seen = 0
+
+    def partial_fit(self, questions, labels, sample_weight=None):
+        X = self.vectorizer.transform([clean_text(q) for q in questions])
+        self.model.partial_fit(X, np.asarray(labels, dtype=int), classes=self.classes_,
+                               sample_weight=sample_weight)
+        self.rows_seen += len(labels)
+        return self
+
+    def predict_proba(self, questions):
+        return self.model.predict_proba(self.vectorizer.transform([clean_text(q) for q in questions]))
+
+    def predict(self, questions):
+        return self.model.predict(self.vectorizer.transform([clean_text(q) for q in questions]))
+
+    def save(self, path=ONLINE_ROUTER_PATH):
+        # Plain sklearn objects only, so the file loads no matter which module saved it
+        state = {'vectorizer': self.vectorizer, 'model': self.model,
+                 'classes': self.classes_, 'rows_seen': self.rows_seen}
+        joblib.dump(state, path, protocol=4)
+
+    @classmethod
+    def load(cls, path=ONLINE_ROUTER_PATH):
+        state = joblib.load(path)
+        router = cls.__new__(cls)
+        router.vectorizer = state['vectorizer']
+        router.model = state['model']
+        router.classes_ = state['classes']
+        router.rows_seen = state['rows_seen']
+        return router
+
+
+def iter_dataset_batches(path, batch_size=BATCH_SIZE):
+    """
+    Stream (questions, labels, weights) batches from a Parquet or CSV file
+    without loading it whole; weights is None when there is no 'weight' column.
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(path)
+        columns = [c for c in ('question', 'llm', 'weight') if c in parquet.schema_arrow.names]
+        batches = (b.to_pandas() for b in parquet.iter_batches(batch_size=batch_size, columns=columns))
+    else:
+        batches = pd.read_csv(path, chunksize=batch_size)
+    for df in batches:
+        weights = df['weight'].to_numpy() if 'weight' in df.columns else None
+        yield df['question'].astype(str).tolist(), df['llm'].to_numpy(), weights
+
+
+def train_streaming(path, router=None, epochs=1, batch_size=BATCH_SIZE, split=None):
+    """
+    Fit `router` (a new OnlineRouter if None) by streaming `path` `epochs` times.
+
+    Args:
+        split: None to train on every row, 'train' to skip held-out rows
+    """
+    router = router or OnlineRouter()
+    for epoch in range(epochs):
+        for questions, labels, weights in iter_dataset_batches(path, batch_size):
+            if split == 'train':
+                keep = np.array([not is_holdout(q) for q in questions])
+                if not keep.any():
+                    continue
+                questions = [q for q, k in zip(questions, keep) if k]
+                labels = labels[keep]
+                weights = weights[keep] if weights is not None else None
+            router.partial_fit(questions, labels, weights)
+        print(f"   epoch {epoch + 1}/{epochs}: {router.rows_seen} rows seen")
+    return router
+
+
+def update_router(new_rows_file, path=ONLINE_ROUTER_PATH, batch_size=BATCH_SIZE):
+    """Fold a file of new labelled questions into the saved router; returns seconds taken"""
+    router = OnlineRouter.load(path)
+    start = time.time()
+    train_streaming(new_rows_file, router, epochs=1, batch_size=batch_size)
+    elapsed = time.time() - start
+    router.save(path)
+    return elapsed
+
+
+def compare_with_full_refit(path, epochs=EPOCHS, update_rows=1000):
+    """
+    Held-out accuracy of the online router vs a full refit of the TF-IDF +
+    voting ensemble (router_ml_classifier.py) on the same split, plus the time
+    to fold `update_rows` new rows into an already trained online router.
+    """
+    from router_ml_classifier import build_pipeline
+
+    df = pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+    holdout = df['question'].map(is_holdout).to_numpy()
+    train, test = df[~holdout], df[holdout]
+    print(f"📊 {len(train)} train / {len(test)} held-out rows")
+    test_questions = test['question'].astype(str).tolist()
+
+    print("\n🚀 Full refit (TF-IDF + voting ensemble)...")
+    start = time.time()
+    # Same rows and weights as the online router streams (see iter_dataset_batches)
+    weights = train['weight'].to_numpy() if 'weight' in train.columns else None
+    pipeline = build_pipeline()
+    pipeline.fit(train['question'].map(clean_text), train['llm'].astype(int), ensemble__sample_weight=weights)
+    refit_s = time.time() - start
+    refit_acc = accuracy_score(test['llm'], pipeline.predict([clean_text(q) for q in test_questions]))
+
+    print("\n🚀 Online router (streaming, hashing features)...")
+    start = time.time()
+    online = train_streaming(path, epochs=epochs, split='train')
+    online_s = time.time() - start
+    online_acc = accuracy_score(test['llm'], online.predict(test_questions))
+
+    batch = train.sample(n=min(update_rows, len(train)), random_state=SEED)
+    start = time.time()
+    online.partial_fit(batch['question'].astype(str).tolist(), batch['llm'].to_numpy(),
+                       batch['weight'].to_numpy() if 'weight' in batch.columns else None)
+    update_s = time.time() - start
+
+    print(f"\n{'model':>12} {'held-out acc':>13} {'train s':>9}")
+    print(f"{'full refit':>12} {refit_acc:>13.4f} {refit_s:>9.2f}")
+    print(f"{'online':>12} {online_acc:>13.4f} {online_s:>9.2f}")
+    print(f"\n⏱️ Folding {len(batch)} new rows into the online router took {update_s * 1000:.1f} ms.")
+    return {'refit_acc': refit_acc, 'online_acc': online_acc, 'refit_s': refit_s,
+            'online_s': online_s, 'update_s': update_s}
+
+
+if __name__ == "__main__":
+    dataset = DATASET_PARQUET if os.path.exists(DATASET_PARQUET) else DATASET_CSV
+    if "--compare" in sys.argv:
+        compare_with_full_refit(dataset)
+    elif "--update" in sys.argv:
+        new_rows = sys.argv[sys.argv.index("--update") + 1]
+        elapsed = update_router(new_rows)
+        print(f"✅ Folded '{new_rows}' into {ONLINE_ROUTER_PATH} in {elapsed:.2f} seconds.")
+    else:
+        print(f"🚀 Streaming {dataset} into a new online router ({EPOCHS} epochs)...")
+        router = train_streaming(dataset, epochs=EPOCHS)
+        router.save()
+        print(f"💾 Saved: {ONLINE_ROUTER_PATH}")
@@ -0,0 +1,231 @@
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import StratifiedKFold
+from router_ml_classifier import DATASET_CSV, DATASET_PARQUET, load_router_dataset
+
+# Hyperparameter search for the router. Each TF-IDF config is fitted once per
+# CV fold (on that fold's training rows only) and its sparse matrix cached on
+# disk; classifier configs are then cross-validated on the cached features
+# across a process pool.
+FEATURE_CACHE_DIR = "router_features"
+RESULTS_FILE = "router_search_results.csv"
+CV_FOLDS = 5
+MAX_WORKERS = os.cpu_count() or 4
+SEED = 42
+ACCURACY_FLOOR = 0.85
+
+VECTORIZER_GRID = [
+    {'ngram_range': (1, 1), 'min_df': 3, 'max_features': 5000},
+    {'ngram_range': (1, 2), 'min_df': 3, 'max_features': 5000},   # current router
+    {'ngram_range': (1, 2), 'min_df': 2, 'max_features': 20000},
+]
+
+CLASSIFIER_GRID = [
+    {'model': 'logreg', 'C': 1.0},
+    {'model': 'logreg', 'C': 10.0},
+    {'model': 'xgb', 'n_estimators': 50, 'max_depth': 4},
+    {'model': 'xgb', 'n_estimators': 100, 'max_depth': 5},
+    {'model': 'xgb', 'n_estimators': 200, 'max_depth': 6},
+    {'model': 'cat', 'iterations': 100, 'depth': 4},
+    {'model': 'cat', 'iterations': 200, 'depth': 6},
+    {'model': 'voting', 'n_estimators': 100, 'max_depth': 5, 'iterations': 200, 'depth': 6},  # current router
+]
+
+
+def make_classifier(spec):
+    """Build the classifier described by a CLASSIFIER_GRID entry (single-threaded, for the pool)"""
+    model = spec['model']
+    if model == 'logreg':
+        from sklearn.linear_model import LogisticRegression
+        return LogisticRegression(C=spec['C'], max_iter=1000)
+    if model in ('xgb', 'voting'):
+        from xgboost import XGBClassifier
+        xgb = XGBClassifier(n_estimators=spec['n_estimators'], max_depth=spec['max_depth'], learning_rate=0.1,
+                            subsample=0.8, colsample_bytree=0.8, eval_metric='mlogloss',
+                            tree_method='hist', n_jobs=1, verbosity=0)
+        if model == 'xgb':
+            return xgb
+    if model in ('cat', 'voting'):
+        from catboost import CatBoostClassifier
+        cat = CatBoostClassifier(iterations=spec['iterations'], depth=spec['depth'], learning_rate=0.1,
+                                 loss_function='MultiClass', thread_count=1, verbose=0)
+        if model == 'cat':
+            return cat
+    if model == 'voting':
+        from sklearn.ensemble import VotingClassifier
+        return VotingClassifier(estimators=[('xgb', xgb), ('cat', cat)], voting='soft')
+    raise ValueError(f"Unknown model '{model}'")
+
+
+def config_name(spec):
+    params = " ".join(f"{k}={v}" for k, v in spec.items() if k != 'model')
+    return f"{spec['model']}({params})"
+
+
+def cached_features(X, y, vec_config, train_idx=None, cache_dir=FEATURE_CACHE_DIR):
+    """
+    TF-IDF matrix of all of `X` for `vec_config`, cached on disk by
+    (config, data, training rows) hash.
+
+    Args:
+        train_idx: rows the vectorizer is fitted on (a fold's training rows,
+            so held-out rows don't leak into the vocabulary and idf), or None
+            for all rows
+
+    Returns:
+        Path of the cached .npz (CSR arrays data/indices/indptr/shape, labels 'y')
+    """
+    digest = hashlib.sha256(json.dumps(vec_config, sort_keys=True).encode('utf-8'))
+    for text in X:
+        digest.update(text.encode('utf-8') + b'\0')
+    digest.update(np.asarray(y, dtype=np.int64).tobytes())
+    if train_idx is not None:
+        digest.update(b'train' + np.asarray(train_idx, dtype=np.int64).tobytes())
+    path = os.path.join(cache_dir, f"tfidf_{digest.hexdigest()[:16]}.npz")
+    if os.path.exists(path):
+        print(f"✓ Cached features: {path}")
+        return path
+    os.makedirs(cache_dir, exist_ok=True)
+    start = time.time()
+    fit_texts = X if train_idx is None else [X[i] for i in train_idx]
+    features = TfidfVectorizer(**vec_config).fit(fit_texts).transform(X).tocsr()
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, data=features.data, indices=features.indices, indptr=features.indptr,
+             shape=np.asarray(features.shape), y=np.asarray(y, dtype=np.int64))
+    os.replace(tmp_path, path)
+    print(f"💾 Features for {vec_config} ({features.shape[1]} columns) in {time.time() - start:.1f}s -> {path}")
+    return path
+
+
+def _load_features(path):
+    with np.load(path) as data:
+        X = sparse.csr_matrix((data['data'], data['indices'], data['indptr']), shape=tuple(data['shape']))
+        return X, data['y']
+
+
+def evaluate_fold(feature_path, spec, train_idx, test_idx):
+    """Fit one classifier config on one CV fold (runs in a worker process)"""
+    X, y = _load_features(feature_path)
+    # XGBoost wants labels 0..k-1; VotingClassifier does this internally
+    classes, y = np.unique(y, return_inverse=True)
+    model = make_classifier(spec)
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_s = time.perf_counter() - start
+    start = time.perf_counter()
+    pred = np.ravel(model.predict(X[test_idx])).astype(int)
+    predict_us = (time.perf_counter() - start) / len(test_idx) * 1e6
+    return {
+        'fit_s': fit_s,
+        'predict_us': predict_us,
+        'accuracy': accuracy_score(y[test_idx], pred),
+        'macro_f1': f1_score(y[test_idx], pred, average='macro'),
+    }
+
+
+def pareto_front(results):
+    """True for rows no other row beats on both predict time and accuracy"""
+    order = results.sort_values(['predict_us', 'accuracy'], ascending=[True, False]).index
+    front, best = pd.Series(False, index=results.index), -1.0
+    for i in order:
+        if results.at[i, 'accuracy'] > best:
+            front[i] = True
+            best = results.at[i, 'accuracy']
+    return front
+
+
+def search_router(X, y, vectorizer_grid=VECTORIZER_GRID, classifier_grid=CLASSIFIER_GRID,
+                  folds=CV_FOLDS, max_workers=MAX_WORKERS):
+    """
+    Cross-validate every (vectorizer, classifier) pair.
+
+    The TF-IDF vectorizer is refitted on each fold's training rows, so the
+    held-out scores include the vocabulary and idf drift a deployed router sees.
+
+    Returns:
+        DataFrame with one row per pair: mean fit seconds, predict µs/query,
+        held-out accuracy and macro-F1 over the folds, a 'pareto' flag and an
+        'error' column (metrics are NaN for pairs whose fits failed)
+    """
+    y = np.asarray(y)
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=SEED).split(np.zeros(len(y)), y))
+    feature_paths = [[cached_features(X, y, vec_config, train_idx) for train_idx, _ in splits]
+                     for vec_config in vectorizer_grid]
+
+    jobs = {}
+    fold_results = {}
+    errors = {}
+    print(f"\n🚀 {len(vectorizer_grid) * len(classifier_grid) * folds} fits on {max_workers} workers...")
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        for v, paths in enumerate(feature_paths):
+            for c, spec in enumerate(classifier_grid):
+                for path, (train_idx, test_idx) in zip(paths, splits):
+                    jobs[executor.submit(evaluate_fold, path, spec, train_idx, test_idx)] = (v, c)
+        for future in as_completed(jobs):
+            v, c = jobs[future]
+            try:
+                fold_results.setdefault((v, c), []).append(future.result())
+            except Exception as e:
+                if (v, c) not in errors:
+                    errors[(v, c)] = f"{type(e).__name__}: {e}"
+                    print(f"✗ {config_name(classifier_grid[c])} on vectorizer {v}: {errors[(v, c)]}")
+
+    rows = []
+    for v, vec_config in enumerate(vectorizer_grid):
+        for c, spec in enumerate(classifier_grid):
+            scores = fold_results.get((v, c), [])
+            row = {
+                'vectorizer': f"ngram={vec_config['ngram_range']} min_df={vec_config['min_df']} "
+                              f"max_features={vec_config['max_features']}",
+                'classifier': config_name(spec),
+            }
+            for metric in ('fit_s', 'predict_us', 'accuracy', 'macro_f1'):
+                row[metric] = float(np.mean([s[metric] for s in scores])) if (v, c) not in errors else np.nan
+            row['error'] = errors.get((v, c), "")
+            rows.append(row)
+    results = pd.DataFrame(rows)
+    if len(results):
+        ok = results['error'] == ""
+        results['pareto'] = False
+        if ok.any():
+            results.loc[ok, 'pareto'] = pareto_front(results[ok])
+        results = results.sort_values('predict_us', ignore_index=True)
+    return results
+
+
+def fastest_meeting_floor(results, accuracy_floor=ACCURACY_FLOOR):
+    """Row with the lowest predict µs/query whose held-out accuracy is >= the floor, or None"""
+    ok = results[results['accuracy'] >= accuracy_floor]
+    return None if ok.empty else ok.sort_values(['predict_us', 'fit_s']).iloc[0]
+
+
+if __name__ == "__main__":
+    floor = float(sys.argv[sys.argv.index("--floor") + 1]) if "--floor" in sys.argv else ACCURACY_FLOOR
+    X, y, _ = load_router_dataset(DATASET_PARQUET, DATASET_CSV)
+    results = search_router(X.tolist(), y)
+    results.to_csv(RESULTS_FILE, index=False)
+
+    print("\n📊 Time vs accuracy (mean over folds; * = Pareto-optimal):")
+    table = results.assign(pareto=results['pareto'].map({True: '*', False: ''}))
+    failed = table['error'] != ""
+    print(table[~failed].drop(columns='error').to_string(index=False, float_format=lambda v: f"{v:.4f}"))
+    if failed.any():
+        print(f"\n✗ {failed.sum()} configs failed:")
+        print(table.loc[failed, ['vectorizer', 'classifier', 'error']].to_string(index=False))
+    print(f"\n💾 Saved: {RESULTS_FILE}")
+
+    best = fastest_meeting_floor(results, floor)
+    if best is None:
+        print(f"✗ No config reaches accuracy {floor:.2f}.")
+    else:
+        print(f"✅ Fastest router with accuracy >= {floor:.2f}: {best['classifier']} on {best['vectorizer']} "
+              f"({best['predict_us']:.1f} µs/query, accuracy {best['accuracy']:.4f}, fit {best['fit_s']:.2f}s)")
@@ -0,0 +1,132 @@
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict
+import joblib
+import numpy as np
+
+TFIDF_PATH = "tfidf_vectorizer.joblib"
+VOTING_PATH = "voting_model.joblib"
+CACHE_SIZE = 10_000      # Normalized queries whose probabilities are kept
+TOP_K = 3
+BENCHMARK_BATCH_SIZES = (1, 10, 100, 1000, 10_000)
+
+
+def clean_text(text):
+    """Same normalization the router was trained on (router_ml_classifier.py)"""
+    return re.sub(r"[^\w\s]", "", str(text).lower())
+
+
+class RouterService:
+    """
+    Batched router over the saved TF-IDF vectorizer and voting ensemble.
+
+    Every call normalizes its queries with clean_text, answers repeats from an
+    LRU cache of probability rows, and sends the remaining unique queries
+    through the vectorizer and ensemble in a single batch.
+    """
+
+    def __init__(self, vectorizer, model, cache_size=CACHE_SIZE):
+        self.vectorizer = vectorizer
+        self.model = model
+        self.classes_ = np.asarray(model.classes_)
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, tfidf_path=TFIDF_PATH, voting_path=VOTING_PATH, cache_size=CACHE_SIZE):
+        return cls(joblib.load(tfidf_path), joblib.load(voting_path), cache_size)
+
+    def clear_cache(self):
+        with self.lock:
+            self.cache.clear()
+            self.hits = self.misses = 0
+
+    def predict_proba(self, queries):
+        """Class probabilities, shape (len(queries), n_classes), columns in classes_ order"""
+        keys = [clean_text(q) for q in queries]
+        rows = {}
+        with self.lock:
+            for key in keys:
+                if key in rows:
+                    continue
+                row = self.cache.get(key)
+                if row is not None:
+                    self.cache.move_to_end(key)
+                    rows[key] = row
+                    self.hits += 1
+        missing = [key for key in dict.fromkeys(keys) if key not in rows]
+        if missing:
+            probs = self.model.predict_proba(self.vectorizer.transform(missing)).astype(np.float32)
+            with self.lock:
+                self.misses += len(missing)
+                for key, row in zip(missing, probs):
+                    rows[key] = row
+                    if self.cache_size:
+                        self.cache[key] = row
+                        self.cache.move_to_end(key)
+                while len(self.cache) > self.cache_size:
+                    self.cache.popitem(last=False)
+        if not keys:
+            return np.empty((0, len(self.classes_)), dtype=np.float32)
+        return np.stack([rows[key] for key in keys])
+
+    def top_k(self, queries, k=TOP_K):
+        """
+        Most likely chapters per query.
+
+        Returns:
+            (chapters, probabilities): arrays of shape (len(queries), k), best first
+        """
+        probs = self.predict_proba(queries)
+        k = min(k, probs.shape[1])
+        order = np.argsort(-probs, axis=1, kind='stable')[:, :k]
+        return self.classes_[order], np.take_along_axis(probs, order, axis=1)
+
+    def predict(self, queries):
+        """Best chapter per query, like the sklearn pipeline's predict()"""
+        return self.classes_[self.predict_proba(queries).argmax(axis=1)]
+
+
+def benchmark_router(service, queries, batch_sizes=BENCHMARK_BATCH_SIZES, k=TOP_K):
+    """
+    Queries/s of top_k() per batch size, cold (empty cache) and warm (every
+    query cached). Batches larger than `queries` reuse queries cyclically,
+    and repeats within a batch are only scored once.
+    """
+    print(f"{'batch':>7} {'cold q/s':>12} {'warm q/s':>12}")
+    results = []
+    for size in batch_sizes:
+        batch = [queries[i % len(queries)] for i in range(size)]
+        service.clear_cache()
+        t0 = time.perf_counter()
+        service.top_k(batch, k)
+        cold = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        service.top_k(batch, k)
+        warm = time.perf_counter() - t0
+        results.append({'batch_size': size, 'cold_qps': size / cold, 'warm_qps': size / warm})
+        print(f"{size:>7} {size / cold:>12.1f} {size / warm:>12.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    import os
+    import pandas as pd
+
+    dataset = "Router_Dataset.parquet" if os.path.exists("Router_Dataset.parquet") else "Router_Dataset.csv"
+    questions = pd.read_parquet(dataset) if dataset.endswith(".parquet") else pd.read_csv(dataset)
+    questions = questions['question'].astype(str).tolist()
+
+    service = RouterService.load()
+    print(f"📂 Loaded router and {len(questions)} questions from {dataset}.")
+    if "--benchmark" in sys.argv:
+        benchmark_router(service, questions)
+    else:
+        chapters, probs = service.top_k(questions[:5])
+        for q, chs, ps in zip(questions[:5], chapters, probs):
+            print(f"Q: {q}\n→ " + ", ".join(f"Chapter {c} ({p:.2f})" for c, p in zip(chs, ps)))
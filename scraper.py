@@ -1,29 +1,225 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from bs4 import BeautifulSoup, SoupStrainer
+import glob
 import os
+import sys
 import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-def scrape_gita_verses(chapter=1, start_verse=1, end_verse=47):
+from rate_limit import HostRateLimiter, backoff_delay
+from verse_manifest import content_hash, file_hash, load_manifest, save_manifest
+
+BASE_URL = "https://www.holy-bhagavad-gita.org/chapter"
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# This dictionary holds the total number of verses for each chapter.
+# Data derived from the provided index.txt
+CHAPTER_VERSE_COUNTS = {
+    1: 47,
+    2: 72,
+    3: 43,
+    4: 42,
+    5: 29,
+    6: 47,
+    7: 30,
+    8: 28,
+    9: 34,
+    10: 42,
+    11: 55,
+    12: 20,
+    13: 35,
+    14: 27,
+    15: 20,
+    16: 24,
+    17: 28,
+    18: 78,
+}
+
+# Concurrent mode settings (used by scrape_all_concurrent)
+MAX_WORKERS = 8            # Max in-flight requests
+REQUESTS_PER_SECOND = 5.0  # Polite per-host rate limit
+BURST = 5                  # Token-bucket capacity
+MAX_RETRIES = 4            # Retries per verse on 429/5xx/connection errors
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Raw pages are kept here (Chapter_{c}_Verse_{nn}.html) when html_cache_dir is
+# passed, so verse files can be re-extracted without hitting the site again.
+HTML_CACHE_DIR = "html_cache"
+
+VERSE_DIV_CLASSES = ['bg-verse-translation', 'bg-verse-commentary']
+
+
+def _find_verse_text(soup):
+    # Extract verse translation
+    translation_section = soup.find('div', class_='bg-verse-translation')
+    verse_text = "N/A"
+    if translation_section:
+        verse_text = translation_section.get_text(strip=True)
+
+    # Extract commentary
+    commentary_section = soup.find('div', class_='bg-verse-commentary')
+    commentary_text = "N/A"
+    if commentary_section:
+        commentary_text = commentary_section.get_text(strip=True)
+
+    return verse_text, commentary_text
+
+
+def _extract_full(html):
+    # Original behaviour: build the whole page tree
+    return _find_verse_text(BeautifulSoup(html, 'html.parser'))
+
+
+def _extract_strainer(html, parser='html.parser'):
+    # Only the two verse divs (and their contents) are turned into tree nodes;
+    # everything else on the page is skipped by the tokenizer.
+    strainer = SoupStrainer('div', class_=VERSE_DIV_CLASSES)
+    return _find_verse_text(BeautifulSoup(html, parser, parse_only=strainer))
+
+
+def _extract_lxml(html):
+    return _extract_strainer(html, parser='lxml')
+
+
+EXTRACTORS = {
+    "soup": _extract_full,
+    "strainer": _extract_strainer,
+}
+try:
+    import lxml  # noqa: F401
+    EXTRACTORS["lxml"] = _extract_lxml
+except ImportError:
+    pass
+
+DEFAULT_EXTRACTOR = "strainer"
+
+
+def extract_verse(html, backend=DEFAULT_EXTRACTOR):
+    """
+    Pull the translation and commentary text out of a verse page.
+
+    Args:
+        html: Page bytes or str
+        backend: Key of EXTRACTORS. 'soup' parses the full page (the original
+            behaviour); 'strainer' and 'lxml' parse only the verse divs.
+            `benchmark_extractors` checks they all produce identical files.
+    """
+    return EXTRACTORS[backend](html)
+
+
+def format_verse(chapter, verse_num, verse_text, commentary_text):
+    """Build the text saved in Chapter_{c}_Verse_{nn}.txt"""
+    return f"""BHAGAVAD GITA - CHAPTER {chapter}, VERSE {verse_num}
+{'='*60}
+
+VERSE TRANSLATION:
+{'-'*60}
+{verse_text}
+
+COMMENTARY:
+{'-'*60}
+{commentary_text}
+"""
+
+
+def chapter_dir(chapter, output_root="."):
+    return os.path.join(output_root, f"Bhagavad_Gita_Chapter_{chapter}")
+
+
+def verse_path(chapter, verse_num, output_root="."):
+    return os.path.join(chapter_dir(chapter, output_root), f"Chapter_{chapter}_Verse_{verse_num:02d}.txt")
+
+
+def conditional_headers(entry, path):
+    """
+    If-None-Match / If-Modified-Since headers for a verse we already have on
+    disk. None if the file is missing or no longer matches the manifest's
+    sha256 (edited or replaced locally), so it gets downloaded again.
+    """
+    if not entry or not os.path.exists(path) or entry.get("sha256") != file_hash(path):
+        return {}
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def cached_html_path(html_cache_dir, chapter, verse_num):
+    return os.path.join(html_cache_dir, f"Chapter_{chapter}_Verse_{verse_num:02d}.html")
+
+
+def save_if_changed(chapter, verse_num, url, response, entry, output_root=".", html_cache_dir=None):
+    """
+    Write the verse file only if its extracted text changed.
+
+    Args:
+        response: Response to a (possibly conditional) GET for `url`
+        entry: Previous manifest entry for this verse, or None
+
+    Returns:
+        (status, entry): status is 'new', 'updated', 'unchanged' (304) or
+        'same' (re-downloaded but the text is identical); entry is the
+        manifest entry to record.
+    """
+    path = verse_path(chapter, verse_num, output_root)
+    if response.status_code == 304:
+        return "unchanged", entry
+
+    if html_cache_dir:
+        with open(cached_html_path(html_cache_dir, chapter, verse_num), 'wb') as f:
+            f.write(response.content)
+
+    verse_text, commentary_text = extract_verse(response.content)
+    content = format_verse(chapter, verse_num, verse_text, commentary_text)
+    new_entry = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "sha256": content_hash(content),
+        "file": os.path.basename(path),
+    }
+
+    # The file on disk is the truth; the manifest may be stale if it was edited or deleted
+    old_hash = file_hash(path) if os.path.exists(path) else None
+    if old_hash == new_entry["sha256"]:
+        return "same", new_entry
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    return ("updated" if old_hash else "new"), new_entry
+
+
+def scrape_gita_verses(chapter=1, start_verse=1, end_verse=47, base_url=BASE_URL, output_root=".", html_cache_dir=None):
     """
     Scrape Bhagavad Gita verses and commentaries from holy-bhagavad-gita.org
     
+    Verses already on disk are re-requested conditionally and only rewritten
+    when their text changed (see manifest.json in the chapter folder).
+    
     Args:
         chapter: Chapter number
         start_verse: Starting verse number
         end_verse: Ending verse number
+        base_url: Site root (override to point at a local stub server)
+        output_root: Folder the Bhagavad_Gita_Chapter_{n} directory is created in
+        html_cache_dir: If set, raw pages are also saved here
     """
     
     # Create directory for saving files
-    output_dir = f"Bhagavad_Gita_Chapter_{chapter}"
+    output_dir = chapter_dir(chapter, output_root)
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
         print(f"Created directory: {output_dir}")
+    if html_cache_dir:
+        os.makedirs(html_cache_dir, exist_ok=True)
     
-    base_url = "https://www.holy-bhagavad-gita.org/chapter"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-    }
-    
+    manifest = load_manifest(output_dir)
     print(f"--- Starting Chapter {chapter} (Verses {start_verse}-{end_verse}) ---")
     
     for verse_num in range(start_verse, end_verse + 1):
@@ -31,42 +227,14 @@ def scrape_gita_verses(chapter=1, start_verse=1, end_verse=47):
         
         try:
             print(f"Scraping Chapter {chapter}, Verse {verse_num}...", end=" ")
+            entry = manifest.get(verse_num)
+            headers = {**HEADERS, **conditional_headers(entry, verse_path(chapter, verse_num, output_root))}
             response = requests.get(url, headers=headers, timeout=10)
             response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract verse translation
-            translation_section = soup.find('div', class_='bg-verse-translation')
-            verse_text = "N/A"
-            if translation_section:
-                verse_text = translation_section.get_text(strip=True)
-            
-            # Extract commentary
-            commentary_section = soup.find('div', class_='bg-verse-commentary')
-            commentary_text = "N/A"
-            if commentary_section:
-                commentary_text = commentary_section.get_text(strip=True)
-            
-            # Prepare content
-            content = f"""BHAGAVAD GITA - CHAPTER {chapter}, VERSE {verse_num}
-{'='*60}
-
-VERSE TRANSLATION:
-{'-'*60}
-{verse_text}
-
-COMMENTARY:
-{'-'*60}
-{commentary_text}
-"""
-            
-            # Save to file
-            filename = f"{output_dir}/Chapter_{chapter}_Verse_{verse_num:02d}.txt"
-            with open(filename, 'w', encoding='utf-8') as f:
-                f.write(content)
-            
-            print("✓ Saved")
+            status, manifest[verse_num] = save_if_changed(chapter, verse_num, url, response, entry,
+                                                          output_root, html_cache_dir)
+            print("✓ Saved" if status in ("new", "updated") else "= Unchanged")
             
             # Be respectful to the server
             time.sleep(0.1) # 0.1-second delay between verses
@@ -76,38 +244,229 @@ COMMENTARY:
         except Exception as e:
             print(f"✗ Parsing error: {e}")
     
+    save_manifest(output_dir, manifest)
     print(f"--- Completed Chapter {chapter}. All verses saved to {output_dir}/ ---")
 
+
+def make_session(pool_size=MAX_WORKERS):
+    """A requests.Session whose keep-alive pool can hold one connection per worker."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def fetch_with_retry(session, url, limiter, headers=None, max_retries=MAX_RETRIES, timeout=10):
+    """
+    GET `url` through the per-host rate limiter.
+
+    429/5xx responses and connection errors are retried with jittered
+    exponential backoff (a Retry-After header, when sent, is honoured).
+    """
+    for attempt in range(max_retries + 1):
+        limiter.acquire(url)
+        try:
+            response = session.get(url, headers=headers, timeout=timeout)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            if attempt == max_retries:
+                raise
+            time.sleep(backoff_delay(attempt))
+            continue
+
+        if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+            retry_after = response.headers.get("Retry-After", "")
+            delay = float(retry_after) if retry_after.isdigit() else backoff_delay(attempt)
+            response.close()
+            time.sleep(delay)
+            continue
+
+        response.raise_for_status()
+        return response
+
+
+def scrape_verse(session, limiter, chapter, verse_num, entry=None, base_url=BASE_URL, output_root=".",
+                 html_cache_dir=None):
+    """Conditionally fetch, parse and save a single verse. Used by the concurrent mode."""
+    url = f"{base_url}/{chapter}/verse/{verse_num}/en/"
+    headers = conditional_headers(entry, verse_path(chapter, verse_num, output_root))
+    response = fetch_with_retry(session, url, limiter, headers=headers)
+    return save_if_changed(chapter, verse_num, url, response, entry, output_root, html_cache_dir)
+
+
+def scrape_all_concurrent(chapter_verse_counts=CHAPTER_VERSE_COUNTS, max_workers=MAX_WORKERS,
+                          requests_per_second=REQUESTS_PER_SECOND, burst=BURST,
+                          base_url=BASE_URL, output_root=".", html_cache_dir=None):
+    """
+    Scrape every verse of every chapter with a pooled session and a thread pool.
+
+    Verses from all chapters share one work queue, so a full refresh is bounded
+    by the per-host token bucket (`requests_per_second`, `burst`) rather than by
+    round-trip latency. `max_workers` caps the number of in-flight requests.
+
+    Each chapter's manifest.json is used for conditional requests, so verses
+    that did not change upstream are neither re-parsed nor rewritten.
+
+    Returns:
+        (saved, failed): number of verse files written and list of (chapter, verse, error)
+    """
+    manifests = {}
+    for chapter in chapter_verse_counts:
+        os.makedirs(chapter_dir(chapter, output_root), exist_ok=True)
+        manifests[chapter] = load_manifest(chapter_dir(chapter, output_root))
+    if html_cache_dir:
+        os.makedirs(html_cache_dir, exist_ok=True)
+
+    jobs = [(chapter, verse_num)
+            for chapter, end_verse in chapter_verse_counts.items()
+            for verse_num in range(1, end_verse + 1)]
+
+    print(f"--- Scraping {len(jobs)} verses from {len(chapter_verse_counts)} chapters "
+          f"({max_workers} workers, {requests_per_second}/s per host) ---")
+
+    session = make_session(max_workers)
+    limiter = HostRateLimiter(requests_per_second, burst)
+    saved = 0
+    unchanged = 0
+    failed = []
+    start = time.perf_counter()
+
+    try:
+        with session, ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(scrape_verse, session, limiter, chapter, verse_num,
+                            manifests[chapter].get(verse_num), base_url, output_root,
+                            html_cache_dir): (chapter, verse_num)
+                for chapter, verse_num in jobs
+            }
+            for future in as_completed(futures):
+                chapter, verse_num = futures[future]
+                try:
+                    status, manifests[chapter][verse_num] = future.result()
+                    if status in ("new", "updated"):
+                        saved += 1
+                        print(f"Chapter {chapter}, Verse {verse_num} ✓ Saved")
+                    else:
+                        unchanged += 1
+                        print(f"Chapter {chapter}, Verse {verse_num} = Unchanged")
+                except Exception as e:
+                    failed.append((chapter, verse_num, str(e)))
+                    print(f"Chapter {chapter}, Verse {verse_num} ✗ Error: {e}")
+    finally:
+        for chapter, manifest in manifests.items():
+            save_manifest(chapter_dir(chapter, output_root), manifest)
+
+    elapsed = time.perf_counter() - start
+    rate = len(jobs) / elapsed if elapsed > 0 else 0.0
+    print(f"--- Saved {saved}, unchanged {unchanged} of {len(jobs)} verses in {elapsed:.1f}s ({rate:.1f} verses/s) ---")
+    if failed:
+        print(f"--- {len(failed)} verses failed; re-run to retry them ---")
+    return saved, failed
+
+
+def _cached_pages(html_cache_dir):
+    """(chapter, verse_num, html bytes) for every page saved in html_cache_dir"""
+    pages = []
+    for path in sorted(glob.glob(os.path.join(html_cache_dir, "Chapter_*_Verse_*.html"))):
+        _, chapter, _, verse = os.path.basename(path)[:-len(".html")].split('_')
+        with open(path, 'rb') as f:
+            pages.append((int(chapter), int(verse), f.read()))
+    return pages
+
+
+def reparse_cached_html(html_cache_dir=HTML_CACHE_DIR, output_root=".", backend=DEFAULT_EXTRACTOR):
+    """
+    Rebuild every verse file from saved pages, without any network access.
+
+    Verse files whose text changed are rewritten and their manifest sha256
+    updated, so generate_qa.py sees them as changed.
+    """
+    start = time.perf_counter()
+    pages = _cached_pages(html_cache_dir)
+    manifests = {}
+    changed = 0
+    for chapter, verse_num, html in pages:
+        out_dir = chapter_dir(chapter, output_root)
+        os.makedirs(out_dir, exist_ok=True)
+        if chapter not in manifests:
+            manifests[chapter] = load_manifest(out_dir)
+        content = format_verse(chapter, verse_num, *extract_verse(html, backend))
+        path = verse_path(chapter, verse_num, output_root)
+        entry = manifests[chapter].get(verse_num) or {"url": None, "etag": None, "last_modified": None}
+        new_hash = content_hash(content)
+        if os.path.exists(path) and file_hash(path) == new_hash:
+            if entry.get("sha256") == new_hash:
+                continue
+        else:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            changed += 1
+        manifests[chapter][verse_num] = dict(entry, sha256=new_hash, file=os.path.basename(path))
+    for chapter, manifest in manifests.items():
+        save_manifest(chapter_dir(chapter, output_root), manifest)
+    print(f"Re-extracted {len(pages)} verses ({changed} changed) from {html_cache_dir}/ "
+          f"in {time.perf_counter() - start:.2f}s ({backend})")
+
+
+def benchmark_extractors(html_cache_dir=HTML_CACHE_DIR, backends=None):
+    """
+    Time every extractor backend over the saved page corpus.
+
+    Reports pages/sec (untraced run) and peak traced memory (separate run
+    under tracemalloc), and checks that each backend's verse files are
+    byte-identical to the full-parse 'soup' backend.
+    """
+    pages = _cached_pages(html_cache_dir)
+    if not pages:
+        print(f"No saved pages found in {html_cache_dir}/. Scrape with html_cache_dir set first.")
+        return {}
+
+    backends = backends or list(EXTRACTORS)
+    reference = [format_verse(c, v, *extract_verse(html, "soup")).encode('utf-8') for c, v, html in pages]
+
+    print(f"--- Benchmarking {len(backends)} extractors over {len(pages)} pages ---")
+    results = {}
+    for backend in backends:
+        start = time.perf_counter()
+        outputs = [format_verse(c, v, *extract_verse(html, backend)).encode('utf-8') for c, v, html in pages]
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        for _, _, html in pages:
+            extract_verse(html, backend)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        mismatches = sum(1 for a, b in zip(outputs, reference) if a != b)
+        results[backend] = {
+            "pages_per_sec": len(pages) / elapsed if elapsed > 0 else float('inf'),
+            "peak_mb": peak / 1e6,
+            "mismatches": mismatches,
+        }
+        status = "✓ identical" if mismatches == 0 else f"✗ {mismatches} differ"
+        print(f"{backend:>10}: {results[backend]['pages_per_sec']:8.1f} pages/s  "
+              f"peak {results[backend]['peak_mb']:6.2f} MB  {status}")
+    return results
+
+
 if __name__ == "__main__":
-    # This dictionary holds the total number of verses for each chapter.
-    # Data derived from the provided index.txt 
-    chapter_verse_counts = {
-        1: 47,  # 
-        2: 72,  # 
-        3: 43,  # 
-        4: 42,  # 
-        5: 29,  # 
-        6: 47,  # 
-        7: 30,  # 
-        8: 28,  # 
-        9: 34,  # 
-        10: 42, # 
-        11: 55, # 
-        12: 20, # 
-        13: 35, # 
-        14: 27, # 
-        15: 20, # 
-        16: 24, # 
-        17: 28, # 
-        18: 78  # 
-    }
-    
+    if "--benchmark" in sys.argv:
+        benchmark_extractors()
+        sys.exit()
+    if "--reparse" in sys.argv:
+        reparse_cached_html()
+        sys.exit()
+
     print("Starting script to scrape all 18 chapters of the Bhagavad Gita...")
+
+    if "--sequential" in sys.argv:
+        # Original one-verse-at-a-time mode
+        for chapter, end_verse in CHAPTER_VERSE_COUNTS.items():
+            scrape_gita_verses(chapter=chapter, start_verse=1, end_verse=end_verse, html_cache_dir=HTML_CACHE_DIR)
+            print(f"\nMoving to next chapter...\n")
+            time.sleep(0.5) # Add a 0.5-second pause between chapters
+    else:
+        scrape_all_concurrent(html_cache_dir=HTML_CACHE_DIR)
     
-    # Loop through the dictionary and call the scraper for each chapter
-    for chapter, end_verse in chapter_verse_counts.items():
-        scrape_gita_verses(chapter=chapter, start_verse=1, end_verse=end_verse)
-        print(f"\nMoving to next chapter...\n")
-        time.sleep(0.5) # Add a 0.5-second pause between chapters
-    
-    print("Script finished. All chapters have been processed.")
\ No newline at end of file
+    print("Script finished. All chapters have been processed.")
@@ -0,0 +1,256 @@
+import json
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Per-request stage timings for the Council app: each request's breakdown is
+# appended to a JSONL log and folded into histograms served in the Prometheus
+# text format. With enabled=False every call is a no-op.
+METRICS_LOG = "serving_metrics.jsonl"
+METRICS_PORT = 9464
+RECENT_REQUESTS = 50     # Breakdowns kept in memory for the app's debug panel
+SECONDS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+TOKENS_PER_S_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+WORKER_STAGES = ("adapter_load", "tokenize", "generate", "decode")
+
+COUNTERS = {
+    'council_requests_total': "Requests handled.",
+    'council_adapter_cache_total': "Adapter lookups in the inference worker, by result.",
+    'council_answer_cache_total': "Answer cache lookups, by result.",
+    'council_generated_tokens_total': "Tokens generated.",
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        if i < len(self.buckets):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def lines(self, name, labels=""):
+        """Prometheus sample lines (cumulative buckets)"""
+        sep = "," if labels else ""
+        out, total = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            out.append(f'{name}_bucket{{{labels}{sep}le="{bound}"}} {total}')
+        out.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {self.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        out.append(f"{name}_sum{suffix} {self.sum:.6f}")
+        out.append(f"{name}_count{suffix} {self.count}")
+        return out
+
+
+class RequestTrace:
+    """Stage timings and fields of one request (see ServingMetrics.request)"""
+
+    def __init__(self):
+        self.time = time.time()
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.fields = {}
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[stage] = self.stages.get(stage, 0.0) + time.perf_counter() - start
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def add_worker(self, reply):
+        """Fold an inference worker reply (its stage timings, tokens, adapter hit) into the trace"""
+        timings = reply.get('timings', {})
+        for stage in WORKER_STAGES:
+            if stage in timings:
+                self.stages[stage] = self.stages.get(stage, 0.0) + timings[stage]
+        self.fields['new_tokens'] = self.fields.get('new_tokens', 0) + reply.get('new_tokens', 0)
+        self.fields['batch_size'] = reply.get('batch_size')
+        if 'adapter_hit' in timings:
+            self.fields['adapter_hit'] = timings['adapter_hit']
+        if timings.get('generate'):
+            self.fields['tokens_per_s'] = reply.get('new_tokens', 0) / timings['generate']
+
+
+class _NoTrace:
+    """What request() yields when metrics are disabled"""
+    _span = nullcontext()
+
+    def span(self, stage):
+        return self._span
+
+    def set(self, **fields):
+        pass
+
+    def add_worker(self, reply):
+        pass
+
+
+_NO_TRACE = _NoTrace()
+
+
+class ServingMetrics:
+    """
+    Collects RequestTraces.
+
+    Args:
+        log_path: JSONL file each request's breakdown is appended to, or None
+        enabled: False turns request() into a no-op
+        recent: breakdowns kept for recent()
+    """
+
+    def __init__(self, log_path=METRICS_LOG, enabled=True, recent=RECENT_REQUESTS):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.recent_requests = deque(maxlen=recent)
+        self.log = open(log_path, 'a', encoding='utf-8') if enabled and log_path else None
+        self.stage_seconds = {}   # stage -> Histogram
+        self.tokens_per_s = Histogram(TOKENS_PER_S_BUCKETS)
+        self.counters = {}        # (counter name, label string) -> value
+        self.server = None
+
+    @contextmanager
+    def request(self):
+        """Yields a RequestTrace for one request and records it when the block ends"""
+        if not self.enabled:
+            yield _NO_TRACE
+            return
+        trace = RequestTrace()
+        try:
+            yield trace
+        finally:
+            self.record(trace)
+
+    def _count(self, name, labels="", value=1):
+        self.counters[(name, labels)] = self.counters.get((name, labels), 0) + value
+
+    def record(self, trace):
+        stages = dict(trace.stages, total=time.perf_counter() - trace.start)
+        record = {'time': trace.time, 'stages': {k: round(v, 6) for k, v in stages.items()}, **trace.fields}
+        with self.lock:
+            for stage, seconds in stages.items():
+                self.stage_seconds.setdefault(stage, Histogram(SECONDS_BUCKETS)).observe(seconds)
+            self._count('council_requests_total')
+            if 'adapter_hit' in trace.fields:
+                self._count('council_adapter_cache_total', f'result="{"hit" if trace.fields["adapter_hit"] else "miss"}"')
+            if 'cache' in trace.fields:
+                self._count('council_answer_cache_total', f'result="{trace.fields["cache"]}"')
+            if trace.fields.get('new_tokens'):
+                self._count('council_generated_tokens_total', value=trace.fields['new_tokens'])
+            if 'tokens_per_s' in trace.fields:
+                self.tokens_per_s.observe(trace.fields['tokens_per_s'])
+            self.recent_requests.append(record)
+            if self.log is not None:
+                self.log.write(json.dumps(record, default=str) + "\n")
+                self.log.flush()
+
+    def recent(self):
+        """Breakdowns of the last requests, oldest first"""
+        with self.lock:
+            return list(self.recent_requests)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self.lock:
+            lines = ["# HELP council_stage_seconds Time spent per serving stage.",
+                     "# TYPE council_stage_seconds histogram"]
+            for stage, histogram in sorted(self.stage_seconds.items()):
+                lines += histogram.lines("council_stage_seconds", f'stage="{stage}"')
+            lines += ["# HELP council_tokens_per_second Generation throughput per request.",
+                      "# TYPE council_tokens_per_second histogram"]
+            lines += self.tokens_per_s.lines("council_tokens_per_second")
+            for name, help_text in COUNTERS.items():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"{name}{{{labels}}} {value}" if labels else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=METRICS_PORT, host="127.0.0.1"):
+        """Serve render() at http://host:port/metrics from a daemon thread"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        if self.log is not None:
+            self.log.close()
+
+
+# ---------------------
+# Benchmark: instrumentation overhead per request
+# ---------------------
+def _fake_request(metrics):
+    with metrics.request() as trace:
+        for stage in ("router", "answer_cache", "find_adapter"):
+            with trace.span(stage):
+                pass
+        trace.set(chapter=2, cache="miss")
+        trace.add_worker({'new_tokens': 64, 'batch_size': 1, 'timings': {
+            'tokenize': 0.001, 'adapter_load': 0.0, 'adapter_hit': True, 'generate': 1.2, 'decode': 0.001}})
+
+
+def benchmark_overhead(requests=20_000):
+    """µs per request spent in instrumentation: disabled, enabled without a log, enabled with a JSONL log"""
+    import os
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = []
+        for label, kwargs in (("disabled", {'enabled': False}), ("in memory", {'log_path': None}),
+                              ("jsonl log", {'log_path': os.path.join(tmp, METRICS_LOG)})):
+            metrics = ServingMetrics(**kwargs)
+            start = time.perf_counter()
+            for _ in range(requests):
+                _fake_request(metrics)
+            rows.append((label, (time.perf_counter() - start) / requests * 1e6))
+            if label == "jsonl log":
+                sample = metrics.render()
+            metrics.close()
+    print(f"{'metrics':>10} {'µs/request':>11}")
+    for label, us in rows:
+        print(f"{label:>10} {us:>11.2f}")
+    print("\n" + "\n".join(sample.splitlines()[:4]) + "\n...")
+    return rows
+
+
+if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        benchmark_overhead()
+    else:
+        print("Usage: python serving_metrics.py --benchmark")
@@ -0,0 +1,80 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("peft")
+
+from adapter_manager import AdapterManager, adapter_name, make_synthetic_adapters, tiny_llama
+
+COUNT = 4
+INPUTS = torch.arange(1, 17).unsqueeze(0)
+
+# (request, attached adapters least recently used first, evicted by it) with room for two adapters
+ORDER = [
+    (1, ["ch1"], []),
+    (2, ["ch1", "ch2"], []),
+    (1, ["ch2", "ch1"], []),
+    (3, ["ch1", "ch3"], ["ch2"]),
+    (4, ["ch3", "ch4"], ["ch1"]),
+    (1, ["ch4", "ch1"], ["ch3"]),
+    (2, ["ch1", "ch2"], ["ch4"]),
+]
+
+
+@pytest.fixture(scope="module")
+def folders(tmp_path_factory):
+    return make_synthetic_adapters(tmp_path_factory.mktemp("adapters"), COUNT)
+
+
+@pytest.fixture(scope="module")
+def reference(folders):
+    """Logits of each adapter loaded on its own"""
+    from peft import PeftModel
+
+    with torch.no_grad():
+        return {idx: PeftModel.from_pretrained(tiny_llama(), str(folder)).eval()(INPUTS).logits
+                for idx, folder in folders.items()}
+
+
+def budgeted_manager(folders, fit):
+    """A manager whose memory budget holds exactly `fit` adapters, plus the list of evicted names"""
+    manager = AdapterManager(tiny_llama(), folders.get)
+    evicted = []
+    manager.on_evict.append(evicted.append)
+    with manager.using(1):
+        manager.memory_budget = manager.adapter_bytes(adapter_name(1)) * fit
+    return manager, evicted
+
+
+def test_outputs_match_per_adapter_loading(folders, reference):
+    manager = AdapterManager(tiny_llama(), folders.get)
+    for idx in [1, 2, 3, 4, 2, 1]:
+        with manager.using(idx) as model, torch.no_grad():
+            torch.testing.assert_close(model(INPUTS).logits, reference[idx], atol=1e-5, rtol=0)
+    assert manager.stats()['misses'] == COUNT
+    assert manager.stats()['hits'] == 2
+
+
+def test_budget_evicts_least_recently_used(folders, reference):
+    manager, evicted = budgeted_manager(folders, fit=2)
+    for idx, loaded, evicted_now in ORDER:
+        evicted.clear()
+        with manager.using(idx) as model, torch.no_grad():
+            logits = model(INPUTS).logits
+        torch.testing.assert_close(logits, reference[idx], atol=1e-5, rtol=0)
+        assert list(manager.loaded) == loaded, f"after request {idx}"
+        assert evicted == evicted_now, f"after request {idx}"
+
+    stats = manager.stats()
+    assert stats['hits'] + stats['misses'] == len(ORDER) + 1
+    assert stats['evictions'] == 4
+    assert stats['loaded'] == ["ch1", "ch2"]
+
+
+def test_unknown_adapter_leaves_loaded_ones_alone(folders):
+    manager, evicted = budgeted_manager(folders, fit=2)
+    with manager.using(2):
+        pass
+    assert manager.activate(COUNT + 1) is None
+    assert list(manager.loaded) == ["ch1", "ch2"]
+    assert evicted == []
@@ -0,0 +1,35 @@
+import pandas as pd
+import pytest
+
+from dedup_qa import dedup_qa_datasets
+
+
+def write_chapters(folder, chapters):
+    for i, questions in chapters.items():
+        pd.DataFrame({'question': questions, 'answer': ["a"] * len(questions)}).to_csv(
+            folder / f"Chapter_{i}_QA.csv", index=False)
+
+
+DUPLICATE = "How do I stay calm when my exams are coming and I feel stressed?"
+OTHER = "What does the verse say about performing duty without attachment to results?"
+
+
+@pytest.mark.parametrize("mode, within, cross", [
+    # Chapter 1 keeps the first copy: chapter 1's extra copy is within, chapter 2's is cross
+    ("keep_first", {1: 1, 2: 0}, {1: 0, 2: 1}),
+    # The whole cluster is dropped, every copy counts as cross-chapter
+    ("drop", {1: 0, 2: 0}, {1: 2, 2: 1}),
+])
+def test_removed_cross_compares_with_kept_representative(tmp_path, mode, within, cross):
+    write_chapters(tmp_path, {1: [DUPLICATE, DUPLICATE, OTHER], 2: [DUPLICATE]})
+    stats = dedup_qa_datasets(str(tmp_path), str(tmp_path / "out"), num_chapters=2,
+                              cross_chapter=mode).set_index('chapter')
+    assert stats['removed_within'].to_dict() == within
+    assert stats['removed_cross'].to_dict() == cross
+    assert (stats['before'] - stats['after']).to_dict() == {c: within[c] + cross[c] for c in (1, 2)}
+
+
+def test_no_rows(tmp_path):
+    write_chapters(tmp_path, {1: [], 2: []})
+    stats = dedup_qa_datasets(str(tmp_path), str(tmp_path / "out"), num_chapters=2)
+    assert stats['before'].sum() == 0
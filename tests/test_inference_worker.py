@@ -0,0 +1,98 @@
+from functools import partial
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("peft")
+
+from adapter_manager import make_synthetic_adapters
+from inference_worker import (BENCHMARK_PREFIX, REQUEST_TIMEOUT_S, InferenceClient, WorkerBusy, WorkerError,
+                              tiny_worker)
+
+CHAPTERS = 3
+TIMEOUT = 60
+
+
+@pytest.fixture(scope="module")
+def adapter_dir(tmp_path_factory):
+    path = tmp_path_factory.mktemp("adapters")
+    make_synthetic_adapters(path, CHAPTERS)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def client(adapter_dir):
+    # The worker is a spawned process, so the factory has to be picklable
+    client = InferenceClient(partial(tiny_worker, adapter_dir), startup_timeout=TIMEOUT)
+    yield client
+    client.close()
+
+
+def test_generate_returns_only_the_new_tokens(client):
+    reply = client.generate(1, "question: what is duty?", 8, timeout=TIMEOUT)
+    assert reply['new_tokens'] == 8
+    assert reply['batch_size'] == 1
+    assert "question" not in reply['text']
+    assert set(reply['timings']) >= {'tokenize', 'adapter_load', 'generate', 'decode'}
+
+
+def test_stream_matches_generate(client):
+    prompt = "question 1: how do I stay calm?"
+    expected = client.generate(2, prompt, 16, timeout=TIMEOUT)['text']
+    stream = client.stream(2, prompt, 16)
+    pieces = list(stream)
+    assert "".join(pieces) == stream.text == expected
+    assert stream.ttft <= stream.total
+
+
+def test_council_matches_sequential_generation(client):
+    chapters = list(range(1, CHAPTERS + 1))
+    prompts = [f"system {c}: answer as chapter {c}. question: what is duty?" for c in chapters]
+    one_by_one = [client.generate(c, p, 12, timeout=TIMEOUT)['text'] for c, p in zip(chapters, prompts)]
+    replies = [f.result(timeout=TIMEOUT) for f in client.council(chapters, prompts, 12)]
+    assert [reply['text'] for reply in replies] == one_by_one
+    assert {reply['batch_size'] for reply in replies} == {CHAPTERS}
+
+
+def test_prefix_cache_gives_the_same_replies(client):
+    for question in ("question 1: what is duty?", "question 2: how do I stay calm before exams?"):
+        prompt = BENCHMARK_PREFIX + question
+        without = client.generate(1, prompt, 8, timeout=TIMEOUT)['text']
+        assert client.generate(1, prompt, 8, timeout=TIMEOUT, prefix=BENCHMARK_PREFIX)['text'] == without
+
+
+def test_unknown_chapter_fails_the_job(client):
+    with pytest.raises(WorkerError, match="adapter unavailable"):
+        client.generate(CHAPTERS + 1, "question: what is duty?", 4, timeout=TIMEOUT)
+
+
+def test_close_drops_queued_jobs_when_the_queue_is_full(adapter_dir):
+    client = InferenceClient(partial(tiny_worker, adapter_dir), queue_size=2, max_batch_size=1,
+                             startup_timeout=TIMEOUT)
+    running = client.submit(1, "question: what is duty?", 400)
+    queued = []
+    with pytest.raises(WorkerBusy):
+        for i in range(10):
+            queued.append(client.submit(1, f"question {i}?", 400, timeout=0.2))
+    client.close(timeout=REQUEST_TIMEOUT_S)
+
+    assert not client.process.is_alive()
+    assert running.result(timeout=TIMEOUT)['new_tokens'] == 400
+    assert queued
+    for future in queued:
+        with pytest.raises(WorkerError):
+            future.result(timeout=TIMEOUT)
+
+
+def test_close_terminates_a_worker_that_does_not_finish(adapter_dir):
+    client = InferenceClient(partial(tiny_worker, adapter_dir), startup_timeout=TIMEOUT)
+    future = client.submit(1, "question: what is duty?", 1000)
+    stream = client.stream(1, "question: what is duty?", 1000)
+    client.close(timeout=0)
+
+    assert not client.process.is_alive()
+    with pytest.raises(WorkerError):
+        future.result(timeout=TIMEOUT)
+    with pytest.raises(WorkerError):
+        list(stream)
@@ -0,0 +1,51 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from adapter_manager import tiny_llama
+from inference_worker import ByteTokenizer
+from train_adapters import Collator, PackedChapter, packed_and_padded_loss, packing_examples
+
+
+@pytest.fixture(scope="module")
+def tokenizer():
+    return ByteTokenizer()
+
+
+@pytest.fixture(scope="module")
+def dataset(tokenizer):
+    return packing_examples(tokenizer, examples=24, max_length=512)
+
+
+@pytest.mark.parametrize("size", [1, 3, 8])
+def test_packed_loss_matches_padded(tokenizer, dataset, size):
+    padded_loss, packed_loss = packed_and_padded_loss(tiny_llama(), dataset[:size], tokenizer.pad_token_id)
+    assert packed_loss == pytest.approx(padded_loss, abs=1e-4)
+
+
+def test_packed_sequences_hold_every_example_once(dataset):
+    packed = PackedChapter(dataset, max_length=512)
+    members = sorted(i for sequence in packed.sequences for i in sequence)
+    assert members == list(range(len(dataset)))
+    for i in range(len(packed)):
+        assert len(packed[i]['input_ids']) <= 512
+
+
+def test_packed_batch_has_no_attention_mask(tokenizer, dataset):
+    # transformers only derives the block-diagonal mask from position_ids without one
+    batch = Collator(tokenizer.pad_token_id)([PackedChapter(dataset[:4], 10 ** 6)[0]])
+    assert batch.get('attention_mask') is None
+    assert batch['use_cache'] is False
+
+
+def test_pack_rejected_with_unsloth_wrap():
+    from functools import partial
+    from train_adapters import check_batching, peft_wrap, unsloth_wrap
+
+    with pytest.raises(ValueError):
+        check_batching("pack", unsloth_wrap)
+    with pytest.raises(ValueError):
+        check_batching("pack", partial(unsloth_wrap, seed=0))
+    check_batching("pack", peft_wrap)
+    check_batching("bucket", unsloth_wrap)
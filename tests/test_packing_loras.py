@@ -0,0 +1,52 @@
+import os
+import zipfile
+
+import pytest
+
+from packing_loras import renamed_folders, repack_lora_adapters
+
+
+def make_source_archives(source_dir, count=3, size=3 << 20):
+    originals = list(renamed_folders())[:count]
+    for i, original_folder in enumerate(originals):
+        with zipfile.ZipFile(os.path.join(source_dir, f"{original_folder}.zip"), 'w') as zf:
+            zf.writestr(f"{original_folder}/adapter_model.safetensors", bytes([i]) * size)
+            zf.writestr(f"{original_folder}/adapter_config.json", '{"r": %d}' % i)
+    return originals
+
+
+def test_repack_is_ordered_and_complete(tmp_path):
+    originals = make_source_archives(tmp_path)
+    output = str(tmp_path / "out.zip")
+    assert repack_lora_adapters(str(tmp_path), output)
+
+    names = renamed_folders()
+    expected = [f"{names[o]}/{f}" for o in originals for f in ("adapter_model.safetensors", "adapter_config.json")]
+    with zipfile.ZipFile(output) as zf:
+        assert zf.testzip() is None
+        assert zf.namelist() == expected
+        for i, original_folder in enumerate(originals):
+            with zipfile.ZipFile(tmp_path / f"{original_folder}.zip") as src:
+                assert zf.read(f"{names[original_folder]}/adapter_model.safetensors") == \
+                       src.read(f"{original_folder}/adapter_model.safetensors")
+    assert not os.path.exists(output + ".tmp")
+
+
+@pytest.mark.parametrize("damage", ["truncate", "corrupt member"])
+def test_failed_repack_keeps_previous_output(tmp_path, damage):
+    originals = make_source_archives(tmp_path)
+    output = tmp_path / "out.zip"
+    output.write_bytes(b"previous archive")
+
+    broken = tmp_path / f"{originals[1]}.zip"
+    data = bytearray(broken.read_bytes())
+    if damage == "truncate":
+        broken.write_bytes(bytes(data[:len(data) // 2]))
+    else:
+        # Flip bytes inside the stored member so the CRC check fails mid-copy
+        data[len(data) // 3] ^= 0xFF
+        broken.write_bytes(bytes(data))
+
+    assert not repack_lora_adapters(str(tmp_path), str(output))
+    assert output.read_bytes() == b"previous archive"
+    assert not os.path.exists(str(output) + ".tmp")
@@ -0,0 +1,145 @@
+import csv
+import json
+
+import pytest
+
+import generate_qa
+from generate_qa import FakeModel, process_chapter, process_chapters_parallel
+from qa_journal import QAJournal
+
+
+class FlakyStreamModel(FakeModel):
+    """FakeModel whose first stream dies after `fail_after` chunks"""
+
+    def __init__(self, fail_after=12, **kwargs):
+        super().__init__(chunk_size=16, **kwargs)
+        self.fail_after = fail_after
+        self.failed = False
+
+    def generate_stream(self, prompt):
+        for i, chunk in enumerate(super().generate_stream(prompt)):
+            if not self.failed and i == self.fail_after:
+                self.failed = True
+                raise ConnectionError("stream dropped")
+            yield chunk
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(generate_qa.time, "sleep", lambda seconds: None)
+
+
+def make_chapter(tmp_path, verses=3):
+    chapter_dir = tmp_path / "Bhagavad_Gita_Chapter_1"
+    chapter_dir.mkdir()
+    for v in range(1, verses + 1):
+        (chapter_dir / f"Chapter_1_Verse_{v:02d}.txt").write_text(f"verse {v} text\n", encoding="utf-8")
+    out = tmp_path / "out"
+    out.mkdir()
+    return out
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return [(row['verse_source'], row['question'], row['answer']) for row in csv.DictReader(f)]
+
+
+def expected_rows(tmp_path, model, verses):
+    rows = []
+    for v in range(1, verses + 1):
+        verse_file = tmp_path / "Bhagavad_Gita_Chapter_1" / f"Chapter_1_Verse_{v:02d}.txt"
+        prompt = generate_qa.build_prompt(generate_qa.read_verse_file(verse_file), 1)
+        rows += [(f"1.{v}", qa['question'], qa['answer'])
+                 for qa in generate_qa.parse_qa_response(model._reply(prompt))]
+    return rows
+
+
+def test_streamed_pairs_reach_journal_before_verse_is_done(tmp_path):
+    out = make_chapter(tmp_path, verses=1)
+    journal = QAJournal(out, 1)
+    seen = []
+
+    def on_pair(qa):
+        journal.append_pair(1, "sha", qa)
+        journal.journal.flush()
+        lines = (out / "Chapter_1_QA.journal.jsonl").read_text(encoding="utf-8").splitlines()
+        seen.append(len(lines))
+
+    model = FakeModel(pairs=4, chunk_size=8)
+    prompt = generate_qa.build_prompt("verse", 1)
+    generate_qa.stream_qa_pairs(model, prompt, on_pair, on_start=lambda: journal.start_verse(1))
+    assert seen == [1, 2, 3, 4]
+    assert not journal.is_done(1, "sha")
+    journal.finish_verse(1, "sha")
+    assert journal.is_done(1, "sha")
+    assert journal.materialize(out / "Chapter_1_QA.csv", {1: "sha"}) == 4
+    journal.close()
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_failed_stream_attempt_is_not_duplicated(tmp_path, parallel):
+    out = make_chapter(tmp_path, verses=3)
+    model = FlakyStreamModel(pairs=4)
+    if parallel:
+        process_chapters_parallel([1], str(tmp_path), out, model, stream=True, max_workers=1,
+                                  requests_per_minute=6000)
+    else:
+        process_chapter(1, str(tmp_path), out, model, stream=True)
+    assert model.failed
+    assert read_csv(out / "Chapter_1_QA.csv") == expected_rows(tmp_path, model, 3)
+
+    # The dropped attempt left pair lines in the journal that no marker points at
+    records = [json.loads(line) for line in (out / "Chapter_1_QA.journal.jsonl").read_text().splitlines()]
+    assert sum('pair' in r for r in records) > 3 * 4
+    assert sum('pair_offsets' in r for r in records) == 3
+
+
+def test_verse_without_done_marker_is_regenerated(tmp_path):
+    out = make_chapter(tmp_path, verses=1)
+    with QAJournal(out, 1) as journal:
+        journal.start_verse(1)
+        journal.append_pair(1, "sha", {'question': "q", 'answer': "a"})
+        # crash before finish_verse
+    with QAJournal(out, 1) as journal:
+        assert not journal.is_done(1, "sha")
+        journal.append(1, "sha", [{'question': "q2", 'answer': "a2"}])
+        assert journal.materialize(out / "Chapter_1_QA.csv", {1: "sha"}) == 1
+    assert read_csv(out / "Chapter_1_QA.csv") == [("1.1", "q2", "a2")]
+
+
+def test_materialize_replaces_stale_csv_when_nothing_matches(tmp_path):
+    out = make_chapter(tmp_path, verses=1)
+    csv_path = out / "Chapter_1_QA.csv"
+    with QAJournal(out, 1) as journal:
+        journal.append(1, "old", [{'question': "q", 'answer': "a"}])
+        assert journal.materialize(csv_path, {1: "old"}) == 1
+        # The verse text changed, so its old pairs no longer count
+        assert journal.materialize(csv_path, {1: "new"}) == 0
+    assert read_csv(csv_path) == []
+    assert csv_path.read_text(encoding='utf-8').splitlines() == ["chapter,verse_source,question,answer"]
+    assert not (out / "Chapter_1_QA.csv.tmp").exists()
+
+
+def test_repeated_replay_does_not_grow_journal(tmp_path, monkeypatch):
+    from llm_cache import ResponseCache
+
+    out = make_chapter(tmp_path, verses=3)
+    model = FakeModel(pairs=3)
+    cache = ResponseCache(str(out / "cache.sqlite"))
+    process_chapters_parallel([1], str(tmp_path), out, model, cache=cache, requests_per_minute=6000)
+    journal_path = out / "Chapter_1_QA.journal.jsonl"
+    size = journal_path.stat().st_size
+    csv_rows = read_csv(out / "Chapter_1_QA.csv")
+
+    for _ in range(3):
+        generate_qa.replay_from_cache([1], str(tmp_path), out, cache, model_name=model.name)
+    assert journal_path.stat().st_size == size
+    assert read_csv(out / "Chapter_1_QA.csv") == csv_rows
+
+    # A changed parse of the cached reply is still replayed
+    original = generate_qa.parse_qa_response
+    monkeypatch.setattr(generate_qa, "parse_qa_response",
+                        lambda text: [dict(qa, answer=qa['answer'].upper()) for qa in original(text)])
+    generate_qa.replay_from_cache([1], str(tmp_path), out, cache, model_name=model.name)
+    assert journal_path.stat().st_size > size
+    assert read_csv(out / "Chapter_1_QA.csv") == [(v, q, a.upper()) for v, q, a in csv_rows]
@@ -0,0 +1,59 @@
+import random
+
+import pytest
+
+from generate_qa import QAStreamParser, parse_qa_response
+
+SAMPLE_REPLIES = [
+    # Well-formed
+    "Q: What is dharma?\nA: One's duty.\n\nQ: Who is Arjuna?\nA: A warrior prince.\n",
+    # Multi-line answers, indentation, CRLF line endings
+    "Q: Why does Arjuna hesitate?\r\nA: He sees his kin\r\n   on both sides.\r\nQ: What does Krishna say?\r\nA: Act without attachment.",
+    # Preamble before the first question, no trailing newline
+    "Here are the pairs:\n\nQ: What is yoga?\nA: Skill in action.",
+    # Malformed: question without an answer, answer without a question
+    "A: orphan answer\nQ: Unanswered?\nQ: Answered?\nA: Yes.\nQ: Last one without answer",
+    # Malformed: no markers at all, empty reply, whitespace only
+    "Just some prose with no markers.\nAnother line.",
+    "",
+    "  \n\n \t\n",
+    # Marker split across lines and "A:" continuation lines
+    "Q: Split\n question?\nA: First part.\nA: Second part.\nmore text\n",
+]
+
+
+def feed_in_chunks(text, rng):
+    parser = QAStreamParser()
+    pairs, seen = [], []
+    i = 0
+    while i < len(text):
+        size = rng.randint(1, 12)
+        pairs += parser.feed(text[i:i + size], on_pair=seen.append)
+        i += size
+    pairs += parser.close(on_pair=seen.append)
+    return pairs, seen
+
+
+@pytest.mark.parametrize("reply", SAMPLE_REPLIES)
+@pytest.mark.parametrize("seed", range(20))
+def test_random_chunking_matches_parse_qa_response(reply, seed):
+    pairs, seen = feed_in_chunks(reply, random.Random(seed))
+    assert pairs == parse_qa_response(reply)
+    assert seen == pairs
+
+
+@pytest.mark.parametrize("reply", SAMPLE_REPLIES)
+def test_single_chunk_and_per_character(reply):
+    parser = QAStreamParser()
+    assert parser.feed(reply) + parser.close() == parse_qa_response(reply)
+
+    parser = QAStreamParser()
+    pairs = [qa for ch in reply for qa in parser.feed(ch)] + parser.close()
+    assert pairs == parse_qa_response(reply)
+
+
+def test_parser_is_reusable_after_close():
+    parser = QAStreamParser()
+    first, second = SAMPLE_REPLIES[0], SAMPLE_REPLIES[2]
+    assert parser.feed(first) + parser.close() == parse_qa_response(first)
+    assert parser.feed(second) + parser.close() == parse_qa_response(second)
@@ -0,0 +1,155 @@
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("bs4")
+pytest.importorskip("requests")
+
+import scraper
+from verse_manifest import load_manifest
+
+PAGE = """<html><head><title>Verse</title></head><body>
+<nav>menu</nav>
+<div class="bg-verse-translation"><p>Translation {chapter}.{verse}</p></div>
+<div class="bg-verse-commentary"><p>Commentary on {chapter}.{verse}</p></div>
+</body></html>"""
+
+
+class StubSite:
+    """
+    Local stand-in for holy-bhagavad-gita.org. `failures` maps a request path
+    to a list of status codes returned (in order) before the page is served;
+    pages carry an ETag and conditional requests get a 304.
+    """
+
+    def __init__(self, failures=None):
+        self.failures = {path: list(codes) for path, codes in (failures or {}).items()}
+        self.requests = []   # (monotonic time, path, status)
+        self.lock = threading.Lock()
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = self.path.strip('/').split('/')   # chapter/<c>/verse/<v>/en
+                chapter, verse = int(parts[1]), int(parts[3])
+                etag = f'"{chapter}-{verse}"'
+                with site.lock:
+                    codes = site.failures.get(self.path)
+                    status = codes.pop(0) if codes else None
+                    if status is None:
+                        status = 304 if self.headers.get("If-None-Match") == etag else 200
+                    site.requests.append((time.monotonic(), self.path, status))
+                if status == 200:
+                    body = PAGE.format(chapter=chapter, verse=verse).encode('utf-8')
+                    self.send_response(200)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                self.send_response(status)
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}/chapter"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def statuses(self):
+        return [status for _, _, status in self.requests]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def site_factory():
+    sites = []
+
+    def make(**kwargs):
+        sites.append(StubSite(**kwargs))
+        return sites[-1]
+
+    yield make
+    for site in sites:
+        site.close()
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(scraper, "backoff_delay", lambda attempt: 0.0)
+
+
+def scrape(site, root, counts, **kwargs):
+    kwargs = {'max_workers': 4, 'requests_per_second': 1000, 'burst': 1000, **kwargs}
+    return scraper.scrape_all_concurrent(counts, base_url=site.base_url, output_root=str(root), **kwargs)
+
+
+def test_concurrent_scrape_retries_until_success(tmp_path, site_factory):
+    site = site_factory(failures={"/chapter/1/verse/2/en/": [503],
+                                  "/chapter/2/verse/1/en/": [429, 502]})
+    saved, failed = scrape(site, tmp_path, {1: 3, 2: 2})
+
+    assert (saved, failed) == (5, [])
+    assert sorted(site.statuses()) == sorted([200] * 5 + [503, 429, 502])
+    for chapter, verses in {1: 3, 2: 2}.items():
+        manifest = load_manifest(scraper.chapter_dir(chapter, str(tmp_path)))
+        assert sorted(manifest) == list(range(1, verses + 1))
+        for verse in range(1, verses + 1):
+            with open(scraper.verse_path(chapter, verse, str(tmp_path)), encoding='utf-8') as f:
+                text = f.read()
+            assert f"Translation {chapter}.{verse}" in text and f"Commentary on {chapter}.{verse}" in text
+
+
+def test_gives_up_after_max_retries(tmp_path, site_factory):
+    site = site_factory(failures={"/chapter/1/verse/1/en/": [503] * (scraper.MAX_RETRIES + 1)})
+    saved, failed = scrape(site, tmp_path, {1: 2})
+    assert saved == 1
+    assert [(c, v) for c, v, _ in failed] == [(1, 1)]
+    assert site.statuses().count(503) == scraper.MAX_RETRIES + 1
+
+
+def test_token_bucket_caps_request_rate(tmp_path, site_factory):
+    site = site_factory()
+    rate, burst, verses = 20.0, 2, 12
+    start = time.monotonic()
+    saved, failed = scrape(site, tmp_path, {1: verses}, max_workers=8, requests_per_second=rate, burst=burst)
+    assert (saved, failed) == (verses, [])
+
+    # Beyond the initial burst, the i-th request can't arrive before (i + 1 - burst) / rate
+    times = sorted(t - start for t, _, _ in site.requests)
+    for i, t in enumerate(times):
+        assert i + 1 <= burst + rate * t + 1, f"request {i + 1} at {t:.3f}s exceeds the bucket"
+    assert times[-1] >= (verses - burst) / rate * 0.9
+
+
+def test_rescrape_is_conditional_and_repairs_local_files(tmp_path, site_factory):
+    site = site_factory()
+    counts = {1: 3}
+    assert scrape(site, tmp_path, counts) == (3, [])
+
+    site.requests.clear()
+    assert scrape(site, tmp_path, counts) == (0, [])
+    assert site.statuses() == [304, 304, 304]
+
+    # A locally edited and a deleted verse file are downloaded and rewritten
+    edited = scraper.verse_path(1, 1, str(tmp_path))
+    deleted = scraper.verse_path(1, 2, str(tmp_path))
+    with open(edited, 'w', encoding='utf-8') as f:
+        f.write("edited by hand\n")
+    os.remove(deleted)
+    site.requests.clear()
+    assert scrape(site, tmp_path, counts) == (2, [])
+    assert sorted(site.statuses()) == [200, 200, 304]
+    for path, verse in ((edited, 1), (deleted, 2)):
+        with open(path, encoding='utf-8') as f:
+            assert f"Translation 1.{verse}" in f.read()
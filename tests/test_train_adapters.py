@@ -0,0 +1,119 @@
+from functools import partial
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+pytest.importorskip("peft")
+tokenizers = pytest.importorskip("tokenizers")
+
+from adapter_manager import tiny_llama
+from inference_worker import ByteTokenizer
+from lora_bundle import LoraBundle
+from train_adapters import (CHAPTER_CONFIGS, LORA_SETTINGS, TRAINING_SETTINGS, TokenizedChapter, _encode,
+                            format_example, peft_wrap, reset_lora, tokenize_chapters, train_adapters)
+
+
+@pytest.fixture(scope="module")
+def bos_tokenizer():
+    """A word-level tokenizer that, like Llama 3's, adds BOS itself and whose chat template starts with BOS"""
+    from tokenizers import Tokenizer, models, pre_tokenizers, processors
+    from transformers import PreTrainedTokenizerFast
+
+    words = ["<pad>", "<s>", "</s>", "<unk>", "system", "user", "assistant", "question", "answer"]
+    tok = Tokenizer(models.WordLevel({w: i for i, w in enumerate(words)}, unk_token="<unk>"))
+    tok.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+    tok.post_processor = processors.TemplateProcessing(single="<s> $A", special_tokens=[("<s>", 1)])
+    tokenizer = PreTrainedTokenizerFast(tokenizer_object=tok, bos_token="<s>", eos_token="</s>",
+                                        pad_token="<pad>", unk_token="<unk>")
+    tokenizer.chat_template = "<s> {% for m in messages %}{{ m['role'] }} {{ m['content'] }} {% endfor %}"
+    return tokenizer
+
+
+def test_encoded_examples_have_a_single_bos(bos_tokenizer):
+    text = format_example(bos_tokenizer, "system", "question", "answer")
+    assert text.startswith("<s>")
+    (ids,) = _encode(bos_tokenizer, [text], max_length=64)
+    assert ids[0] == bos_tokenizer.bos_token_id
+    assert ids.count(bos_tokenizer.bos_token_id) == 1
+    # Same ids as the serving side, which tokenizes the rendered template without special tokens
+    assert ids == bos_tokenizer(text, add_special_tokens=False)['input_ids']
+
+
+LORA = dict(LORA_SETTINGS, r=4, target_modules=["q_proj", "v_proj"])
+SETTINGS = dict(TRAINING_SETTINGS, optim="adamw_torch", num_train_epochs=1, gradient_accumulation_steps=1,
+                warmup_steps=0, logging_steps=1000, disable_tqdm=True)
+
+
+def write_chapters(directory, chapters=2, rows=8):
+    configs = []
+    for n in range(1, chapters + 1):
+        csv_file = str(directory / f"Chapter_{n}_QA.csv")
+        pd.DataFrame({'question': [f"chapter {n} question {i}?" for i in range(rows)],
+                      'answer': [f"answer {i} from chapter {n}." for i in range(rows)]}).to_csv(csv_file, index=False)
+        configs.append({'chapter_num': n, 'csv_file': csv_file,
+                        'system_prompt': CHAPTER_CONFIGS[n - 1]['system_prompt']})
+    return configs
+
+
+def lora_weights(model):
+    return {name: p.detach().clone() for name, p in model.named_parameters() if "lora_" in name}
+
+
+def test_reset_lora_is_deterministic():
+    import torch
+
+    model = peft_wrap(tiny_llama(), LORA)
+    reset_lora(model, seed=7)
+    first = lora_weights(model)
+    with torch.no_grad():
+        for name, p in model.named_parameters():
+            if "lora_" in name:
+                p.add_(1.0)
+    reset_lora(model, seed=7)
+    again = lora_weights(model)
+    assert first.keys() == again.keys() and first
+    for name in first:
+        assert torch.equal(first[name], again[name]), name
+        if "lora_B" in name:
+            assert not again[name].any(), name
+
+
+def test_tokenize_chapters_reuses_the_arrow_cache(tmp_path, capsys):
+    configs = write_chapters(tmp_path, chapters=1)
+    cache_dir = str(tmp_path / "tokens")
+    paths = tokenize_chapters(configs, ByteTokenizer(), "byte", cache_dir)
+    assert "tokenized" in capsys.readouterr().out
+    assert len(TokenizedChapter(paths[1])) == 8
+
+    assert tokenize_chapters(configs, ByteTokenizer(), "byte", cache_dir) == paths
+    assert "cached tokens" in capsys.readouterr().out
+
+    # Editing the CSV changes the key, so the chapter is tokenized again
+    with open(configs[0]['csv_file'], 'a') as f:
+        f.write("one more?,yes.\n")
+    changed = tokenize_chapters(configs, ByteTokenizer(), "byte", cache_dir)
+    assert changed[1] != paths[1]
+    assert "tokenized" in capsys.readouterr().out
+    assert len(TokenizedChapter(changed[1])) == 9
+
+
+def test_bundled_adapter_reproduces_the_trained_model(tmp_path, monkeypatch):
+    import torch
+
+    monkeypatch.chdir(tmp_path)
+    configs = write_chapters(tmp_path)
+    tokenizer = ByteTokenizer()
+    tokenized = tokenize_chapters(configs, tokenizer, "byte", str(tmp_path / "tokens"))
+    base = tiny_llama()
+    train_adapters(configs, base, tokenizer, tokenized, partial(peft_wrap, lora_settings=LORA),
+                   str(tmp_path / "test.bundle"), SETTINGS)
+
+    # The wrapped base model still holds the last chapter's adapter
+    inputs = torch.arange(1, 17).unsqueeze(0)
+    with LoraBundle(str(tmp_path / "test.bundle")) as bundle, torch.no_grad():
+        assert bundle.indices() == [1, 2]
+        reloaded = bundle.load_peft_model(tiny_llama(), len(configs)).eval()
+        base.eval()
+        torch.testing.assert_close(reloaded(inputs).logits, base(inputs).logits, atol=1e-5, rtol=0)
@@ -0,0 +1,610 @@
+import dataclasses
+import hashlib
+import io
+import json
+import math
+import os
+import sys
+import time
+from functools import partial
+import pandas as pd
+import pyarrow as pa
+from lora_bundle import BUNDLE_NAME, CONFIG_FILE, WEIGHTS_FILE, write_lora_bundle
+from packing_loras import renamed_folders
+
+# Training driver for the 18 chapter adapters (moved out of finetune_model.ipynb).
+# The base model is loaded and wrapped with LoRA once; each chapter re-initializes
+# the LoRA weights, trains on its pre-tokenized dataset and is written straight
+# into the adapter bundle read by lora_bundle.LoraBundle.
+BASE_MODEL = "unsloth/Llama-3.2-1B-Instruct-bnb-4bit"
+MAX_SEQ_LENGTH = 2048
+TOKENIZED_DIR = "tokenized_chapters"   # Arrow cache of tokenized chapter datasets
+SEED = 3407
+BATCHING = "pad"   # "pad": plain padded batches, "bucket": length-grouped batches, "pack": see PackedChapter
+
+LORA_SETTINGS = {
+    'r': 16,
+    'lora_alpha': 16,
+    'target_modules': ["q_proj", "k_proj", "v_proj", "o_proj", "gate_proj", "up_proj", "down_proj"],
+    'lora_dropout': 0,
+    'bias': "none",
+}
+
+TRAINING_SETTINGS = {
+    'per_device_train_batch_size': 2,
+    'gradient_accumulation_steps': 4,
+    'warmup_steps': 5,
+    'num_train_epochs': 5,
+    'learning_rate': 2e-4,
+    'logging_steps': 10,
+    'optim': "adamw_8bit",
+    'weight_decay': 0.01,
+    'lr_scheduler_type': "linear",
+}
+
+CHAPTER_CONFIGS = [
+    {
+        "chapter_num": 1,
+        "csv_file": "Chapter_1_QA.csv",
+        "system_prompt": """A specialist in articulating and validating complex human dilemmas, grief, and moral confusion. This LLM is the "empathy engine." It's fine-tuned on the state of conflict (dharma-sankata) and the physical and emotional symptoms of profound despair, serving as the user's first point of contact to understand their problem.""",
+    },
+    {
+        "chapter_num": 2,
+        "csv_file": "Chapter_2_QA.csv",
+        "system_prompt": """The core "knowledge" expert. This LLM is an expert in defining the immortal nature of the self (Atman) versus the ephemeral body and emotions. Its key function is to explain the qualities of a Sthitaprajna-the person with a steady, unshakable mind- and to re-frame problems in the context of eternal truth.""",
+    },
+    {
+        "chapter_num": 3,
+        "csv_file": "Chapter_3_QA.csv",
+        "system_prompt": """A specialist in the "why" and "how" of selfless action (Karma Yoga). It's an expert on productivity without attachment to the outcome. It also functions as a diagnostic tool, identifying internal "blockers" like selfish desire (kama) and anger (krodha) that corrupt action.""",
+    },
+    {
+        "chapter_num": 4,
+        "csv_file": "Chapter_4_QA.csv",
+        "system_prompt": """This LLM is an expert on the synergy between knowledge and action. It explains the "operating system" of yajna (seeing all action as an offering or sacrifice) and the lineage of wisdom. It clarifies how enlightened action is possible and why it's superior to inaction.""",
+    },
+    {
+        "chapter_num": 5,
+        "csv_file": "Chapter_5_QA.csv",
+        "system_prompt": """An expert in the nuanced philosophy of "renunciation in action." Its specialty is distinguishing between renouncing actions (fleeing the world) and renouncing the fruits of action (acting in the world). Its prime directive is to describe the state of "engaged detachment," like a lotus leaf on water.""",
+    },
+    {
+        "chapter_num": 6,
+        "csv_file": "Chapter_6_QA.csv",
+        "system_prompt": """A practical guide for meditation and mental control (Dhyana Yoga). It provides step-by-step techniques for posture, focus, and taming the "restless mind." It's an expert at diagnosing mental fluctuations and prescribing specific contemplative methods to achieve inner stability.""",
+    },
+    {
+        "chapter_num": 7,
+        "csv_file": "Chapter_7_QA.csv",
+        "system_prompt": """An expert in the underlying metaphysics of reality. It defines the divine "source code," differentiating between the material (Apara Prakriti) and spiritual (Para Prakriti) energies that form the universe. It's also the specialist on Maya (illusion) and how it deludes.""",
+    },
+    {
+        "chapter_num": 8,
+        "csv_file": "Chapter_8_QA.csv",
+        "system_prompt": """A specialist in the metaphysics of transition. Its expertise covers the critical moment of death, the process of the soul's journey, and the cosmic cycles of creation and dissolution. It answers the question, "What happens next?" """,
+    },
+    {
+        "chapter_num": 9,
+        "csv_file": "Chapter_9_QA.csv",
+        "system_prompt": """An expert on the "royal secret" of immanence. It explains how the divine pervades all of creation while remaining impartial and unattached. It champions the power of simple, direct devotion and explains how God is the "recipient" of all sincere offerings.""",
+    },
+    {
+        "chapter_num": 10,
+        "csv_file": "Chapter_10_QA.csv",
+        "system_prompt": """A "pattern recognition" expert for finding the divine in the mundane. It's trained on the "Vibhutis" (divine opulences) and is an expert at identifying the "best of" all categories ("I am the sun among lights," "the lion among beasts") to inspire awe and a devotional perspective on the world.""",
+    },
+    {
+        "chapter_num": 11,
+        "csv_file": "Chapter_11_QA.csv",
+        "system_prompt": """The "big picture" processor. This LLM is fine-tuned on the Universal Form (Vishvarupa). It's an expert in synthesizing the overwhelming, terrifying, and awesome vision of reality where all of time and space, creation and destruction, are happening at once.""",
+    },
+    {
+        "chapter_num": 12,
+        "csv_file": "Chapter_12_QA.csv",
+        "system_prompt": """The expert on the path of devotion (Bhakti Yoga). It specializes in defining the qualities of the ideal devotee: compassion, contentment, equanimity, and freedom from envy. It champions the personal, loving path to the divine as the most direct.""",
+    },
+    {
+        "chapter_num": 13,
+        "csv_file": "Chapter_13_QA.csv",
+        "system_prompt": """A high-precision analytical tool. Its core function is to surgically distinguish between the "Field" (Kshetra - the body, matter, emotions) and the "Knower of the Field" (Kshetragna - the soul, consciousness). It helps the user develop the power of discernment.""",
+    },
+    {
+        "chapter_num": 14,
+        "csv_file": "Chapter_14_QA.csv",
+        "system_prompt": """A diagnostic engine. Its entire function is to identify and explain the three Gunas (Sattva, Rajas, Tamas). It analyzes how these three fundamental qualities of nature influence a person's thoughts, actions, and attachments, effectively diagnosing the "root cause" of their mental state.""",
+    },
+    {
+        "chapter_num": 15,
+        "csv_file": "Chapter_15_QA.csv",
+        "system_prompt": """A metaphysical strategist. It uses the complex metaphor of the "upside-down banyan tree" to map a user's material entanglements. It then provides the "axe of detachment" (the strategy) to cut through these roots and find the Supreme Source (Purushottama).""",
+    },
+    {
+        "chapter_num": 16,
+        "csv_file": "Chapter_16_QA.csv",
+        "system_prompt": """A moral and ethical framework expert. It's fine-tuned on the clear-cut lists of "Divine" qualities (Daivi Sampad) to cultivate and "Demonic" qualities (Asuri Sampad) to abandon. It acts as a clear guide for virtuous living.""",
+    },
+    {
+        "chapter_num": 17,
+        "csv_file": "Chapter_17_QA.csv",
+        "system_prompt": """An expert in practical application and operations. This LLM is a specialist in analyzing and classifying faith (Shraddha), food, charity, and austerity according to the three Gunas (Sattvic, Rajasic, or Tamasic). Its prime function is to offer practical lifestyle advice based on these classifications.""",
+    },
+    {
+        "chapter_num": 18,
+        "csv_file": "Chapter_18_QA.csv",
+        "system_prompt": """The specialist in liberation strategy and the grand summary. This LLM is an expert on the true definitions of renunciation (Sanyasa) and relinquishment (Tyaga). Its prime function is to synthesize all paths (Action, Knowledge, Devotion) into the ultimate, concluding instruction: total surrender to the divine as the supreme path to liberation (Moksha).""",
+    },
+]
+
+
+def format_example(tokenizer, system_prompt, question, answer):
+    """One training text: the chat template applied to the conversation, plus EOS"""
+    convo = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": question},
+        {"role": "assistant", "content": answer},
+    ]
+    try:
+        text = tokenizer.apply_chat_template(convo, tokenize=False, add_generation_prompt=False)
+    except AttributeError:
+        text = f"{system_prompt}\n\n{question}\n\n{answer}"
+    return text + (tokenizer.eos_token or "")
+
+
+def _encode(tokenizer, texts, max_length, batch_size=256):
+    """
+    Token ids of each text (unpadded), truncated to max_length. The texts are
+    already rendered by the chat template (which starts with BOS), so the
+    tokenizer must not add special tokens of its own.
+    """
+    rows = []
+    for start in range(0, len(texts), batch_size):
+        enc = tokenizer(texts[start:start + batch_size], return_tensors="pt", padding=True, add_special_tokens=False)
+        for ids, mask in zip(enc['input_ids'], enc['attention_mask']):
+            rows.append(ids[mask.bool()][:max_length].tolist())
+    return rows
+
+
+def tokenize_chapters(configs, tokenizer, tokenizer_name, cache_dir=TOKENIZED_DIR, max_length=MAX_SEQ_LENGTH):
+    """
+    Tokenize every chapter's QA CSV once into an Arrow file.
+
+    Files are named by a hash of the CSV bytes, system prompt, tokenizer name
+    and max_length, so unchanged chapters are reused on later runs.
+
+    Returns:
+        {chapter_num: path of its .arrow file}
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    paths = {}
+    for config in configs:
+        n = config['chapter_num']
+        # "no-special": caches from before _encode stopped adding a second BOS are not reused
+        digest = hashlib.sha256(f"{tokenizer_name}\0{max_length}\0no-special\0{config['system_prompt']}\0"
+                                .encode('utf-8'))
+        with open(config['csv_file'], 'rb') as f:
+            digest.update(f.read())
+        path = os.path.join(cache_dir, f"chapter_{n}_{digest.hexdigest()[:16]}.arrow")
+        paths[n] = path
+        if os.path.exists(path):
+            print(f"✓ Chapter {n}: cached tokens {path}")
+            continue
+        df = pd.read_csv(config['csv_file'])
+        texts = [format_example(tokenizer, config['system_prompt'], q, a)
+                 for q, a in zip(df['question'].astype(str), df['answer'].astype(str))]
+        table = pa.table({'input_ids': pa.array(_encode(tokenizer, texts, max_length), type=pa.list_(pa.int32()))})
+        tmp_path = path + ".tmp"
+        with pa.OSFile(tmp_path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+        print(f"💾 Chapter {n}: {len(texts)} examples tokenized -> {path}")
+    return paths
+
+
+class TokenizedChapter:
+    """Map-style dataset over a memory-mapped Arrow file from tokenize_chapters"""
+
+    def __init__(self, path):
+        self.table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        self.input_ids = self.table.column('input_ids')
+
+    def __len__(self):
+        return len(self.input_ids)
+
+    def __getitem__(self, i):
+        return {'input_ids': self.input_ids[i].as_py()}
+
+
+class PackedChapter:
+    """
+    A chapter's examples packed into sequences of at most `max_length` tokens
+    (first-fit decreasing; an example is never split).
+
+    position_ids restart at 0 for every example, which makes transformers
+    build a block-diagonal causal mask (no attention across examples) when no
+    attention mask is passed. The first token of each example is not a label,
+    since it would be predicted from the previous example.
+    """
+
+    def __init__(self, dataset, max_length=MAX_SEQ_LENGTH):
+        self.rows = [dataset[i]['input_ids'] for i in range(len(dataset))]
+        bins = []   # [free tokens, row indices]
+        for i in sorted(range(len(self.rows)), key=lambda i: -len(self.rows[i])):
+            size = len(self.rows[i])
+            for b in bins:
+                if b[0] >= size:
+                    b[0] -= size
+                    b[1].append(i)
+                    break
+            else:
+                bins.append([max_length - size, [i]])
+        self.sequences = [members for _, members in bins]
+
+    def __len__(self):
+        return len(self.sequences)
+
+    def __getitem__(self, i):
+        input_ids, position_ids, labels = [], [], []
+        for row in (self.rows[j] for j in self.sequences[i]):
+            input_ids += row
+            position_ids += range(len(row))
+            labels += [-100] + row[1:]
+        return {'input_ids': input_ids, 'position_ids': position_ids, 'labels': labels}
+
+
+class Collator:
+    """
+    Right-pads a batch and counts real vs padded positions.
+
+    Plain rows get an attention mask. Packed rows (PackedChapter) get
+    position_ids instead, with the padding as one more segment; the KV cache
+    is turned off, since transformers only derives the packed mask without it.
+    """
+
+    def __init__(self, pad_token_id):
+        self.pad_token_id = pad_token_id
+        self.tokens = 0
+        self.positions = 0
+
+    def __call__(self, batch):
+        import torch
+
+        width = max(len(row['input_ids']) for row in batch)
+        packed = 'position_ids' in batch[0]
+        input_ids = torch.full((len(batch), width), self.pad_token_id, dtype=torch.long)
+        labels = torch.full((len(batch), width), -100, dtype=torch.long)
+        mask = torch.zeros((len(batch), width), dtype=torch.long)
+        for i, row in enumerate(batch):
+            n = len(row['input_ids'])
+            input_ids[i, :n] = torch.tensor(row['input_ids'])
+            labels[i, :n] = torch.tensor(row.get('labels', row['input_ids']))
+            if packed:
+                mask[i, :n] = torch.tensor(row['position_ids'])
+                mask[i, n:] = torch.arange(width - n)
+            else:
+                mask[i, :n] = 1
+            self.tokens += n
+        self.positions += len(batch) * width
+        if packed:
+            return {'input_ids': input_ids, 'position_ids': mask, 'labels': labels, 'use_cache': False}
+        return {'input_ids': input_ids, 'attention_mask': mask, 'labels': labels}
+
+
+def reset_lora(model, seed=SEED):
+    """Re-initialize every LoRA layer as get_peft_model does (random A, zero B)"""
+    import torch
+    from peft.tuners.lora import LoraLayer
+
+    torch.manual_seed(seed)
+    for module in model.modules():
+        if isinstance(module, LoraLayer):
+            for name in module.lora_A:
+                module.reset_lora_parameters(name, True)
+
+
+def adapter_files(model, adapter="default"):
+    """(filename, bytes) of the files save_pretrained would write for the adapter"""
+    from peft import get_peft_model_state_dict
+    from safetensors.torch import save
+
+    state = get_peft_model_state_dict(model, adapter_name=adapter)
+    weights = save({k: v.detach().cpu().contiguous() for k, v in state.items()}, metadata={"format": "pt"})
+    config = model.peft_config[adapter].to_dict()
+    config['inference_mode'] = True
+    config = json.dumps(config, indent=2, sort_keys=True, default=sorted).encode('utf-8')
+    return [(CONFIG_FILE, config), (WEIGHTS_FILE, weights)]
+
+
+def train_chapter(model, dataset, pad_token_id, settings=TRAINING_SETTINGS, seed=SEED, output_dir="outputs",
+                  batching=BATCHING, max_length=MAX_SEQ_LENGTH):
+    """
+    Fine-tune the attached LoRA weights on one chapter.
+
+    Args:
+        batching: 'pad', 'bucket' (batches of similar lengths) or 'pack'
+            (several examples per sequence of up to max_length tokens)
+
+    Returns:
+        {'train_s', 'steps_per_epoch', 'tokens_per_s', 'padding_fraction'}
+    """
+    import torch
+    from transformers import Trainer, TrainingArguments
+
+    settings = dict(settings)
+    if batching == "pack":
+        dataset = PackedChapter(dataset, max_length)
+    elif batching == "bucket":
+        if "train_sampling_strategy" in {f.name for f in dataclasses.fields(TrainingArguments)}:
+            settings['train_sampling_strategy'] = "group_by_length"
+        else:
+            settings['group_by_length'] = True   # transformers < 5
+    elif batching != "pad":
+        raise ValueError(f"Unknown batching mode '{batching}'")
+    bf16 = torch.cuda.is_available() and torch.cuda.is_bf16_supported()
+    args = TrainingArguments(output_dir=output_dir, report_to="none", seed=seed, save_strategy="no",
+                             bf16=bf16, fp16=torch.cuda.is_available() and not bf16, **settings)
+    collator = Collator(pad_token_id)
+    trainer = Trainer(model=model, args=args, train_dataset=dataset, data_collator=collator)
+    start = time.perf_counter()
+    trainer.train()
+    train_s = time.perf_counter() - start
+    return {
+        'train_s': train_s,
+        'steps_per_epoch': math.ceil(len(trainer.get_train_dataloader()) / args.gradient_accumulation_steps),
+        'tokens_per_s': collator.tokens / train_s,
+        'padding_fraction': 1 - collator.tokens / max(collator.positions, 1),
+    }
+
+
+def peft_wrap(model, lora_settings=LORA_SETTINGS):
+    """Attach LoRA layers with plain PEFT (the notebook path uses unsloth_wrap)"""
+    from peft import LoraConfig, get_peft_model
+
+    return get_peft_model(model, LoraConfig(task_type="CAUSAL_LM", **lora_settings))
+
+
+def check_batching(batching, wrap):
+    """
+    Raise ValueError for batching='pack' with unsloth_wrap: packing relies on
+    transformers building a block-diagonal mask from position_ids, and
+    Unsloth's patched attention has not been checked to do the same (packed
+    examples could attend to each other). packing_test only verifies the
+    plain PEFT path.
+    """
+    if batching == "pack" and getattr(wrap, 'func', wrap) is unsloth_wrap:
+        raise ValueError("batching='pack' is not supported with unsloth_wrap; use 'bucket' or 'pad', "
+                         "or wrap=peft_wrap")
+
+
+def unsloth_wrap(model, lora_settings=LORA_SETTINGS, seed=SEED):
+    from unsloth import FastLanguageModel
+
+    return FastLanguageModel.get_peft_model(model, **lora_settings, use_gradient_checkpointing="unsloth",
+                                            random_state=seed)
+
+
+def load_base_model(base_model=BASE_MODEL, max_seq_length=MAX_SEQ_LENGTH):
+    from unsloth import FastLanguageModel
+
+    return FastLanguageModel.from_pretrained(model_name=base_model, max_seq_length=max_seq_length,
+                                             dtype=None, load_in_4bit=True)
+
+
+def train_adapters(configs, model, tokenizer, tokenized, wrap=peft_wrap, output_bundle=BUNDLE_NAME,
+                   settings=TRAINING_SETTINGS, seed=SEED, batching=BATCHING, max_length=MAX_SEQ_LENGTH):
+    """
+    Train one adapter per chapter on a single base model and bundle them.
+
+    Args:
+        configs: chapter configs (see CHAPTER_CONFIGS)
+        model: base model, loaded once by the caller
+        tokenized: {chapter_num: arrow path} from tokenize_chapters
+        wrap: attaches LoRA layers to `model` (peft_wrap or unsloth_wrap)
+        batching: 'pad', 'bucket' or 'pack' (see train_chapter); 'pack' is
+            rejected with unsloth_wrap, see check_batching
+
+    Returns:
+        {chapter_num: {'setup_s', 'save_s'} plus train_chapter's stats}
+    """
+    check_batching(batching, wrap)
+    if tokenizer.pad_token_id is None:
+        tokenizer.pad_token = tokenizer.eos_token
+    names = renamed_folders()
+    model = wrap(model)
+    adapters, timings = [], {}
+    for config in configs:
+        n = config['chapter_num']
+        print(f"=== Chapter {n} ===")
+        start = time.perf_counter()
+        reset_lora(model, seed)
+        dataset = TokenizedChapter(tokenized[n])
+        setup_s = time.perf_counter() - start
+        stats = train_chapter(model, dataset, tokenizer.pad_token_id, settings, seed,
+                              batching=batching, max_length=max_length)
+        start = time.perf_counter()
+        files = adapter_files(model)
+        adapters.append((n, names.get(f"lora_adapters_ch{n}", f"{n}_adapter"),
+                         [(filename, len(data), partial(io.BytesIO, data)) for filename, data in files]))
+        timings[n] = dict(stats, setup_s=setup_s, save_s=time.perf_counter() - start)
+        print(f"✓ Chapter {n}: {len(dataset)} examples trained in {stats['train_s']:.1f}s "
+              f"({stats['steps_per_epoch']} steps/epoch, {stats['padding_fraction']:.0%} padding, "
+              f"{stats['tokens_per_s']:.0f} tokens/s)")
+    start = time.perf_counter()
+    total = write_lora_bundle(str(output_bundle), adapters)
+    print(f"💾 {len(adapters)} adapters -> {output_bundle} ({total / 2**20:.1f} MB, "
+          f"{time.perf_counter() - start:.2f}s)")
+    return timings
+
+
+# ---------------------
+# CPU smoke test: tiny random Llama, one model load per chapter vs once
+# ---------------------
+def smoke_test(chapters=3, rows=16):
+    """
+    Train `chapters` tiny adapters the notebook's way (load the base model,
+    tokenize the CSV, wrap with LoRA, save_pretrained and zip, per chapter) and
+    with train_adapters, and report the setup time removed per chapter.
+
+    Returns:
+        (same, notebook loop stats, driver stats); same is True when the
+        bundled adapter reproduces the trained weights
+    """
+    import shutil
+    import tempfile
+    import zipfile
+    import torch
+    from transformers import LlamaForCausalLM
+    from adapter_manager import tiny_llama
+    from inference_worker import ByteTokenizer
+    from lora_bundle import LoraBundle
+
+    lora = dict(LORA_SETTINGS, r=4, target_modules=["q_proj", "v_proj"])
+    settings = dict(TRAINING_SETTINGS, optim="adamw_torch", num_train_epochs=1, gradient_accumulation_steps=1,
+                    warmup_steps=0, logging_steps=1000, disable_tqdm=True)
+    tokenizer = ByteTokenizer()
+    tmp = tempfile.mkdtemp(prefix="train_smoke_")
+    cwd = os.getcwd()
+    try:
+        os.chdir(tmp)
+        tiny_llama().save_pretrained("base")
+        configs = []
+        for n in range(1, chapters + 1):
+            pd.DataFrame({'question': [f"chapter {n} question {i}?" for i in range(rows)],
+                          'answer': [f"answer {i} from chapter {n}." for i in range(rows)]}).to_csv(
+                f"Chapter_{n}_QA.csv", index=False)
+            configs.append({'chapter_num': n, 'csv_file': f"Chapter_{n}_QA.csv",
+                            'system_prompt': CHAPTER_CONFIGS[n - 1]['system_prompt']})
+
+        print("🚀 Notebook loop: base model, tokenization and LoRA wrapping per chapter...")
+        per_chapter = {}
+        for config in configs:
+            n = config['chapter_num']
+            start = time.perf_counter()
+            model = peft_wrap(LlamaForCausalLM.from_pretrained("base"), lora)
+            df = pd.read_csv(config['csv_file'])
+            ids = _encode(tokenizer, [format_example(tokenizer, config['system_prompt'], q, a)
+                                      for q, a in zip(df['question'], df['answer'])], MAX_SEQ_LENGTH)
+            dataset = [{'input_ids': row} for row in ids]
+            setup_s = time.perf_counter() - start
+            train_s = train_chapter(model, dataset, tokenizer.pad_token_id, settings)['train_s']
+            start = time.perf_counter()
+            model.save_pretrained(f"lora_adapters_ch{n}")
+            with zipfile.ZipFile(f"lora_adapters_ch{n}.zip", 'w') as zf:
+                for root, _, files in os.walk(f"lora_adapters_ch{n}"):
+                    for name in files:
+                        zf.write(os.path.join(root, name))
+            per_chapter[n] = {'setup_s': setup_s, 'train_s': train_s, 'save_s': time.perf_counter() - start}
+            del model
+
+        print("\n🚀 Driver: base model loaded once, tokens cached in Arrow...")
+        start = time.perf_counter()
+        base = LlamaForCausalLM.from_pretrained("base")
+        tokenized = tokenize_chapters(configs, tokenizer, "byte")
+        once_s = time.perf_counter() - start
+        driver = train_adapters(configs, base, tokenizer, tokenized, partial(peft_wrap, lora_settings=lora),
+                                "smoke.bundle", settings)
+
+        # The bundled adapter must reproduce the model it was saved from
+        inputs = torch.arange(1, 17).unsqueeze(0)
+        with LoraBundle("smoke.bundle") as bundle, torch.no_grad():
+            reloaded = bundle.load_peft_model(tiny_llama(), chapters).eval()
+            base.eval()
+            same = torch.allclose(reloaded(inputs).logits, base(inputs).logits, atol=1e-5)
+        print(f"{'✓' if same else '✗'} Bundled adapter {chapters} matches the trained weights")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    def mean(runs, key):
+        return sum(r[key] for r in runs.values()) / len(runs) * 1000
+
+    print(f"\n{'path':>14} {'one-time ms':>12} {'setup ms/ch':>12} {'train ms/ch':>12} {'save ms/ch':>11}")
+    print(f"{'notebook loop':>14} {0:>12.1f} {mean(per_chapter, 'setup_s'):>12.1f} "
+          f"{mean(per_chapter, 'train_s'):>12.1f} {mean(per_chapter, 'save_s'):>11.1f}")
+    print(f"{'driver':>14} {once_s * 1000:>12.1f} {mean(driver, 'setup_s'):>12.1f} "
+          f"{mean(driver, 'train_s'):>12.1f} {mean(driver, 'save_s'):>11.1f}")
+    removed = mean(per_chapter, 'setup_s') + mean(per_chapter, 'save_s') - mean(driver, 'setup_s') - mean(driver, 'save_s')
+    print(f"\n⏱️ Setup overhead removed per chapter: {removed:.1f} ms "
+          f"(the real 4-bit base model load is far slower than this tiny model's)")
+    return same, per_chapter, driver
+
+
+def packing_examples(tokenizer, examples=96, max_length=512, seed=SEED):
+    """Chapter-1-style examples of varied lengths for the packing checks"""
+    import random
+
+    rng = random.Random(seed)
+    system_prompt = CHAPTER_CONFIGS[0]['system_prompt'][:80]
+    texts = [format_example(tokenizer, system_prompt, f"question {i}?", "steady effort. " * rng.randint(1, 20))
+             for i in range(examples)]
+    return [{'input_ids': row} for row in _encode(tokenizer, texts, max_length)]
+
+
+def packed_and_padded_loss(model, sample, pad_token_id):
+    """
+    Loss of `model` on `sample` as one padded batch and as one packed sequence.
+
+    Returns:
+        (padded loss, packed loss); equal up to float error when packing is correct
+    """
+    import torch
+
+    with torch.no_grad():
+        padded = Collator(pad_token_id)(sample)
+        packed = Collator(pad_token_id)([PackedChapter(sample, 10 ** 6)[0]])
+        return model(**padded).loss.item(), model(**packed).loss.item()
+
+
+def packing_test(examples=96, max_length=512):
+    """
+    On the tiny CPU model: check that packed and padded batches give the same
+    loss on the same examples, then train one adapter per batching mode and
+    compare steps per epoch, padding and throughput.
+    """
+    import tempfile
+    from adapter_manager import tiny_llama
+    from inference_worker import ByteTokenizer
+
+    tokenizer = ByteTokenizer()
+    dataset = packing_examples(tokenizer, examples, max_length)
+
+    sample = dataset[:8]
+    padded_loss, packed_loss = packed_and_padded_loss(tiny_llama(), sample, tokenizer.pad_token_id)
+    same = abs(padded_loss - packed_loss) < 1e-4
+    print(f"{'✓' if same else '✗'} Loss on {len(sample)} examples: padded {padded_loss:.6f}, packed {packed_loss:.6f}")
+
+    settings = dict(TRAINING_SETTINGS, optim="adamw_torch", num_train_epochs=1, gradient_accumulation_steps=1,
+                    warmup_steps=0, logging_steps=1000, disable_tqdm=True)
+    lora = dict(LORA_SETTINGS, r=4, target_modules=["q_proj", "v_proj"])
+    rows = {}
+    with tempfile.TemporaryDirectory() as output_dir:
+        for mode in ("pad", "bucket", "pack"):
+            rows[mode] = train_chapter(peft_wrap(tiny_llama(), lora), dataset, tokenizer.pad_token_id, settings,
+                                       output_dir=output_dir, batching=mode, max_length=max_length)
+    print(f"\n{'mode':>7} {'steps/epoch':>12} {'padding':>8} {'tokens/s':>9} {'train s':>8}")
+    for mode, stats in rows.items():
+        print(f"{mode:>7} {stats['steps_per_epoch']:>12} {stats['padding_fraction']:>8.1%} "
+              f"{stats['tokens_per_s']:>9.0f} {stats['train_s']:>8.2f}")
+    return same, rows
+
+
+if __name__ == "__main__":
+    if "--smoke" in sys.argv:
+        same, _, _ = smoke_test()
+        if not same:
+            sys.exit(1)
+    elif "--packing" in sys.argv:
+        same, _ = packing_test()
+        if not same:
+            sys.exit(1)
+    else:
+        chapters = [int(a) for a in sys.argv[1:] if a.isdigit()]
+        configs = [c for c in CHAPTER_CONFIGS if not chapters or c['chapter_num'] in chapters]
+        batching = sys.argv[sys.argv.index("--batching") + 1] if "--batching" in sys.argv else BATCHING
+        try:
+            check_batching(batching, unsloth_wrap)
+        except ValueError as e:
+            print(f"✗ {e}")
+            sys.exit(1)
+        model, tokenizer = load_base_model()
+        tokenized = tokenize_chapters(configs, tokenizer, BASE_MODEL)
+        train_adapters(configs, model, tokenizer, tokenized, wrap=unsloth_wrap, batching=batching)
@@ -0,0 +1,44 @@
+import hashlib
+import json
+import os
+
+# One manifest per Bhagavad_Gita_Chapter_{n} directory, written by scraper.py
+# and read by generate_qa.py to find verses whose text actually changed.
+MANIFEST_NAME = "manifest.json"
+
+
+def content_hash(text):
+    """sha256 of the verse file text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def file_hash(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return content_hash(f.read())
+
+
+def load_manifest(chapter_dir):
+    """
+    Load `chapter_dir`/manifest.json.
+
+    Returns a dict keyed by verse number (int) with entries
+    {url, etag, last_modified, sha256, file}. Missing or unreadable
+    manifests load as empty.
+    """
+    path = os.path.join(chapter_dir, MANIFEST_NAME)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return {int(verse): entry for verse, entry in data.get("verses", {}).items()}
+
+
+def save_manifest(chapter_dir, manifest):
+    """Atomically write the manifest so a crash never leaves a half-written file."""
+    path = os.path.join(chapter_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    data = {"verses": {str(verse): manifest[verse] for verse in sorted(manifest)}}
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)